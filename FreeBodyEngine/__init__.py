@@ -27,6 +27,7 @@ MAX_TPS = "MAX_TPS"
 ALLOW_DISK_WRITE = "ALLOW_DISK_WRITE"
 SUPRESS_WARNINGS = "SUPRESS_WARNINGS"
 SUPRESS_ERRORS = "SUPRESS_ERRORS"
+HOT_RELOAD = "HOT_RELOAD"
 
 # events
 QUIT = "QUIT"
@@ -65,12 +66,12 @@ def unregister_service(name: str):
     get_service_locator()._unregister(name)
 
 def get_service(name: str) -> 'Service':
-    if service_exists(name):
-        return get_service_locator()._get(name)
-    else:
+    service = get_service_locator()._get(name)
+    if service is None:
         from FreeBodyEngine.core.service import NullService
 
         return NullService(name)
+    return service
     
 def service_exists(name: str):
     return get_service_locator()._exists(name)
@@ -103,8 +104,8 @@ def register_event_callback(event_name: str, callable: Callable):
 def unregister_event_callback(event_name: str, callable: Callable):
     get_service('event').unregister_callback(event_name, callable)
 
-def register_event(name: str, *categories: str) -> None:
-    return get_service('event').register_event(name, *categories)
+def register_event(name: str, *categories: str, coalesce: bool = False) -> None:
+    return get_service('event').register_event(name, *categories, coalesce=coalesce)
 
 def unregister_event(name: str) -> None:
     return get_service('event').unregister_event(name)
@@ -112,6 +113,14 @@ def unregister_event(name: str) -> None:
 def emit_event(name: str, *callback_args, **callback_kwargs) -> None:
     return get_service('event').emit(name, *callback_args, **callback_kwargs)
 
+def emit_event_deferred(name: str, *callback_args, **callback_kwargs) -> None:
+    """Queues an event to be dispatched with the other deferred events at the start of the next frame."""
+    return get_service('event').emit_deferred(name, *callback_args, **callback_kwargs)
+
+def get_event_dispatcher(name: str):
+    """Gets a cached handle to an event, for emitting from hot code without the service lookup."""
+    return get_service('event').get_dispatcher(name)
+
 def register_event_category(name: str, priority=0) -> None:
     return get_service('event').register_category(name, priority)
 
@@ -147,7 +156,7 @@ from FreeBodyEngine import ui
 from FreeBodyEngine.core.time import cooldown, physics_cooldown
 from FreeBodyEngine.core.input import get_action_pressed, get_action_released, get_action_strength, get_action_vector
 from FreeBodyEngine.core.mouse import Mouse
-from FreeBodyEngine.utils import load_image, load_material, load_sprite, load_shader, load_sound, load_data, load_toml, load_model
+from FreeBodyEngine.utils import load_image, load_material, load_sprite, load_shader, load_sound, load_data, load_toml, load_model, load_async, load_image_async, load_model_async, preload
 from FreeBodyEngine import graphics
 from FreeBodyEngine import utils
 from FreeBodyEngine.utils import get_platform
@@ -78,20 +78,27 @@ def resample_audio(data, orig_sr, target_sr):
     resampled = scipy.signal.resample(data, target_length, axis=0)
     return resampled
 
+def decode_sound(data, sample_rate: int, channels: int) -> np.ndarray:
+    """Decodes a sound file to float32 frames at the sample rate and channel count of the output. Safe to call off the main thread."""
+    data, sr = sf.read(data, dtype='float32', always_2d=True)
+    if sr != sample_rate:
+        data = resample_audio(data, sr, sample_rate)
+
+    if data.shape[1] == 1 and channels == 2:
+        data = np.repeat(data, 2, axis=1)
+    return data
+
 class Sound:
+    """
+    :param data: A sound file, or frames already decoded with `decode_sound`.
+    """
     def __init__(self, data, manager: AudioManager):
-        data, sr = sf.read(data, dtype='float32', always_2d=True)
+        if not isinstance(data, np.ndarray):
+            data = decode_sound(data, manager.sample_rate, manager.channels)
         self.manager = manager
-        self.sample_rate = sr
+        self.sample_rate = manager.sample_rate
         self.volume = 1.0
 
-        if sr != manager.sample_rate:
-            data = resample_audio(data, sr, manager.sample_rate)
-            self.sample_rate = manager.sample_rate
-
-        if data.shape[1] == 1 and manager.channels == 2:
-            data = np.repeat(data, 2, axis=1)
-
         self.data = data
         self.position = 0  
         self.paused = False
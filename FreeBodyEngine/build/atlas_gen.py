@@ -1,83 +1,229 @@
 from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import json
 import os
 
-# binary tree packing implementation with PIL images
+# MaxRects packing implementation with PIL images
+
+
+class MaxRectsBin:
+    """
+    A single atlas page packed with the MaxRects algorithm (best short side fit).
+    Keeps a list of maximal free rectangles, placing a rect splits every free rectangle it overlaps.
+    """
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+        self.free: list[tuple[int, int, int, int]] = [(0, 0, width, height)]
+        self.used_width = 0
+        self.used_height = 0
+
+    def find_position(self, w, h):
+        best = None
+        best_short, best_long = None, None
+        for fx, fy, fw, fh in self.free:
+            if w <= fw and h <= fh:
+                short, long = min(fw - w, fh - h), max(fw - w, fh - h)
+                if best is None or (short, long) < (best_short, best_long):
+                    best, best_short, best_long = (fx, fy), short, long
+        return best
+
+    def insert(self, w, h):
+        pos = self.find_position(w, h)
+        if pos is None:
+            return None
 
-class Node:
-    def __init__(self, x, y, w, h):
-        self.x, self.y, self.w, self.h = x, y, w, h
-        self.used = False
-        self.right = None
-        self.down = None
+        x, y = pos
+        kept, split = [], []
+        for free in self.free:
+            pieces = split_free_rect(free, (x, y, w, h))
+            if pieces is None:
+                kept.append(free)
+            else:
+                split.extend(pieces)
+        self.free = kept + prune_free_rects(split, kept)
 
-    def insert(self, img: Image.Image):
-        iw, ih = img.size
+        self.used_width = max(self.used_width, x + w)
+        self.used_height = max(self.used_height, y + h)
+        return pos
 
-        if self.used:
-            right_insert = self.right.insert(img) if self.right else None
-            down_insert = self.down.insert(img) if self.down else None
-            return right_insert or down_insert
-        
-        if iw > self.w or ih > self.h:
-            return None
 
-        if iw == self.w and ih == self.h:
-            self.used = True
-            return self
+def split_free_rect(free, used):
+    fx, fy, fw, fh = free
+    ux, uy, uw, uh = used
+    if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+        return None
 
-        self.used = True
-        self.down = Node(self.x, self.y + ih, self.w, self.h - ih)
-        self.right = Node(self.x + iw, self.y, self.w - iw, ih)
-        return self
+    rects = []
+    if ux > fx: # left
+        rects.append((fx, fy, ux - fx, fh))
+    if ux + uw < fx + fw: # right
+        rects.append((ux + uw, fy, fx + fw - ux - uw, fh))
+    if uy > fy: # top
+        rects.append((fx, fy, fw, uy - fy))
+    if uy + uh < fy + fh: # bottom
+        rects.append((fx, uy + uh, fw, fy + fh - uy - uh))
+    return rects
 
 
-class AtlasGen:
-    def __init__(self, paths: dict[str, str] = None, images: dict[str, Image.Image] = None, atlas_size=1024):
-        self.images: dict[str, Image.Image] = {}
-        if paths:
-            for path in paths:
-                self.images[paths[path]] = Image.open(os.path.abspath(path))
+def contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and inner[0] + inner[2] <= outer[0] + outer[2] and inner[1] + inner[3] <= outer[1] + outer[3]
 
-        if images:
-            self.images.update(images)
 
-        if not self.images:
-            raise ValueError('No images provided to atlas generator.')
+def prune_free_rects(rects, existing):
+    """
+    Removes new free rectangles that are contained in another one. The existing rectangles never need checking,
+    they were not contained in the rectangles that got split so they can't be contained in the pieces either.
+    """
+    rects = sorted(set(rects), key=lambda r: r[2] * r[3], reverse=True)
+    kept = []
+    for r in rects:
+        if not any(contains(k, r) for k in kept) and not any(contains(k, r) for k in existing):
+            kept.append(r)
+    return kept
 
-        self.atlas_size = atlas_size
-        self.positions: dict[str, tuple[int, int, int, int]] = {}
 
-    def prepare_images(self):
-        self.images = dict(sorted(self.images.items(), key=lambda item: max(item[1].width, item[1].height), reverse=True))
+def next_power_of_two(value: int):
+    return 1 << max(value - 1, 0).bit_length()
 
-    def build_atlas(self) -> Image.Image:
-        self.prepare_images()
-        while True:
-            atlas = Image.new("RGBA", (self.atlas_size, self.atlas_size))
-            root = Node(0, 0, self.atlas_size, self.atlas_size)
-            self.positions.clear()
 
-            success = True
-            for name, img in self.images.items():
-                node = root.insert(img)
-                if node is None:
-                    success = False
-                    break
-                atlas.paste(img, (node.x, node.y))
-                self.positions[name] = (node.x / self.atlas_size, node.y / self.atlas_size, img.width / self.atlas_size, img.height / self.atlas_size)
+def load_image(path: str, trim: bool):
+    """Loads an image as RGBA and finds its trim box, returns (image, (left, top, source_width, source_height))."""
+    img = Image.open(os.path.abspath(path))
+    img.load()
+    return trim_image(img.convert("RGBA"), trim)
 
-            if success:
-                return atlas
-            else:
-                self.atlas_size *= 2
 
-    def save(self, path: str, metadata_path: str = None):
-        atlas = self.build_atlas()
-        atlas.save(path)
+def trim_image(img: Image.Image, trim: bool):
+    source = (0, 0, img.width, img.height)
+    if not trim:
+        return img, source
+
+    box = img.getchannel("A").getbbox() or (0, 0, 1, 1)
+    if box == (0, 0, img.width, img.height):
+        return img, source
+    return img.crop(box), (box[0], box[1], img.width, img.height)
 
-        if metadata_path:
-            import json
-            with open(metadata_path, "w") as f:
-                json.dump(self.positions, f, indent=4)
 
+class AtlasGen:
+    """
+    Packs images into one or more atlas pages.
+
+    The metadata of a page maps image names to a normalized [x, y, w, h] rect. Trimmed images have the source offset
+    and size in pixels appended: [x, y, w, h, left, top, source_width, source_height].
+
+    :param max_page_size: The largest width and height of a page, pages are cropped to the smallest power of two that fits.
+    :param padding: Empty pixels kept around every image.
+    :param extrude: Pixels of the image's edge repeated into the padding, stops filtering from bleeding neighbours in.
+    :param trim: Removes fully transparent borders before packing.
+    """
+    def __init__(self, paths: dict[str, str] = None, images: dict[str, Image.Image] = None, max_page_size=2048, padding=2, extrude=1, trim=False, workers=None):
+        self.padding = max(padding, extrude)
+        self.extrude = extrude
+        self.trim = trim
+        self.max_page_size = max_page_size
+
+        self.images: dict[str, Image.Image] = {}
+        self.sources: dict[str, tuple[int, int, int, int]] = {}
+
+        if paths:
+            with ThreadPoolExecutor(workers) as pool:
+                loaded = pool.map(load_image, paths.keys(), [trim] * len(paths))
+                for name, (img, source) in zip(paths.values(), loaded):
+                    self.images[name] = img
+                    self.sources[name] = source
+
+        if images:
+            for name, img in images.items():
+                self.images[name], self.sources[name] = trim_image(img.convert("RGBA"), trim)
+
+        if not self.images:
+            raise ValueError('No images provided to atlas generator.')
 
+        self.pages: list[dict[str, tuple[int, int]]] = []
+        self.page_sizes: list[tuple[int, int]] = []
+        self.positions: list[dict[str, list]] = []
+        self.efficiency = 0.0
+
+    def pack(self):
+        """Places every image, opening a new page when an image does not fit on any existing one."""
+        order = sorted(self.images.items(), key=lambda item: (max(item[1].size), item[1].width * item[1].height), reverse=True)
+
+        bins: list[MaxRectsBin] = []
+        self.pages = []
+        for name, img in order:
+            w, h = img.width + self.padding * 2, img.height + self.padding * 2
+            if w > self.max_page_size or h > self.max_page_size:
+                raise ValueError(f'Image "{name}" ({img.width}x{img.height}) does not fit in an atlas page of {self.max_page_size}x{self.max_page_size}.')
+
+            for page, packer in zip(self.pages, bins):
+                pos = packer.insert(w, h)
+                if pos:
+                    page[name] = pos
+                    break
+            else:
+                packer = MaxRectsBin(self.max_page_size, self.max_page_size)
+                bins.append(packer)
+                self.pages.append({name: packer.insert(w, h)})
+
+        self.page_sizes = [(next_power_of_two(packer.used_width), next_power_of_two(packer.used_height)) for packer in bins]
+
+        image_area = sum(img.width * img.height for img in self.images.values())
+        self.efficiency = image_area / sum(w * h for w, h in self.page_sizes)
+
+    def build_atlas(self) -> list[Image.Image]:
+        self.pack()
+        atlases = []
+        self.positions = []
+        for page, (width, height) in zip(self.pages, self.page_sizes):
+            atlas = Image.new("RGBA", (width, height))
+            positions = {}
+            for name, (x, y) in page.items():
+                img = self.images[name]
+                x, y = x + self.padding, y + self.padding
+                self.paste_extruded(atlas, img, x, y)
+
+                rect = [x / width, y / height, img.width / width, img.height / height]
+                left, top, source_width, source_height = self.sources[name]
+                if (img.width, img.height) != (source_width, source_height):
+                    rect += [left, top, source_width, source_height]
+                positions[name] = rect
+
+            atlases.append(atlas)
+            self.positions.append(positions)
+        return atlases
+
+    def paste_extruded(self, atlas: Image.Image, img: Image.Image, x, y):
+        """Pastes the image with its edge pixels repeated `extrude` times around it, the corner blocks get the corner pixels."""
+        if self.extrude <= 0:
+            atlas.paste(img, (x, y))
+            return
+        e = self.extrude
+        padded = np.pad(np.asarray(img), ((e, e), (e, e), (0, 0)), mode="edge")
+        atlas.paste(Image.fromarray(padded, img.mode), (x - e, y - e))
+
+    def save(self, path: str, metadata_path: str = None) -> list[tuple[str, str]]:
+        """
+        Saves every page as `<path>_<page>.png` and its metadata as `<metadata_path>_<page>.json`.
+
+        :returns: The (image path, metadata path) of every page.
+        """
+        atlases = self.build_atlas()
+        image_root, image_ext = os.path.splitext(path)
+        saved = []
+        for i, atlas in enumerate(atlases):
+            page_path = f"{image_root}_{i}{image_ext}"
+            atlas.save(page_path)
+
+            page_metadata_path = None
+            if metadata_path:
+                metadata_root, metadata_ext = os.path.splitext(metadata_path)
+                page_metadata_path = f"{metadata_root}_{i}{metadata_ext}"
+                with open(page_metadata_path, "w") as f:
+                    json.dump(self.positions[i], f, indent=4)
+            saved.append((page_path, page_metadata_path))
+        return saved
+
+    def report(self) -> str:
+        sizes = ", ".join(f"{w}x{h}" for w, h in self.page_sizes)
+        return f"Packed {len(self.images)} images into {len(self.page_sizes)} atlas page(s) ({sizes}), {self.efficiency:.1%} efficiency."
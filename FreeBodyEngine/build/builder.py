@@ -12,9 +12,16 @@ import sys
 import venv
 import struct
 import venv
+import hashlib
 import importlib
 from FreeBodyEngine.font.atlasgen import generate_atlas
 from FreeBodyEngine.build.atlas_gen import AtlasGen
+from FreeBodyEngine.core.pack import write_asset_pack, DEFAULT_COMPRESSION, COMPRESSION_NAMES, PACK_VERSION
+from FreeBodyEngine.graphics.model.gltf_parser import read_gltf
+from FreeBodyEngine.graphics.model.model_file import MODEL_VERSION, get_model_file_path, encode_model
+from FreeBodyEngine.graphics.mesh_optimizer import optimize_primitive, generate_lods
+from FreeBodyEngine.graphics.texture_file import TEXTURE_VERSION, TEXTURE_FILE_EXTENSION, COMPRESSION_FORMATS, FILTER_NAMES, encode_texture
+from PIL import Image
 from FreeBodyEngine import requirements as fb_requirements
 
 SUPPORTED_PLATFORMS = ["windows", "darwin", "linux"]
@@ -22,8 +29,9 @@ SUPPORTED_PLATFORMS = ["windows", "darwin", "linux"]
 FONT_FILE_TYPES = ["ttf"]
 DATA_FILE_TYPES = ["txt", "json", "fbusl", "fbvert", "fbfrag", "fbmat", "fbspr", 'mp3', 'wav', 'toml']
 IMAGE_FILE_TYPES = ["png", "jpg", "jpeg"]
-MESH_FILE_TYPES = ["fbx"]
+MESH_FILE_TYPES = ["fbx", "gltf", "glb", "bin"]
 FONT_SIZE = 16
+BUILD_CACHE_VERSION = 1
 
 class Builder:
     def __init__(self, path, dev):
@@ -34,6 +42,7 @@ class Builder:
 
 
         self.platform = self.get_build_platform(args)
+        self.clean = "--clean" in args
 
         self.dependencies: list[str] = self.get_user_setting('dependencies') + self.get_platform_dependencies(self.platform)
         self.dependencies.append("pyinstaller")
@@ -43,12 +52,16 @@ class Builder:
         self.build_path = os.path.abspath(f'{path}/build/')
         self.temp_path = os.path.abspath(f'{path}/build/temp/')
         self.cache_path = os.path.join(self.build_path, "cache.json")
+        self.venv_path = os.path.join(self.build_path, "venv")
+        self.lock_path = os.path.join(self.build_path, "requirements.lock")
         
         self.output_path = os.path.abspath(f'{path}/dist/')
         self.asset_out_path = os.path.join(self.output_path, 'assets')
         self.main_file = os.path.abspath(os.path.join(path, self.get_user_setting('main_file')))
         
         self.build_cache = self.get_build_cache()
+        self.hashed_files: set[str] = set()
+        self.compression = self.get_compression_settings()
 
         if self.platform == "web" and not dev:
             self.build_for_web()
@@ -134,52 +147,253 @@ class Builder:
                     fonts[file_path] = get_relative_path(file_path, self.asset_path)
         return images, data, meshes
 
+    def get_compression_settings(self) -> dict[str, int]:
+        """
+        Per file type compression, overridable in fbproject.toml:
+
+            [compression]
+            wav = "zlib"
+            json = "none"
+        """
+        compression = DEFAULT_COMPRESSION.copy()
+        for file_type, method in self.get_user_setting('compression', {}).items():
+            if method not in COMPRESSION_NAMES:
+                raise ValueError(f"Unknown compression '{method}' for file type '{file_type}', expected one of {list(COMPRESSION_NAMES)}.")
+            compression[file_type.lower()] = COMPRESSION_NAMES[method]
+        return compression
+
     def bundle_assets(self, paths: dict[str, str], name: str):
-        with open(os.path.join(self.asset_out_path, f"{name}.pak"), 'wb') as file:
-            for path in paths:
-                data = open(path, "rb").read()
-                out_path = paths[path]
-                file.write(struct.pack("<H", len(out_path)))
-                file.write(out_path.encode("utf-8"))
-                file.write(struct.pack("<I", len(data)))
-                file.write(data)
+        pack_path = os.path.join(self.asset_out_path, f"{name}.pak")
+        fingerprint = hash_values(PACK_VERSION, sorted(self.compression.items()), sorted((out, self.hash_file(path)) for path, out in paths.items()))
+
+        if self.is_cached(f"pack:{name}", fingerprint, pack_path):
+            print(f"'{name}.pak' is up to date.")
+            return
+        write_asset_pack(pack_path, paths, self.compression)
+        self.build_cache['steps'][f"pack:{name}"] = fingerprint
+
+    def get_model_settings(self) -> dict:
+        """
+        Model processing settings, overridable in fbproject.toml:
+
+            [models]
+            optimize = true        # weld vertices and reorder them for the vertex cache
+            lods = [0.5, 0.25]     # generate LOD levels keeping these fractions of the triangles
+            lod_max_error = 0.01   # stop simplifying once collapses cost more than this
+        """
+        settings = {'optimize': True, 'lods': [], 'lod_max_error': None}
+        settings.update(self.get_user_setting('models', {}))
+        return settings
+
+    def process_model(self, path: str) -> bytes:
+        """Converts a glTF model to the binary model format, optimizing it and generating LOD levels."""
+        settings = self.model_settings
+        parser = read_gltf(path)
+        primitives = parser.decode_primitives()
+        if settings['optimize']:
+            primitives = [optimize_primitive(primitive) for primitive in primitives]
+
+        if settings['lods']:
+            max_error = settings['lod_max_error'] if settings['lod_max_error'] is not None else float('inf')
+            primitives += [lod for primitive in primitives for lod in generate_lods(primitive, settings['lods'], max_error)]
+        return encode_model(primitives, parser.get_materials(), parser.get_images())
+
+    def convert_models(self, meshes: dict[str, str]) -> dict[str, str]:
+        """
+        Converts glTF models to the engine's binary model format, returning the mesh files to bundle.
+        Converted models replace their .gltf/.glb (and .bin) files, anything that can't be converted is bundled as it is.
+        """
+        self.model_settings = self.get_model_settings()
+        models_path = os.path.join(self.temp_path, 'models')
+        bundled = {}
+        converted_sources = set()
+        for path, out in meshes.items():
+            file_type = path.rsplit('.', 1)[-1].lower()
+            if file_type not in ('gltf', 'glb'):
+                continue
+
+            sources = [path]
+            bin_path = path.removesuffix('.gltf') + '.bin'
+            if file_type == 'gltf' and os.path.exists(bin_path):
+                sources.append(bin_path)
+
+            model_out = get_model_file_path(out)
+            model_path = os.path.join(models_path, model_out)
+            fingerprint = hash_values(MODEL_VERSION, sorted(self.model_settings.items()), [self.hash_file(source) for source in sources])
+            if not self.is_cached(f"model:{out}", fingerprint, model_path):
+                try:
+                    data = self.process_model(path)
+                except Exception as e:
+                    print(f"Could not convert model '{out}', bundling it unconverted: {e}")
+                    continue
+
+                os.makedirs(os.path.dirname(model_path), exist_ok=True)
+                with open(model_path, 'wb') as f:
+                    f.write(data)
+                self.build_cache['steps'][f"model:{out}"] = fingerprint
+
+            bundled[model_path] = model_out
+            converted_sources.update(os.path.normpath(source) for source in sources)
+
+        bundled |= {path: out for path, out in meshes.items() if os.path.normpath(path) not in converted_sources}
+        return bundled
+
+    def get_texture_settings(self, data: dict[str, str]) -> dict[str, tuple[str, bool, str]]:
+        """
+        Texture processing settings, the defaults are overridable in fbproject.toml and per image in the .fbspr files using it:
+
+            [textures]
+            filter = "linear"      # "linear" or "nearest", nearest suits pixel art
+            mipmaps = true         # precompute the mip chain, pixel art sprites drawn at their size don't need one
+            compression = "none"   # "none", "bc1" (opaque) or "bc3", encoded at build time
+
+        Returns the (filter, mipmaps, compression) of every image a sprite sets them for, images without one use the defaults under the None key.
+        """
+        defaults = {'filter': 'linear', 'mipmaps': True, 'compression': 'none'}
+        defaults.update(self.get_user_setting('textures', {}))
+
+        def get_settings(values: dict, source: str) -> tuple[str, bool, str]:
+            settings = tuple(values.get(name, defaults[name]) for name in ('filter', 'mipmaps', 'compression'))
+            if settings[0] not in FILTER_NAMES:
+                raise ValueError(f"Unknown texture filter '{settings[0]}' in {source}, expected one of {list(FILTER_NAMES)}.")
+            if settings[2] not in COMPRESSION_FORMATS:
+                raise ValueError(f"Unknown texture compression '{settings[2]}' in {source}, expected one of {list(COMPRESSION_FORMATS)}.")
+            return settings
+
+        texture_settings = {None: get_settings(defaults, 'fbproject.toml')}
+        for path, out in data.items():
+            if not path.endswith('.fbspr'):
+                continue
+            sprite = load_toml(path)
+            if sprite.get('image') and any(name in sprite for name in defaults):
+                texture_settings[sprite['image']] = get_settings(sprite, f"'{out}'")
+        return texture_settings
+
+    def build_atlases(self, atlas_images: dict[str, str], atlas_settings: dict, texture_settings: dict[str, tuple[str, bool, str]]) -> list[tuple[str, str]]:
+        """
+        Packs images sharing texture settings into the same atlas pages and converts every page to the binary texture format.
+
+        :returns: The (texture path, metadata path) of every page.
+        """
+        groups: dict[tuple[str, bool, str], dict[str, str]] = {}
+        for path, out in atlas_images.items():
+            groups.setdefault(texture_settings.get(out, texture_settings[None]), {})[path] = out
+
+        pages = []
+        for i, (settings, paths) in enumerate(sorted(groups.items())):
+            texture_filter, mipmaps, compression = settings
+            atlas_generator = AtlasGen(paths, **atlas_settings)
+            group_pages = atlas_generator.save(os.path.join(self.temp_path, f'_ENGINE_atlas_{i}.png'), os.path.join(self.temp_path, f'_ENGINE_atlas_{i}.json'))
+            print(f"{atlas_generator.report()} ({texture_filter}, {'mipmaps' if mipmaps else 'no mipmaps'}, {compression})")
+
+            for page_path, page_data_path in group_pages:
+                texture_path = page_path.rsplit('.', 1)[0] + '.' + TEXTURE_FILE_EXTENSION
+                with Image.open(page_path) as page:
+                    data = encode_texture(page, COMPRESSION_FORMATS[compression], FILTER_NAMES[texture_filter], mipmaps)
+                with open(texture_path, 'wb') as f:
+                    f.write(data)
+                pages.append((texture_path, page_data_path))
+        return pages
 
     def reset_dirs(self):
         """Resets the build, temp, and dist directories."""
-        if not os.path.exists(self.build_path):
-            os.mkdir(self.build_path)
-        shutil.rmtree(self.temp_path)
-        os.mkdir(self.temp_path)
+        for path in [self.temp_path, self.output_path]:
+            if os.path.exists(path):
+                shutil.rmtree(path)
+        self.prepare_dirs()
 
-        shutil.rmtree(self.output_path)
-        os.mkdir(self.output_path)
-        os.mkdir(self.asset_out_path)
+    def prepare_dirs(self):
+        """Creates the build, temp and dist directories, keeping the outputs of previous builds."""
+        for path in [self.build_path, self.temp_path, self.output_path, self.asset_out_path]:
+            os.makedirs(path, exist_ok=True)
 
     def get_build_cache(self):
         if os.path.exists(self.cache_path):
-            return json.loads(open(self.cache_path, 'r').read())
-        else:
-            return {}
-        
-    def create_build_cache(self):
-        cache = {}
-        cache['dependencies'] = self.dependencies
+            cache = json.loads(open(self.cache_path, 'r').read())
+            if cache.get('version') == BUILD_CACHE_VERSION:
+                return cache
+        return {'version': BUILD_CACHE_VERSION, 'files': {}, 'steps': {}}
+
+    def save_build_cache(self, prune: bool = False):
+        if prune: # forget files that are no longer part of the build
+            self.build_cache['files'] = {path: entry for path, entry in self.build_cache['files'].items() if path in self.hashed_files}
+        temp_path = self.cache_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            f.write(json.dumps(self.build_cache))
+        os.replace(temp_path, self.cache_path)
+
+    def hash_file(self, path: str) -> str:
+        """Hashes a file's content, the hash is reused while the file's size and modification time are unchanged."""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        self.hashed_files.add(key)
+        cached = self.build_cache['files'].get(key)
+        if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+            return cached['hash']
+
+        digest = hash_file(path)
+        self.build_cache['files'][key] = {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'hash': digest}
+        return digest
+
+    def hash_tree(self, path: str, file_types: list[str]) -> str:
+        hashes = []
+        for dir_path, _, file_names in os.walk(path):
+            for file_name in file_names:
+                if file_name.rsplit('.', 1)[-1] in file_types:
+                    file_path = os.path.join(dir_path, file_name)
+                    hashes.append((get_relative_path(file_path, path), self.hash_file(file_path)))
+        return hash_values(sorted(hashes))
+
+    def is_cached(self, step: str, fingerprint: str, *outputs: str) -> bool:
+        """Checks if a build step ran with the same inputs and its outputs still exist."""
+        if self.clean or self.build_cache['steps'].get(step) != fingerprint:
+            return False
+        return all(os.path.exists(path) for path in outputs)
+
+    def get_venv_executable(self):
+        if sys.platform == "win32":
+            return os.path.abspath(os.path.join(self.venv_path, "Scripts", "python.exe"))
+        return os.path.abspath(os.path.join(self.venv_path, "bin", "python"))
 
-        open(self.cache_path, 'w').write(cache)
+    def setup_venv(self):
+        """Creates the build venv, it is only recreated when the dependency list or python version changes."""
+        executable = self.get_venv_executable()
+        dependency_hash = hash_values(sys.version, sorted(self.dependencies))
+
+        if not self.is_cached("venv", dependency_hash, executable, self.lock_path):
+            if os.path.exists(self.venv_path):
+                shutil.rmtree(self.venv_path)
+            venv.EnvBuilder(with_pip=True).create(self.venv_path)
+            self.install_dependencies(executable)
+            self.write_lockfile(executable)
+            self.build_cache['steps']["venv"] = dependency_hash
+            self.build_cache['steps'].pop("engine", None) # a fresh venv needs the engine installed again
+        else:
+            print("Reusing build venv.")
 
+        engine_path = os.path.abspath(os.path.join(__file__, "..", ".."))
+        engine_hash = hash_values(hash_file(self.lock_path), self.hash_tree(engine_path, ["py", "pyd", "so", "dll"]))
+        if not self.is_cached("engine", engine_hash, executable):
+            self.install_freebody(executable)
+            self.build_cache['steps']["engine"] = engine_hash
 
-    def setup_venv(self):
-        venv_path = os.path.abspath(self.build_path+"/venv/")
-        venv.EnvBuilder(with_pip=True).create(venv_path)
-        executable = os.path.abspath(venv_path + "/Scripts/python.exe")
+        name = self.build_settings.get('name', 'FreeBodyGame')
+        code_hash = hash_values(engine_hash, name, self.hash_file(self.main_file), self.hash_tree(self.code_path, ["py"]))
+        if not self.is_cached("code", code_hash, os.path.join(self.output_path, name + '.exe')):
+            self.run_pyinstaller(executable)
+            self.build_cache['steps']["code"] = code_hash
+        else:
+            print("Game code is up to date.")
 
-        self.install_dependencies(executable)
-        self.install_freebody(executable)
-        self.run_pyinstaller(executable)
+    def write_lockfile(self, venv_executable):
+        """Records the exact versions installed in the build venv."""
+        frozen = subprocess.check_output([venv_executable, "-m", "pip", "freeze"])
+        with open(self.lock_path, 'wb') as f:
+            f.write(frozen)
 
     def install_freebody(self, venv_executable):
         package_path = os.path.abspath(os.path.join(__file__, "..", "..", ".."))
-        subprocess.check_call([venv_executable, "-m", "pip", "install", package_path])
+        subprocess.check_call([venv_executable, "-m", "pip", "install", "--force-reinstall", "--no-deps", package_path])
 
 
     def install_dependencies(self, venv_executable):
@@ -210,7 +424,7 @@ class Builder:
         ]) 
         
         executable = name + '.exe'
-        shutil.move(os.path.join(dist_path, executable), os.path.join(self.output_path, executable))
+        os.replace(os.path.join(dist_path, executable), os.path.join(self.output_path, executable))
 
     def build_code(self):
         """
@@ -249,23 +463,35 @@ class Builder:
     def build_for_release(self):
         images, data, meshes = self.locate_assets()
         engine_images, engine_data, engine_meshes = self.get_engine_assets()
-        self.reset_dirs()
-
-        atlas_path = os.path.join(self.temp_path, '_ENGINE_atlas.png')
-        atlas_data_path = os.path.join(self.temp_path, '_ENGINE_atlas.json')
+        if self.clean:
+            self.reset_dirs()
+        else:
+            self.prepare_dirs()
+
+        atlas_images = images | engine_images
+        atlas_settings = self.get_user_setting('atlas', {})
+        texture_settings = self.get_texture_settings(data)
+        atlas_hash = hash_values(TEXTURE_VERSION, sorted(atlas_settings.items()), sorted((out, self.hash_file(path), texture_settings.get(out, texture_settings[None])) for path, out in atlas_images.items()))
+        pages = self.build_cache.get('atlas_pages', [])
+        if not pages or not self.is_cached("atlas", atlas_hash, *[path for page in pages for path in page]):
+            pages = self.build_atlases(atlas_images, atlas_settings, texture_settings)
+            self.build_cache['atlas_pages'] = pages
+            self.build_cache['steps']["atlas"] = atlas_hash
+        else:
+            print("Atlas is up to date.")
 
-        self.atlas_generator = AtlasGen(images | engine_images)
-        self.atlas_generator.save(atlas_path, atlas_data_path)
-        
-        data[atlas_data_path] = "_ENGINE_atlas.json"
+        for page_path, page_data_path in pages:
+            data[page_data_path] = os.path.basename(page_data_path)
         data |= engine_data
         self.bundle_assets(data, 'data')
-        
-        self.bundle_assets({atlas_path: '_ENGINE_atlas.png'}, 'images')
-        
-        self.bundle_assets(meshes, 'mesh')
+
+        self.bundle_assets({page_path: os.path.basename(page_path) for page_path, _ in pages}, 'images')
+
+        self.bundle_assets(self.convert_models(meshes), 'mesh')
+        self.save_build_cache()
 
         self.build_code()
+        self.save_build_cache(prune=True)
         print(f"Successfully built game for release, platform: {self.platform}.")
         
     def build_for_dev(self):
@@ -277,6 +503,17 @@ def get_relative_path(path: str, folder: str) -> str:
 
     return full.relative_to(folder).as_posix()
 
+def hash_file(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def hash_values(*values) -> str:
+    """Hashes json serializable values into a fingerprint."""
+    return hashlib.blake2b(json.dumps(values).encode('utf-8'), digest_size=16).hexdigest()
+
 def load_text(path: str):
     file = open(path, "r")
     text = file.read()
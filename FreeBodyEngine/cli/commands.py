@@ -4,6 +4,7 @@ from FreeBodyEngine.dev.run import main as run_project
 from FreeBodyEngine.cli.cpp import compile_handler
 from FreeBodyEngine.build.builder import build
 from FreeBodyEngine.font.atlasgen import generate_atlas
+from FreeBodyEngine.core.logger import iter_log_reversed, rotated_log_path
 
 import tomllib
 import sys
@@ -116,14 +117,15 @@ def build_handler(env, args):
     dev = False
     if "--dev" in args:
         dev = True
-    if len(args) == 0:
+    projects = [arg for arg in args if not arg.startswith('--')]
+    if len(projects) == 0:
         if env.project_path:
             build(env.project_path, dev)
         else:
             print("No project specified or detected.")
     
     else:
-        build(env.project_registry.get_project_path(args[0]), dev)
+        build(env.project_registry.get_project_path(projects[0]), dev)
 
 def run_handler(env, args):
     if len(args) == 0:
@@ -223,26 +225,28 @@ def get_json_log_file(env):
 
 
 def log_read_handler(env, args):
-    """Read the last N log entries from the JSON log file, optionally filtered by type."""
+    """Read the last N log entries from the JSON log file, optionally filtered by type and paged back by N entries at a time."""
     num_entries = int(args[0]) if len(args) > 0 else 50
     log_type = args[1].upper() if len(args) > 1 else None
+    page = int(args[2]) if len(args) > 2 else 0
 
     log_file = get_json_log_file(env)
     if not os.path.exists(log_file):
         print("No log file found.")
         return
 
+    skip = page * num_entries
     matching_entries = []
-    with open(log_file, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-                if log_type is None or entry["type"] == log_type:
-                    matching_entries.append(entry)
-            except Exception:
+    for entry in iter_log_reversed(log_file):
+        if log_type is None or entry.get("type") == log_type:
+            if skip > 0:
+                skip -= 1
                 continue
+            matching_entries.append(entry)
+            if len(matching_entries) >= num_entries:
+                break
 
-    for entry in matching_entries[-num_entries:]:
+    for entry in reversed(matching_entries):
         print(f"[{entry['timestamp']}] {entry['type']} [{entry['id']}]: {entry['message']}")
 
 
@@ -256,6 +260,11 @@ def log_wipe_handler(env, args):
     if confirm():
         with open(log_file, "w", encoding="utf-8") as f:
             f.write('')
+
+        i = 1
+        while os.path.exists(rotated_log_path(log_file, i)):
+            os.remove(rotated_log_path(log_file, i))
+            i += 1
         print("Log wiped.")
     else:
         print("Aborting.")
@@ -273,44 +282,39 @@ def log_traceback_handler(env, args):
         print("No log file found.")
         return
 
-    with open(log_file, "r", encoding="utf-8") as f:
-        for line in f:
-            try:
-                entry = json.loads(line)
-                if entry["id"] == log_id:
-                    tb = entry.get("traceback")
-                    if tb:
-                        if isinstance(tb, list):
-                            tb_text = "\n".join(tb)
-                        else:
-                            tb_text = str(tb)
-
-                        for tb_line in tb_text.splitlines():
-                            stripped = tb_line.strip()
-
-                            if tb_line.startswith("Traceback"):
-                                print(f"\033[1;31m{tb_line}\033[0m")  # bold red
-                            elif stripped.startswith('File'):
-                                print(f"\033[33m{tb_line}\033[0m")     # yellow
-                            elif any(keyword in tb_line for keyword in ("Error", "Exception")):
-                                print(f"\033[31m{tb_line}\033[0m")     # red
-                            else:
-                                print(f"\033[0m{tb_line}\033[0m")      # gray
+    for entry in iter_log_reversed(log_file):
+        if entry.get("id") == log_id:
+            tb = entry.get("traceback")
+            if tb:
+                if isinstance(tb, list):
+                    tb_text = "\n".join(tb)
+                else:
+                    tb_text = str(tb)
+
+                for tb_line in tb_text.splitlines():
+                    stripped = tb_line.strip()
+
+                    if tb_line.startswith("Traceback"):
+                        print(f"\033[1;31m{tb_line}\033[0m")  # bold red
+                    elif stripped.startswith('File'):
+                        print(f"\033[33m{tb_line}\033[0m")     # yellow
+                    elif any(keyword in tb_line for keyword in ("Error", "Exception")):
+                        print(f"\033[31m{tb_line}\033[0m")     # red
                     else:
-                        print(f"No traceback stored for log ID {log_id}")
-
-                    print('\n')
-                    message = entry.get('message')
-                    log_type = entry.get('type')
-                    if log_type == "WARNING":
-                        print(f"\033[33mWARNING: {message}\033[0m")  # yellow
-                    if log_type == "ERROR":
-                        print(f"\033[31mERROR: {message}\033[0m")    # red
-
-                    print('\n')
-                    return
-            except Exception:
-                continue
+                        print(f"\033[0m{tb_line}\033[0m")      # gray
+            else:
+                print(f"No traceback stored for log ID {log_id}")
+
+            print('\n')
+            message = entry.get('message')
+            log_type = entry.get('type')
+            if log_type == "WARNING":
+                print(f"\033[33mWARNING: {message}\033[0m")  # yellow
+            if log_type == "ERROR":
+                print(f"\033[31mERROR: {message}\033[0m")    # red
+
+            print('\n')
+            return
 
     print(f"No log entry found with ID {log_id}")
 
@@ -834,7 +838,7 @@ def create_font(env, args):
         print(f"Project with ID {project} does not exist.")
 
 root_commands = [
-    Command(["build", "b"], build_handler, help_text="Build the project"),
+    Command(["build", "b"], build_handler, help_text="Build the project, --clean ignores the build cache"),
     Command(["init", 'i'], init_handler, help_text="Initializes the project in the current directory, must be run before any other commands."),
     Command(["run", "r"], run_handler, help_text="Run a project."),
     Command(['enter', 'e'], enter_handler, help_text="Enter the FreeBodyEngine environment."),
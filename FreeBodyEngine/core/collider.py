@@ -1,6 +1,7 @@
 from FreeBodyEngine.math import Vector, Vector3
 from FreeBodyEngine.utils import abstractmethod
-from FreeBodyEngine import get_main
+from FreeBodyEngine import warning
+from FreeBodyEngine.core.service import ServiceRef
 from typing import TYPE_CHECKING, Literal, Union
 from FreeBodyEngine.core.node import Node2D
 from FreeBodyEngine.core.scene import Scene
@@ -8,6 +9,8 @@ from FreeBodyEngine.graphics.debug import RectangleColliderDebug, CircleCollider
 import numpy as np
 import math
 
+_scene_manager = ServiceRef('scene_manager')
+
 class CollisionShape:
     """
     A Collision Shape. Contains logic for basic arcade collisions.
@@ -403,10 +406,10 @@ def cast_ray(position: Vector, direction: Vector, max_distance: float, scene: 'S
     :type scene: Scene
     """
     if scene == None:
-        scene = get_main().active_scene
+        scene = _scene_manager.get().get_active()
         if scene == None:
             warning('Cannot cast ray as no scene was specified and there is no active scene.')
             return None
-        
-        ray = Ray2D(position, direction, scene)
-        return ray.cast()
+
+    ray = Ray2D(position, direction, scene)
+    return ray.cast(max_distance)
@@ -1,14 +1,65 @@
 from FreeBodyEngine.core.service import Service
-from FreeBodyEngine import warning
+from FreeBodyEngine import warning, register_service_update, unregister_service_update
 from typing import Callable
+from collections import OrderedDict
+from dataclasses import dataclass
+import itertools
+from functools import lru_cache
 import re
 
+# deferred events are flushed in the early phase, after the window has polled its events
+DEFERRED_EVENT_PRIORITY = 100
+
+QUERY_CACHE_SIZE = 128
+
+_QUERY_SELECTOR = re.compile(r"([#@\?])([^#@\?]+)")
+
+@dataclass(frozen=True)
+class EventSelector:
+    name: str = None
+    search: str = None
+    categories: tuple[str] = ()
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(query: str) -> tuple[tuple[EventSelector], tuple[str]]:
+    """
+    Parses an event query into selectors, one per space separated token. Also returns the tokens that couldn't be
+    parsed, the caller warns about them so a bad query warns every time and not only when it is first parsed.
+    """
+    selectors = []
+    errors = []
+    for q in query.split(' '):
+        names = []
+        searches = []
+        categories = []
+        for prefix, value in _QUERY_SELECTOR.findall(q):
+            if prefix == '#':
+                names.append(value)
+            elif prefix == '?':
+                searches.append(value)
+            else:
+                categories.append(value)
+
+        if (len(names) > 0 and len(searches) > 0) or (len(names) > 1 or len(searches) > 1):
+            errors.append(q)
+
+        if names:
+            selectors.append(EventSelector(name=names[0], categories=tuple(categories)))
+        elif searches:
+            selectors.append(EventSelector(search=searches[0], categories=tuple(categories)))
+        elif categories:
+            selectors.append(EventSelector(categories=tuple(categories)))
+
+    return tuple(selectors), tuple(errors)
+
 class Event:
-    def __init__(self, name: str, *categories: str):
+    def __init__(self, name: str, *categories: str, coalesce: bool = False, priority: int = 0):
         self.name = name
         self.callbacks: set[Callable] = set()
         self.categories: tuple[str] = categories
         self.values: tuple[any] = ()
+        self.coalesce = coalesce
+        self.priority = priority
 
     def __str__(self):
         return f"Event({self.name})"
@@ -16,12 +67,56 @@ class Event:
     def __repr__(self):
         return str(self)
 
+class EventDispatcher:
+    """
+    A cached handle to a single event. Emitting through it skips the service and name lookups.
+    The handle stays valid if the event is unregistered and registered again.
+    """
+    __slots__ = ('manager', 'name', 'event')
+
+    def __init__(self, manager: 'EventManager', name: str, event: Event = None):
+        self.manager = manager
+        self.name = name
+        self.event = event
+
+    def emit(self, *callback_args, **callback_kwargs):
+        event = self.event
+        if event is None:
+            self.manager._warn_unregistered(self.name)
+            return
+        for callback in event.callbacks:
+            callback(*callback_args, **callback_kwargs)
+
+    def emit_deferred(self, *callback_args, **callback_kwargs):
+        if self.event is None:
+            self.manager._warn_unregistered(self.name)
+            return
+        self.manager._queue_event(self.event, callback_args, callback_kwargs)
+
+    __call__ = emit
+
 class EventManager(Service):
     def __init__(self):
         super().__init__('event')
         self.events: dict[str, Event] = {}
         self.categories = {}
-        self.category_map: dict[str, list[str]] = {}
+        self.category_map: dict[str, set[str]] = {} # category -> the names of its events
+        self.dispatchers: dict[str, EventDispatcher] = {}
+
+        self._deferred: list[tuple[Event, tuple, dict]] = []
+        self._coalesced: dict[str, int] = {} # event name -> index in the deferred queue
+        self._warned: set[str] = set()
+
+        # the indexes below are kept up to date as events are registered and unregistered, so queries never scan every event
+        self._order: dict[str, int] = {} # event name -> registration order, query results are sorted by it
+        self._counter = itertools.count()
+        self._search_index: OrderedDict[str, set[str]] = OrderedDict() # search text -> the names containing it, for recent searches
+
+    def on_initialize(self):
+        register_service_update('early', self.dispatch_deferred, DEFERRED_EVENT_PRIORITY)
+
+    def on_destroy(self):
+        unregister_service_update('early', self.dispatch_deferred)
 
     def unregister_callback(self, event_name: str, callable: Callable):
             if callable not in self.events[event_name].callbacks:
@@ -31,54 +126,47 @@ class EventManager(Service):
             self.events[event_name].callbacks.remove(callable)
 
     def query_events(self, query: str) -> list[Event]:
-        querys = query.split(' ')
-        events = []
-
-        for q in querys:
-            event_querys = re.findall(r"#([^#@\?]+)", q)
-            search = re.findall(r"\?([^#@\?]+)", q)
-            categories = re.findall(r"@([^#@\?]+)", q)
-
-            def add_event(events: list, event_name: str, event_obs):
-                n_events = events
-                e = event_obs[event_name]
-                if e not in events:
-                    n_events.append(e)
-                    return n_events
-                return n_events
-
-            if (len(event_querys) > 0 and len(search) > 0) or (len(event_querys) > 1 or len(search) > 1):
-                warning(f'Could not parse "{q}", event querys can only contain one name selector.')
-
-            if len(event_querys) > 0:
-                name_selector = event_querys[0]
-                for name in self.events:
-                    if name == name_selector:
-                        if len(categories) > 0:
-                            for category in categories:
-                                if category in self.events[name].categories:
-                                    events = add_event(events, name, self.events, )
-                                    
-                        else:
-                            events = add_event(events, name, self.events)
-
-            elif len(search) > 0:
-                search_selector = search[0]
-                for name in self.events:
-                    if search_selector in name:
-                        if len(categories) > 0:
-                            for category in categories:
-                                if category in self.events[name].categories:
-                                    events = add_event(events, name, self.events)
-                        else:
-                            events = add_event(events, name, self.events)
-            
-            elif len(categories) > 0:
-                for category in self.categories:
-                    for event in self.category_map[category]:
-                        events = add_event(events, event, self.events)
-
-        return events
+        """
+        Finds events with a query, e.g. "#name@category ?search @category". Events matching a selector with categories
+        must be in at least one of them, each selector's events are in the order they were registered.
+        """
+        selectors, errors = compile_query(query)
+        for error in errors:
+            warning(f'Could not parse "{error}", event querys can only contain one name selector.')
+
+        found: dict[Event, None] = {} # ordered set
+        for selector in selectors:
+            names = self._select(selector)
+            for name in sorted(names, key=self._order.__getitem__):
+                found[self.events[name]] = None
+        return list(found)
+
+    def _select(self, selector: EventSelector) -> set[str]:
+        in_categories = None
+        if selector.categories:
+            in_categories = set().union(*(self.category_map.get(category, ()) for category in selector.categories))
+
+        if selector.name is not None:
+            names = {selector.name} if selector.name in self.events else set()
+        elif selector.search is not None:
+            names = self._search(selector.search)
+        else:
+            return in_categories or set()
+
+        return names & in_categories if in_categories is not None else names
+
+    def _search(self, text: str) -> set[str]:
+        """The names containing the text, only the first search for a text scans the event names."""
+        names = self._search_index.get(text)
+        if names is not None:
+            self._search_index.move_to_end(text)
+            return names
+
+        names = {name for name in self.events if text in name}
+        self._search_index[text] = names
+        if len(self._search_index) > QUERY_CACHE_SIZE:
+            self._search_index.popitem(last=False)
+        return names
 
     def register_callback(self, event_name: str, callable: Callable):
         if callable in self.events[event_name].callbacks:
@@ -93,37 +181,118 @@ class EventManager(Service):
             return
 
         self.categories[name] = priority
-        self.category_map[name] = []
+        self.category_map[name] = set()
+
+    def unregister_category(self, name: str):
+        if name not in self.categories:
+            warning(f'Could not unregister category "{name}" because it does not exist.')
+            return
+
+        if self.category_map[name]:
+            warning(f'Could not unregister category "{name}" because events are still registered in it.')
+            return
 
-    def register_event(self, name: str, *categorys: str):
+        del self.categories[name]
+        del self.category_map[name]
+
+    def register_event(self, name: str, *categorys: str, coalesce: bool = False):
+        """
+        Registers an event. Coalescing events only keep their latest arguments while waiting in the deferred queue.
+        """
         if name in self.events:
             warning(f'Could not register event "{name}" because it already exists.')
             return
         
         for category in categorys:
-            if category in self.categories:
-                self.category_map[category].append(name)
-            else:
+            if category not in self.categories:
                 warning(f'Category "{category}" does not exist.')
                 return
 
-        self.events[name] = Event(name, *categorys)
-        
+        for category in categorys:
+            self.category_map[category].add(name)
+        for text, names in self._search_index.items():
+            if text in name:
+                names.add(name)
+        self._order[name] = next(self._counter)
+
+        priority = min((self.categories[category] for category in categorys), default=0)
+        event = Event(name, *categorys, coalesce=coalesce, priority=priority)
+        self.events[name] = event
+        self._warned.discard(name)
+
+        if name in self.dispatchers:
+            self.dispatchers[name].event = event
+
 
     def unregister_event(self, name: str):
         if name not in self.events:
             warning(f'Could not unregister event "{name}" because it does not exist')
             return
         
-        for category in self.events[name].category:
-            self.category_map[category].remove(name)
+        for category in self.events[name].categories:
+            self.category_map[category].discard(name)
+        for names in self._search_index.values():
+            names.discard(name)
+        del self._order[name]
 
         del self.events[name]
 
+        if name in self.dispatchers:
+            self.dispatchers[name].event = None
+
+    def get_dispatcher(self, name: str) -> EventDispatcher:
+        """Gets a cached handle for emitting an event, the event does not have to be registered yet."""
+        dispatcher = self.dispatchers.get(name)
+        if dispatcher is None:
+            dispatcher = EventDispatcher(self, name, self.events.get(name))
+            self.dispatchers[name] = dispatcher
+        return dispatcher
+
+    def _warn_unregistered(self, name: str):
+        # only warn once per name, emitting an unknown event every frame would flood the log
+        if name not in self._warned:
+            self._warned.add(name)
+            warning(f'Event "{name}" is not registered.')
 
     def emit(self, event: str, *callback_args, **callback_kwargs):
-        if event not in self.events:
-            warning(f'Event "{event}" is not registered.')
+        e = self.events.get(event)
+        if e is None:
+            self._warn_unregistered(event)
+            return
+        for callback in e.callbacks:
+            callback(*callback_args, **callback_kwargs)
+
+    def emit_deferred(self, event: str, *callback_args, **callback_kwargs):
+        """Queues an event to be dispatched once per frame in the early update phase."""
+        e = self.events.get(event)
+        if e is None:
+            self._warn_unregistered(event)
+            return
+        self._queue_event(e, callback_args, callback_kwargs)
+
+    def _queue_event(self, event: Event, callback_args: tuple, callback_kwargs: dict):
+        if event.coalesce:
+            index = self._coalesced.get(event.name)
+            if index is not None:
+                self._deferred[index] = (event, callback_args, callback_kwargs)
+                return
+            self._coalesced[event.name] = len(self._deferred)
+
+        self._deferred.append((event, callback_args, callback_kwargs))
+
+    def dispatch_deferred(self):
+        """
+        Dispatches every queued event. Events are ordered by their category priority (lowest first, like update phases),
+        events with the same priority keep the order they were emitted in.
+        """
+        if not self._deferred:
             return
-        for callback in self.events[event].callbacks:
-            callback(*callback_args, **callback_kwargs)
\ No newline at end of file
+
+        queue = self._deferred
+        self._deferred = []
+        self._coalesced = {}
+
+        queue.sort(key=lambda item: item[0].priority)
+        for event, callback_args, callback_kwargs in queue:
+            for callback in event.callbacks:
+                callback(*callback_args, **callback_kwargs)
\ No newline at end of file
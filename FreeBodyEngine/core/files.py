@@ -6,25 +6,38 @@ from typing import TYPE_CHECKING
 from importlib.resources import files
 
 import PIL
-from FreeBodyEngine import get_main, warning, error, get_flag, get_service, DEVMODE, PROJECT_PATH
+from FreeBodyEngine import get_main, warning, error, get_flag, get_service, register_service_update, unregister_service_update, DEVMODE, PROJECT_PATH, HOT_RELOAD
 from FreeBodyEngine.graphics.sprite import Sprite
 from FreeBodyEngine.graphics.material import Material
-from FreeBodyEngine.core.service import Service
+from FreeBodyEngine.core.service import Service, ServiceRef
+from FreeBodyEngine.core.pack import AssetPack, is_asset_pack
+from FreeBodyEngine.core.loader import AssetLoader, AssetHandle, Preload, UPLOAD_PRIORITY
+from FreeBodyEngine.core.hot_reload import HotReloader
 from FreeBodyEngine.utils import get_platform
 from FreeBodyEngine.graphics.model.gltf_parser import GLBParser, GLTFParser
 from FreeBodyEngine.graphics.model import Model
+from FreeBodyEngine.graphics.model.model_file import ModelFile, MODEL_FILE_EXTENSION, get_model_file_path
+from FreeBodyEngine.graphics.texture_file import FILTER_NAMES
+from FreeBodyEngine.graphics.resources import get_resource_registry
 
 if TYPE_CHECKING:
     from FreeBodyEngine.core.main import Main
+    from FreeBodyEngine.graphics.image import Image
 
 import FreeBodyEngine.engine_assets
 import os
 import io
+import threading
 
 import struct
 
+IMAGE_FILE_TYPES = ['png', 'jpg', 'jpeg']
+MODEL_FILE_TYPES = ['gltf', 'glb', MODEL_FILE_EXTENSION]
+SOUND_FILE_TYPES = ['wav', 'mp3', 'ogg', 'flac']
+
 
 def read_assets(path):
+    """Reads a legacy (v1) asset pack fully into memory."""
     assets = {}
     with open(path, "rb") as f:
         while True:
@@ -39,10 +52,22 @@ def read_assets(path):
     return assets
 
 
+def open_asset_pack(path) -> AssetPack | dict:
+    """Opens an asset pack, memory mapping v2 packs and falling back to reading legacy packs."""
+    if not os.path.exists(path):
+        return {}
+    if is_asset_pack(path):
+        return AssetPack(path)
+    return read_assets(path)
+
+
 class FileManager(Service):
     """
     The asset manager loads the files packaged by the engine. Uses paths that are relative to the asset folder specified in the build config.
     """
+    renderer = ServiceRef('renderer')
+    graphics = ServiceRef('graphics')
+
     def __init__(self):
         super().__init__('files')
         path = get_flag(PROJECT_PATH, './')
@@ -61,11 +86,38 @@ class FileManager(Service):
             self.path = './assets'        
 
         self.engine_path = 'FreeBodyEngine'
+        self.loader = AssetLoader()
+        self.hot_reload = HotReloader(self) if self.dev and get_flag(HOT_RELOAD, True) else None
     
         if not self.dev:
-            self.asset_pack_path = abs_path('./assets.fbap')
-            self.atlas_map = self.create_atlas_map()
-
+            self.data = open_asset_pack(os.path.join(self.path, 'data.pak'))
+            self.images = open_asset_pack(os.path.join(self.path, 'images.pak'))
+            self.meshes = open_asset_pack(os.path.join(self.path, 'mesh.pak'))
+            self.atlases: dict[str, dict[str, list]] = {} # atlas path -> parsed manifest
+            self._atlas_map: dict[str, str] = None # image path -> atlas path, built on first use
+            self._atlas_files: dict[str, str] = {} # atlas path -> the page's file in the image pack (.fbtex, or .png from older builds)
+            self.image_cache: dict[str, 'Image'] = {}
+
+            # atlases decoded by background loads, waiting for their upload
+            self._atlas_lock = threading.Lock()
+            self._atlas_decode_locks: dict[str, threading.Lock] = {}
+            self._atlas_pixels: dict[str, tuple] = {}
+
+    def on_initialize(self):
+        register_service_update('early', self.loader.process_uploads, UPLOAD_PRIORITY)
+        if self.hot_reload and os.path.isdir(self.path):
+            self.hot_reload.start(self.path)
+
+    def on_destroy(self):
+        unregister_service_update('early', self.loader.process_uploads)
+        if self.hot_reload:
+            self.hot_reload.stop()
+        self.loader.shutdown()
+
+    def track(self, path: str, target, kind):
+        """Reloads the target in place when its file changes, only in dev mode."""
+        if self.hot_reload:
+            self.hot_reload.track(path, target, kind)
          
     def get_file_path(self, path: str):
         n_path = path
@@ -82,7 +134,7 @@ class FileManager(Service):
                 return True
         else:
 
-            if (path in self.images.keys()) or (path in self.data.keys()) or (path in self.atlas_map.keys()):
+            if (path in self.images) or (path in self.data) or (path in self.meshes) or (path in self.atlas_map):
                 return True
 
 
@@ -114,9 +166,10 @@ class FileManager(Service):
 
     def load_data(self, path: str, bytes: bool = False):
         if not self.dev:
-            if path in self.data:
-                raw_bytes = self.data[path]
-                return raw_bytes if bytes else raw_bytes.decode("utf-8")
+            pack = self.data if path in self.data else self.meshes
+            if path in pack:
+                raw_bytes = pack[path]
+                return raw_bytes if bytes else str(raw_bytes, "utf-8")
             else:
                 raise FileExistsError(f"No data file at path '{path}'.")
         else:
@@ -138,41 +191,130 @@ class FileManager(Service):
         """
         data = self.load_toml(path)
         
-        mat = get_service('graphics').create_material(data, injector)
+        mat = self.graphics.create_material(data, injector)
+        self.track(path, mat, 'material')
+        self._track_material_shader(mat)
         return mat        
 
+    def _track_material_shader(self, mat: Material):
+        for shader_path in mat.shader_paths:
+            self.track(shader_path, mat, 'shader')
+
+    def refresh_material(self, mat: Material, data: dict):
+        shader_paths = mat.shader_paths
+        mat.refresh(data)
+        if mat.shader_paths != shader_paths:
+            self._track_material_shader(mat)
+
+    @property
+    def atlas_map(self) -> dict[str, str]:
+        if self._atlas_map is None:
+            self._atlas_map = self.create_atlas_map()
+        return self._atlas_map
+
     def create_atlas_map(self):
+        """Parses every atlas manifest once, mapping image paths to their atlas."""
         atlas_map = {}
         for image in self.images:
-            atlas_path = image.removesuffix('.png')
+            atlas_path = image.rsplit('.', 1)[0]
             data: dict = self.load_json(atlas_path + '.json')
+            self.atlases[atlas_path] = data
+            self._atlas_files[atlas_path] = image
             for path in data:
                 atlas_map[path] = atlas_path
         return atlas_map
 
     def find_image_atlas(self, path):
         atlas_path = self.atlas_map[path]
-        atlas_img = self.images[atlas_path + ".png"]
-        atlas_data = self.load_json(atlas_path + ".json")
+        atlas_img = self.images[self._atlas_files[atlas_path]]
+        atlas_data = self.atlases[atlas_path]
         return atlas_img, atlas_data, atlas_path
 
-    def load_image(self, path: str):
+    def load_image(self, path: str, mipmaps: bool = True):
+        """
+        :param mipmaps: Whether mipmaps are generated in dev mode, release builds bake them into the atlas the image is packed in.
+        """
+        if not self.dev:
+            image = self._get_cached_image(path)
+            if image is not None:
+                return image
+
         if self.file_exsists(path):
             if self.dev:
-                tex = get_service('renderer').texture_manager._create_standalone_texture(open(self.get_file_path(path), 'rb').read())
-                return get_service('renderer').load_image(tex)
+                tex = self.renderer.texture_manager._create_standalone_texture(open(self.get_file_path(path), 'rb').read(), mipmaps)
+                image = self.renderer.load_image(tex)
+                self.track(path, image, 'image')
+                return image
             else:
                 atlas_img, atlas_data, atlas_path = self.find_image_atlas(path)
-                
-                tex = get_service('renderer').texture_manager._create_atlas_texture(atlas_img, atlas_path, atlas_data, path)
-                return get_service('renderer').load_image(tex)
+                return self._upload_atlas_image(path, atlas_img, atlas_path, atlas_data)
         else:
             raise FileExistsError(f"No image at path '{path}'.")
 
+    def load_image_async(self, path: str, mipmaps: bool = True) -> AssetHandle:
+        """Loads an image in the background, it is read and decoded on a worker thread and uploaded on the main thread."""
+        texture_manager = self.renderer.texture_manager
+        if not self.dev:
+            image = self._get_cached_image(path)
+            if image is not None:
+                return self.loader.resolved(path, image)
+
+        if not self.file_exsists(path):
+            raise FileExistsError(f"No image at path '{path}'.")
+
+        if self.dev:
+            file_path = self.get_file_path(path)
+            def decode():
+                with open(file_path, 'rb') as f:
+                    return texture_manager._decode_image(f.read())
+            def upload(decoded):
+                image = self.renderer.load_image(texture_manager._upload_standalone_texture(decoded, mipmaps))
+                self.track(path, image, 'image')
+                return image
+            return self.loader.submit(path, decode, upload)
+
+        atlas_img, atlas_data, atlas_path = self.find_image_atlas(path)
+        return self.loader.submit(path, lambda: self._decode_atlas(atlas_path, atlas_img), lambda decoded: self._upload_atlas_image(path, atlas_img, atlas_path, atlas_data, decoded))
+
+    def _decode_atlas(self, atlas_path: str, atlas_img):
+        """Decodes an atlas once no matter how many of its images are loading, returns None if it is already uploaded."""
+        texture_manager = self.renderer.texture_manager
+        with self._atlas_lock:
+            lock = self._atlas_decode_locks.setdefault(atlas_path, threading.Lock())
+        with lock:
+            if atlas_path not in self._atlas_pixels and not texture_manager._atlas_exists(atlas_path):
+                self._atlas_pixels[atlas_path] = texture_manager._decode_image(atlas_img)
+            return self._atlas_pixels.get(atlas_path)
+
+    def _get_cached_image(self, path: str):
+        """
+        A cached atlas image, or None if it isn't cached or its atlas was deleted. Every image handed out holds a
+        reference to the atlas, so destroying one doesn't delete the atlas from under the others.
+        """
+        image = self.image_cache.get(path)
+        if image is None:
+            return None
+
+        handle = self.renderer.texture_manager.resources.get(image.texture.id)
+        if handle is None:
+            # every reference was released and the atlas deleted, it is uploaded again
+            del self.image_cache[path]
+            return None
+        get_resource_registry().acquire(handle)
+        return image
+
+    def _upload_atlas_image(self, path: str, atlas_img, atlas_path: str, atlas_data: dict, decoded=None):
+        image = self._get_cached_image(path)
+        if image is None:
+            tex = self.renderer.texture_manager._create_atlas_texture(atlas_img, atlas_path, atlas_data, path, decoded)
+            image = self.image_cache[path] = self.renderer.load_image(tex)
+        self._atlas_pixels.pop(atlas_path, None) # only after the upload, so no worker decodes it again in between
+        return image
+
     def load_texture_stack(self, paths: list[str]):
         if all(self.file_exsists(x) for x in paths):
             if self.dev:
-                tex = get_service('renderer').texture_manager._create_standalone_texture_stack([open(self.get_file_path(path), 'rb') for path in paths])
+                tex = self.renderer.texture_manager._create_standalone_texture_stack([open(self.get_file_path(path), 'rb') for path in paths])
                 return tex
             else:
                 return
@@ -187,7 +329,8 @@ class FileManager(Service):
             img_path = data.get('image')
             if not img_path:
                 raise ValueError(f'No image specified in sprite file "{path}".')
-            image = self.load_image(img_path)
+            image = self.load_image(img_path, data.get('mipmaps', True))
+            self._apply_sampling(image, data)
         
         mat_path = data.get('material')
         if not mat_path:
@@ -197,28 +340,107 @@ class FileManager(Service):
         visible = data.get('visible', True)
         z = data.get('z', 0)
 
-        return Sprite(image, mat, get_service('renderer'), visible, z)
-
-    def load_model(self, path: str, model_name: str = None, scale=None) -> Model:
+        sprite = Sprite(image, mat, self.renderer, visible, z)
+        sprite.image_path, sprite.material_path = data.get('image'), mat_path
+        self.track(path, sprite, 'sprite')
+        return sprite
+
+    def _apply_sampling(self, image, data: dict):
+        if self.dev and ('filter' in data or 'mipmaps' in data):
+            # release builds bake these into the atlas the image is packed in
+            self.renderer.texture_manager._set_sampling(image.texture.id, FILTER_NAMES[data.get('filter', 'linear')], data.get('mipmaps', True))
+
+    def refresh_sprite(self, sprite: Sprite, data: dict):
+        """Applies a changed .fbspr file to a loaded sprite, the image and material are only reloaded if their paths changed."""
+        if data.get('material') and data['material'] != sprite.material_path:
+            sprite.material = self.load_material(data['material'])
+            sprite.material_path = data['material']
+        if data.get('image') and data['image'] != sprite.image_path:
+            sprite.image = self.load_image(data['image'], data.get('mipmaps', True))
+            sprite.image_path = data['image']
+        self._apply_sampling(sprite.image, data)
+        sprite.material.properties['albedo'] = sprite.image
+
+        sprite.visisble = data.get('visible', True)
+        sprite.z = data.get('z', 0)
+
+    def get_model_parser(self, path: str) -> GLTFParser | ModelFile:
+        """Release builds convert glTF files to the binary model format, which is read instead of the original."""
         s = path.split('.')
         file_type = s[len(s)-1]
-        if file_type == 'gltf':
+        if not self.dev and file_type in ('gltf', 'glb'):
+            model_path = get_model_file_path(path)
+            if model_path in self.meshes:
+                return ModelFile(self.load_data(model_path, True))
+
+        if file_type == MODEL_FILE_EXTENSION:
+            return ModelFile(self.load_data(path, True))
+
+        elif file_type == 'gltf':
             data = self.load_json(path)
             
             bin_path = path.removesuffix('.gltf') + '.bin'
             bin_data = self.load_data(bin_path, True)
             
-            parser = GLTFParser(data, bin_data)
-            return parser.build_model(model_name, get_service('graphics'), get_service('renderer'), scale)
-
+            return GLTFParser(data, bin_data)
 
         elif file_type == 'glb':
             data = self.load_data(path, True)
             glb_parser = GLBParser(data)
 
-            gltf_parser = GLTFParser(glb_parser.get_json(), glb_parser.get_binary_buffer())
-            return gltf_parser.build_model(model_name, get_service('graphics'), get_service('renderer'))
-        
+            return GLTFParser(glb_parser.get_json(), glb_parser.get_binary_buffer())
+
+    def load_model(self, path: str, model_name: str = None, scale=None) -> Model:
+        parser = self.get_model_parser(path)
+        if parser:
+            return Model.from_decoded(parser.decode_model(model_name, self.renderer.texture_manager, scale), self.graphics, self.renderer)
+
+    def load_model_async(self, path: str, model_name: str = None, scale=None) -> AssetHandle:
+        """Loads a model in the background, accessors and images are decoded on a worker thread and uploaded on the main thread."""
+        texture_manager = self.renderer.texture_manager
+        def decode():
+            parser = self.get_model_parser(path)
+            if parser is None:
+                raise ValueError(f'Unsupported model file "{path}".')
+            return parser.decode_model(model_name, texture_manager, scale)
+        return self.loader.submit(path, decode, lambda decoded: Model.from_decoded(decoded, self.graphics, self.renderer))
+
+    def load_sound_async(self, path: str) -> AssetHandle:
+        """Reads and decodes a sound on a worker thread, the sound is created on the main thread."""
+        from FreeBodyEngine.audio.sound import decode_sound
+        audio = get_service('audio')
+        sample_rate, channels = audio.sample_rate, audio.channels
+        def decode():
+            return decode_sound(io.BytesIO(self.load_data(path, bytes=True)), sample_rate, channels)
+        return self.loader.submit(path, decode, audio.create_sound)
+
+    def load_data_async(self, path: str, bytes: bool = False) -> AssetHandle:
+        return self.loader.submit(path, lambda: self.load_data(path, bytes))
+
+    def load_async(self, path: str) -> AssetHandle:
+        """Loads any asset in the background, picking the loader from the file type."""
+        file_type = path.rsplit('.', 1)[-1].lower()
+        if file_type in IMAGE_FILE_TYPES:
+            return self.load_image_async(path)
+        elif file_type in MODEL_FILE_TYPES:
+            return self.load_model_async(path)
+        elif file_type in SOUND_FILE_TYPES:
+            return self.load_sound_async(path)
+        elif file_type == 'fbspr':
+            # creating the material needs the main thread, list the sprite's image too to decode it in the background
+            return self.loader.submit(path, lambda: None, lambda _: self.load_sprite(path))
+        elif file_type == 'fbmat':
+            return self.loader.submit(path, lambda: None, lambda _: self.load_material(path))
+        return self.load_data_async(path)
+
+    def preload(self, manifest: str | list[str]) -> Preload:
+        """
+        Starts loading a group of assets in the background, so a level transition can stream them in without hitches.
+
+        :param manifest: A list of asset paths, or the path of a toml file with an `assets` list.
+        """
+        paths = self.load_toml(manifest).get('assets', []) if isinstance(manifest, str) else manifest
+        return Preload({path: self.load_async(path) for path in paths})
 
 def path_exsists(path: str, data: str):
     """Write data to the file at the path."""
@@ -0,0 +1,155 @@
+"""Dev mode hot reloading, watches the asset folder and reloads changed assets in place."""
+
+import os
+import time
+import weakref
+import threading
+from collections import defaultdict
+from typing import TYPE_CHECKING, Literal
+
+from FreeBodyEngine import warning
+
+if TYPE_CHECKING:
+    from FreeBodyEngine.core.files import FileManager
+    from FreeBodyEngine.core.loader import AssetHandle
+
+# editors often write a file several times per save
+RELOAD_DEBOUNCE = 0.05
+
+ReloadKind = Literal["image", "shader", "material", "sprite"]
+
+
+class HotReloader:
+    """
+    Watches the asset folder on a watchdog observer thread. Changes are debounced, then each object loaded from
+    the changed file is reloaded through the FileManager's loader: reading and decoding (PIL, fbusl compilation,
+    toml parsing) runs on a worker thread and only the GPU side is applied on the main thread.
+
+    Objects are tracked with weak references, so tracking never keeps an asset alive.
+
+    :param files: The FileManager the assets are loaded through.
+    :param debounce: Seconds without a change to a file before it is reloaded.
+    """
+    def __init__(self, files: 'FileManager', debounce: float = RELOAD_DEBOUNCE):
+        self.files = files
+        self.debounce = debounce
+
+        self.watched: dict[str, list[tuple[ReloadKind, weakref.ref, str]]] = defaultdict(list)
+        self._pending: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+
+        self.running = False
+        self._observer = None
+        self._thread: threading.Thread = None
+
+    def _key(self, path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    def track(self, path: str, target, kind: ReloadKind):
+        """Reloads the target whenever the file at the asset path changes."""
+        with self._lock:
+            self.watched[self._key(self.files.get_file_path(path))].append((kind, weakref.ref(target), path))
+
+    def start(self, path: str):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            warning('Could not import watchdog, hot reloading is disabled.')
+            return
+
+        reloader = self
+        class ChangeHandler(FileSystemEventHandler):
+            def on_modified(self, event):
+                if not event.is_directory:
+                    reloader.on_file_change(event.src_path)
+
+            def on_created(self, event):
+                self.on_modified(event)
+
+            def on_moved(self, event):
+                if not event.is_directory:
+                    reloader.on_file_change(event.dest_path)
+
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name='fb-hot-reload', daemon=True)
+        self._thread.start()
+
+        self._observer = Observer()
+        self._observer.schedule(ChangeHandler(), path, recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+
+    def stop(self):
+        self.running = False
+        self._changed.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer = None
+
+    def on_file_change(self, path: str):
+        key = self._key(path)
+        if key not in self.watched:
+            return
+        with self._lock:
+            self._pending[key] = time.perf_counter()
+            self._changed.set()
+
+    def _run(self):
+        while self.running:
+            self._changed.wait()
+            if not self.running:
+                break
+
+            # wait until every pending file has been quiet for the debounce time
+            while True:
+                with self._lock:
+                    latest = max(self._pending.values(), default=0.0)
+                remaining = latest + self.debounce - time.perf_counter()
+                if remaining <= 0:
+                    break
+                time.sleep(remaining)
+
+            with self._lock:
+                paths = list(self._pending)
+                self._pending.clear()
+                self._changed.clear()
+
+            for path in paths:
+                self.reload(path)
+
+    def reload(self, key: str) -> list['AssetHandle']:
+        """Reloads every live object loaded from a file, forgetting the ones that were garbage collected."""
+        with self._lock:
+            alive = [(kind, ref, path) for kind, ref, path in self.watched.get(key, []) if ref() is not None]
+            self.watched[key] = alive
+
+        handles = []
+        for kind, ref, path in alive:
+            target = ref()
+            if target is not None:
+                handles.append(self._reload_target(kind, target, path))
+        return handles
+
+    def _reload_target(self, kind: ReloadKind, target, path: str) -> 'AssetHandle':
+        files = self.files
+        loader = files.loader
+
+        if kind == "image":
+            texture_manager = files.renderer.texture_manager
+            def decode():
+                with open(files.get_file_path(path), 'rb') as f:
+                    return texture_manager._decode_image(f.read())
+            return loader.submit(path, decode, lambda decoded: texture_manager._replace_texture(target.texture, decoded))
+
+        elif kind == "shader":
+            shader = target.shader
+            vert_path, frag_path = target.shader_paths
+            return loader.submit(path, lambda: shader.compile_sources(files.load_data(vert_path), files.load_data(frag_path)), shader.reload)
+
+        elif kind == "material":
+            return loader.submit(path, lambda: files.load_toml(path), lambda data: files.refresh_material(target, data))
+
+        elif kind == "sprite":
+            return loader.submit(path, lambda: files.load_toml(path), lambda data: files.refresh_sprite(target, data))
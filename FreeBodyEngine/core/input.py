@@ -24,7 +24,7 @@ if TYPE_CHECKING:
 import re
 from FreeBodyEngine.math import Vector
 import operator
-from FreeBodyEngine.core.service import Service
+from FreeBodyEngine.core.service import Service, ServiceRef
 
 
 class Key(Enum):
@@ -470,18 +470,21 @@ class Input(Service):
         return actions
 
 
+_input = ServiceRef("input")
+
+
 def get_action_pressed(name: str) -> bool:
-    return get_service("input").get_action_pressed(name)
+    return _input.get().get_action_pressed(name)
 
 
 def get_action_strength(name: str) -> float:
-    return get_service("input").get_action_strength(name)
+    return _input.get().get_action_strength(name)
 
 
 def get_action_released(name: str) -> bool:
-    return get_service("input").get_action_released(name)
+    return _input.get().get_action_released(name)
 
 
 def get_action_vector(neg_x: str, pos_x: str, neg_y: str, pos_y: str) -> Vector:
     """Get a vector from the strengths of four actions."""
-    return get_service("input").get_vector(neg_x, pos_x, neg_y, pos_y)
+    return _input.get().get_vector(neg_x, pos_x, neg_y, pos_y)
@@ -0,0 +1,173 @@
+"""Background asset loading. Reading and decoding run on a thread pool, GPU uploads are spread across frames on the main thread."""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any
+
+from FreeBodyEngine import warning
+
+# uploads run in the early phase, before anything is drawn with the new assets
+UPLOAD_PRIORITY = 50
+UPLOAD_BUDGET = 0.004
+
+
+class AssetHandle:
+    """
+    An asset that is being loaded. Done callbacks are always called on the main thread.
+
+    :param path: The path of the asset.
+    """
+    def __init__(self, loader: 'AssetLoader', path: str):
+        self.loader = loader
+        self.path = path
+        self._done = threading.Event()
+        self._value = None
+        self._error: BaseException = None
+        self._callbacks: list[Callable[['AssetHandle'], None]] = []
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(self, timeout: float = None):
+        """
+        Waits for the asset and returns it, raising the loading error if it failed.
+        On the main thread pending uploads are run while waiting, so this never deadlocks on its own upload.
+
+        :param timeout: Seconds to wait before raising a TimeoutError, waits forever when None.
+        """
+        if not self._done.is_set():
+            self.loader.wait(self, timeout)
+            if not self._done.is_set():
+                raise TimeoutError(f'Asset "{self.path}" did not load within {timeout} seconds.')
+        if self._error:
+            raise self._error
+        return self._value
+
+    def add_done_callback(self, callback: Callable[['AssetHandle'], None]):
+        if self._done.is_set():
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def _resolve(self, value=None, error: BaseException = None):
+        self._value = value
+        self._error = error
+        self._done.set()
+        for callback in self._callbacks:
+            callback(self)
+        self._callbacks.clear()
+
+
+class Preload:
+    """A group of assets loaded together, usually from a preload manifest."""
+    def __init__(self, handles: dict[str, AssetHandle]):
+        self.handles = handles
+
+    @property
+    def progress(self) -> float:
+        if not self.handles:
+            return 1.0
+        return sum(handle.done() for handle in self.handles.values()) / len(self.handles)
+
+    def done(self) -> bool:
+        return all(handle.done() for handle in self.handles.values())
+
+    def result(self) -> dict[str, Any]:
+        """Waits for every asset, returning them by path."""
+        return {path: handle.result() for path, handle in self.handles.items()}
+
+
+class AssetLoader:
+    """
+    Runs `decode` functions on a thread pool and queues their results for an `upload` function on the main thread.
+    `process_uploads` runs queued uploads until the per frame time budget is spent.
+
+    :param workers: The number of decode threads, defaults to the pool's default.
+    :param upload_budget: Seconds of upload work allowed per frame.
+    """
+    def __init__(self, workers: int = None, upload_budget: float = UPLOAD_BUDGET):
+        self.workers = workers
+        self.upload_budget = upload_budget
+        self.pool: ThreadPoolExecutor = None
+        self.uploads: deque[tuple[AssetHandle, Callable[[Any], Any], Any, BaseException]] = deque()
+        self._uploads_ready = threading.Condition()
+
+    def submit(self, path: str, decode: Callable[[], Any], upload: Callable[[Any], Any] = None) -> AssetHandle:
+        """
+        Loads an asset in the background.
+
+        :param decode: Reads and decodes the asset, runs on a worker thread.
+        :param upload: Called with the decoded data on the main thread, its return value is the asset.
+        """
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='fb-loader')
+
+        handle = AssetHandle(self, path)
+        self.pool.submit(self._decode, handle, decode, upload)
+        return handle
+
+    def resolved(self, path: str, value) -> AssetHandle:
+        """A handle for an asset that is already loaded."""
+        handle = AssetHandle(self, path)
+        handle._resolve(value)
+        return handle
+
+    def _decode(self, handle: AssetHandle, decode: Callable[[], Any], upload: Callable[[Any], Any]):
+        try:
+            self._queue(handle, upload, decode(), None)
+        except BaseException as e:
+            self._queue(handle, None, None, e)
+
+    def _queue(self, handle, upload, decoded, error):
+        with self._uploads_ready:
+            self.uploads.append((handle, upload, decoded, error))
+            self._uploads_ready.notify_all()
+
+    def _run_upload(self):
+        handle, upload, decoded, error = self.uploads.popleft()
+        if error is None and upload is not None:
+            try:
+                decoded = upload(decoded)
+            except Exception as e:
+                error = e
+
+        if error is not None:
+            warning(f'Could not load asset "{handle.path}": {error}')
+        handle._resolve(decoded, error)
+
+    def process_uploads(self, budget: float = None):
+        """Runs queued uploads on the main thread. At least one upload runs every call so loading always progresses."""
+        if not self.uploads:
+            return
+
+        budget = self.upload_budget if budget is None else budget
+        start = time.perf_counter()
+        self._run_upload()
+        while self.uploads and time.perf_counter() - start < budget:
+            self._run_upload()
+
+    def wait(self, handle: AssetHandle, timeout: float = None):
+        """Blocks until the handle is done, running uploads while waiting if called on the main thread."""
+        if threading.current_thread() is not threading.main_thread():
+            handle._done.wait(timeout)
+            return
+
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not handle.done():
+            if self.uploads:
+                self._run_upload()
+                continue
+
+            remaining = None if deadline is None else deadline - time.perf_counter()
+            if remaining is not None and remaining <= 0:
+                return
+            with self._uploads_ready:
+                if not self.uploads and not handle.done():
+                    self._uploads_ready.wait(remaining)
+
+    def shutdown(self):
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
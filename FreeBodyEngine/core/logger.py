@@ -1,10 +1,17 @@
 from datetime import datetime
 from functools import wraps
 from FreeBodyEngine.core.service import Service
-from FreeBodyEngine import get_main, get_service, get_flag
+from FreeBodyEngine import get_main, get_service, get_flag, register_service_update, unregister_service_update
 import os
+import sys
+import gzip
+import shutil
+import time
+import queue
+import atexit
 import inspect
 import json
+import threading
 import traceback
 
 colors = {
@@ -19,11 +26,220 @@ def print_colored(*text: str, color='reset'):
     s = "".join(f"\033[{colors[color]}m{t}\033[0m" for t in text)
     print(s)
 
+def rotated_log_path(path: str, index: int) -> str:
+    """Gets the path of a rotated log archive, e.g. log.jsonl -> log.1.jsonl.gz"""
+    base, ext = os.path.splitext(path)
+    return f"{base}.{index}{ext}.gz"
+
+def _read_lines_reversed(path: str, block_size: int = 65536):
+    """Yields the lines of a file from last to first, seeking backwards in blocks."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b"\n")
+            remainder = lines.pop(0) # may be cut off, finished by the next block
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if remainder:
+            yield remainder
+
+def iter_log_reversed(path: str, include_rotated: bool = True):
+    """Yields the entries of a JSONL log newest first, continuing into rotated archives."""
+    sources = [path]
+    if include_rotated:
+        i = 1
+        while os.path.exists(rotated_log_path(path, i)):
+            sources.append(rotated_log_path(path, i))
+            i += 1
+
+    for source in sources:
+        if not os.path.exists(source):
+            continue
+
+        if source.endswith('.gz'):
+            with gzip.open(source, 'rb') as f:
+                lines = reversed(f.read().splitlines()) # archives are size capped
+        else:
+            lines = _read_lines_reversed(source)
+
+        for line in lines:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class LogHistory:
+    """A fixed capacity ring buffer of log entries with an id index."""
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._slots: list[dict] = [None] * capacity
+        self._index: dict[int, int] = {} # id -> slot
+        self._next = 0
+        self._length = 0
+
+    def append(self, entry: dict):
+        old = self._slots[self._next]
+        if old is not None:
+            del self._index[old["id"]]
+
+        self._slots[self._next] = entry
+        self._index[entry["id"]] = self._next
+        self._next = (self._next + 1) % self.capacity
+        self._length = min(self._length + 1, self.capacity)
+
+    def get(self, log_id: int) -> dict:
+        slot = self._index.get(log_id)
+        return self._slots[slot] if slot is not None else None
+
+    def clear(self):
+        self._slots = [None] * self.capacity
+        self._index.clear()
+        self._next = 0
+        self._length = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        start = (self._next - self._length) % self.capacity
+        for i in range(self._length):
+            yield self._slots[(start + i) % self.capacity]
+
+
+class LogWriter:
+    """
+    Appends log entries to a JSONL file from a background thread, so logging never blocks the frame.
+    Entries are queued (dropped if the queue is full), serialized on the writer thread and written in batches. The
+    number of dropped entries is reported to the console and the file after the next batch is written.
+    Clearing never waits on the queue, entries are tagged with the number of clears before them and the writer skips
+    the ones logged before the latest clear.
+    Once the file reaches `max_bytes` it is compressed into `log.1.jsonl.gz`, keeping up to `backups` archives.
+    """
+    def __init__(self, path: str, max_queue: int = 4096, batch_size: int = 256, flush_interval: float = 0.5, max_bytes: int = 5 * 1024 * 1024, backups: int = 3):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._clears = 0
+
+        self._queue: queue.Queue = queue.Queue(max_queue)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="FreeBodyLogWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, entry: dict):
+        try:
+            self._queue.put_nowait((self._clears, entry))
+        except queue.Full:
+            self.dropped += 1
+
+    def clear(self):
+        self._clears += 1
+
+    def close(self, timeout: float = 2.0):
+        if not self._closed.is_set():
+            self._closed.set()
+            self._thread.join(timeout)
+
+    def _serialize(self, entry: dict) -> str:
+        tb = entry.get("traceback")
+        if isinstance(tb, traceback.StackSummary):
+            entry = entry | {"traceback": tb.format()}
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def _report_dropped(self, f):
+        # only the main thread counts drops, the writer thread only reads the count
+        dropped = self.dropped - self._reported_dropped
+        if dropped <= 0:
+            return
+        self._reported_dropped += dropped
+        msg = f"{dropped} log entries were dropped because the log writer couldn't keep up."
+        print_colored(f"WARNING: {msg}", color="yellow")
+        f.write(self._serialize({"id": None, "timestamp": get_timestamp(), "type": "WARNING", "message": msg, "traceback": None}))
+        f.flush()
+
+    def _run(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        f = open(self.path, 'a', encoding='utf-8')
+        cleared = 0
+        try:
+            while not (self._closed.is_set() and self._queue.empty()):
+                batch = []
+                try:
+                    batch.append(self._queue.get(timeout=self.flush_interval))
+                    while len(batch) < self.batch_size:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    pass
+
+                lines = []
+                for clears, entry in batch:
+                    if clears > cleared:
+                        # the first entry logged after a clear, everything before it is gone
+                        lines = []
+                        f.seek(0)
+                        f.truncate()
+                        cleared = clears
+                    if clears == cleared:
+                        lines.append(self._serialize(entry))
+
+                clears = self._clears
+                if clears > cleared:
+                    # cleared after every entry in the batch
+                    lines = []
+                    f.seek(0)
+                    f.truncate()
+                    f.flush()
+                    cleared = clears
+
+                if lines:
+                    f.write("".join(lines))
+                if batch:
+                    f.flush()
+                    self._report_dropped(f)
+                    if f.tell() >= self.max_bytes:
+                        f = self._rotate(f)
+            self._report_dropped(f)
+        finally:
+            f.close()
+
+    def _rotate(self, f):
+        f.close()
+
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(rotated_log_path(self.path, i)):
+                os.replace(rotated_log_path(self.path, i), rotated_log_path(self.path, i + 1))
+
+        if self.backups > 0:
+            with open(self.path, 'rb') as src, gzip.open(rotated_log_path(self.path, 1), 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+
+        return open(self.path, 'w', encoding='utf-8')
+
+
 class Logger(Service):
-    def __init__(self, max_history_length=250):
+    """
+    :param max_history_length: The number of entries kept in memory.
+    :param rate_limit: The max number of entries per second for each log type, extra entries are summarized once the second is over.
+    :param max_log_bytes: The size log.jsonl is rotated at.
+    :param log_backups: The number of compressed rotated logs to keep.
+    """
+    def __init__(self, max_history_length=250, rate_limit: int = 30, max_log_bytes: int = 5 * 1024 * 1024, log_backups: int = 3):
         super().__init__('logger')
-        self.history: list[dict] = []
+        self.history = LogHistory(max_history_length)
         self.max_history_length = max_history_length
+        self.max_log_bytes = max_log_bytes
+        self.log_backups = log_backups
         self.next_id = 1
         self.dependencies.append('files')
         self.supress = {
@@ -31,24 +247,93 @@ class Logger(Service):
             "WARNING": get_flag('SUPRESS_WARNINGS', False),
             "DEBUG": get_flag('SUPRESS_LOGS', False)
         }
+        self.writer: LogWriter = None
 
-    def _clear_log(self):
+        self.rate_limit = rate_limit
+        self._rate_window = {"ERROR": [0.0, 0, 0], "WARNING": [0.0, 0, 0], "DEBUG": [0.0, 0, 0]} # type: [window start, count, suppressed]
+        self._last_message: tuple[str, str] = None
+        self._repeats = 0
+        self._repeats_start = 0.0 # when the current count of repeats started
+        # worker threads (asset loading, hot reload, shader compiles) log too
+        self._lock = threading.RLock()
+
+    def on_initialize(self):
         path = get_service('files').get_save_location()
-        os.makedirs(path, exist_ok=True)
-        open(os.path.join(path, "log.jsonl"), 'w')
+        self.writer = LogWriter(os.path.join(path, "log.jsonl"), max_bytes=self.max_log_bytes, backups=self.log_backups)
+        atexit.register(self.writer.close)
+        register_service_update('late', self._flush_summaries)
+
+    def on_destroy(self):
+        unregister_service_update('late', self._flush_summaries)
+        with self._lock:
+            self._flush_repeats()
+        if self.writer:
+            atexit.unregister(self.writer.close)
+            self.writer.close()
+            self.writer = None
+
+    def _clear_log(self):
+        if self.writer:
+            self.writer.clear()
 
     def _write_json_log(self, log_entry: dict):
-        path = get_service('files').get_save_location()
+        if self.writer:
+            self.writer.write(log_entry)
 
-        os.makedirs(path, exist_ok=True)
-        with open(os.path.join(path, "log.jsonl"), 'a', encoding='utf-8') as f:
-            f.write(json.dumps(log_entry, ensure_ascii=False) + "\n")
+    def _capture_stack(self, depth: int) -> traceback.StackSummary:
+        # source lines are only read when the stack is formatted, on the writer thread or in get_traceback
+        stack = traceback.StackSummary.extract(traceback.walk_stack(sys._getframe(depth + 1)), lookup_lines=False)
+        stack.reverse()
+        return stack
 
-    def _store_log(self, type_: str, msg: str):
-        tb = None
-        if type_ in ("ERROR", "WARNING"):
-            tb = traceback.format_stack()[:-2]
+    def _roll_rate_window(self, type_: str, now: float):
+        window = self._rate_window[type_]
+        if now - window[0] >= 1.0:
+            suppressed = window[2]
+            window[0], window[1], window[2] = now, 0, 0
+            if suppressed:
+                self._append_summary(type_, f"{suppressed} {type_.lower()} messages were suppressed in the last second.")
+
+    def _flush_summaries(self):
+        """Summarizes repeats and suppressed messages once a second, even when no other message comes to flush them."""
+        now = time.monotonic()
+        with self._lock:
+            if self._repeats and now - self._repeats_start >= 1.0:
+                self._flush_repeats()
+            for type_, window in self._rate_window.items():
+                if window[2]:
+                    self._roll_rate_window(type_, now)
 
+    def _rate_limited(self, type_: str) -> bool:
+        self._roll_rate_window(type_, time.monotonic())
+        window = self._rate_window[type_]
+        if window[1] >= self.rate_limit:
+            window[2] += 1
+            return True
+        window[1] += 1
+        return False
+
+    def _flush_repeats(self):
+        self._repeats_start = time.monotonic()
+        if self._repeats:
+            type_, msg = self._last_message
+            self._repeats, repeats = 0, self._repeats
+            self._append_summary(type_, f"Previous message repeated {repeats} times: {msg}")
+
+    def _append_summary(self, type_: str, msg: str):
+        """Stores and prints a summary of deduplicated or rate limited messages, which skip both."""
+        if not self.supress[type_]:
+            self._print(type_, self._append(type_, msg, None), msg)
+
+    def _print(self, type_: str, log_id: int, *msg, color: str = "reset"):
+        if type_ == "ERROR":
+            print_colored(f"ERROR [{log_id}]: {msg[0]}", color="red")
+        elif type_ == "WARNING":
+            print_colored(f"WARNING [{log_id}]: {msg[0]}", color="yellow")
+        else:
+            print_colored(*msg, color=color)
+
+    def _append(self, type_: str, msg: str, tb) -> int:
         log_entry = {
             "id": self.next_id,
             "timestamp": get_timestamp(),
@@ -60,37 +345,60 @@ class Logger(Service):
         self.history.append(log_entry)
         self._write_json_log(log_entry)
 
-        if len(self.history) > self.max_history_length:
-            self.history.pop(0)
-
-        
         self.next_id += 1
         return log_entry["id"]
 
+    def _store_log(self, type_: str, msg: str):
+        """Stores a log entry, returns its id or None if it was deduplicated or rate limited."""
+        key = (type_, msg)
+        with self._lock:
+            if key == self._last_message:
+                self._repeats += 1
+                if time.monotonic() - self._repeats_start >= 1.0:
+                    self._flush_repeats() # a message repeated every frame is still summarized once a second
+                return None
+            self._flush_repeats()
+            self._last_message = key
+
+            if self._rate_limited(type_):
+                return None
+
+            tb = None
+            if type_ in ("ERROR", "WARNING"):
+                tb = self._capture_stack(2) # skip _store_log and the public log method
+
+            return self._append(type_, msg, tb)
+
     def log(self, *msg, color: str = "reset"):
         if not self.supress["DEBUG"]:
             full_msg = " ".join(str(m) for m in msg)
             log_id = self._store_log("DEBUG", full_msg)
-            print_colored(*msg, color=color)
+            if log_id is not None:
+                self._print("DEBUG", log_id, *msg, color=color)
             return log_id
 
     def error(self, msg):
         if not self.supress["ERROR"]:
             log_id = self._store_log("ERROR", msg)
-            print_colored(f"ERROR [{log_id}]: {msg}", color="red")
+            if log_id is not None:
+                self._print("ERROR", log_id, msg)
             return log_id
 
     def warning(self, msg):
         if not self.supress["WARNING"]:
             log_id = self._store_log("WARNING", msg)
-            print_colored(f"WARNING [{log_id}]: {msg}", color="yellow")
+            if log_id is not None:
+                self._print("WARNING", log_id, msg)
             return log_id
 
     def get_traceback(self, log_id: int):
-        entry = next((e for e in self.history if e["id"] == log_id), None)
+        with self._lock:
+            entry = self.history.get(log_id)
         if entry:
-            return "".join(entry["traceback"] or [])
+            return "".join(entry["traceback"].format() if entry["traceback"] else [])
         return f"No log found for ID {log_id}"
 
     def get_history(self):
-        return "\n".join(f"[{e['timestamp']}] {e['type']} [{e['id']}]: {e['message']}" for e in self.history)
+        with self._lock:
+            entries = list(self.history)
+        return "\n".join(f"[{e['timestamp']}] {e['type']} [{e['id']}]: {e['message']}" for e in entries)
@@ -26,6 +26,24 @@ class Main:
     def quit(self):
         self.running = False
 
+    def step(self, n_ticks: int = 1) -> int:
+        """
+        Advances the simulation by a number of physics ticks on a fixed virtual clock, skipping the draw phase.
+        Does not touch the wall clock, so headless simulations run as fast as the CPU allows.
+        Every step runs exactly one physics tick, the time scale only affects the update phase's delta time.
+
+        :param n_ticks: The number of physics ticks to advance.
+        :type n_ticks: int
+        :return: The number of ticks that were run, fewer than requested if the main object quit.
+        """
+        dt = self.updater.physics_timestep
+        ticks = 0
+        while ticks < n_ticks and self.running:
+            self.time.advance(dt)
+            self.updater.update(draw=False, physics_ticks=1)
+            ticks += 1
+        return ticks
+
     def run(self):
         profile = get_flag(PROFILE_LAUNCH, False)
         if profile:
@@ -24,7 +24,7 @@ class GenericNode:
     def remove(self, *ids):
         for id in ids:
             if id in self.children.keys():
-                del self.children[ids]
+                del self.children[id]
 
     def add(self, *nodes: 'Node'):
         """
@@ -96,6 +96,14 @@ class GenericNode:
     def kill(self):
         pass
 
+    def _kill(self):
+        """
+        Kills the node's children, without removing the node from its parent.
+        """
+        for child in list(self.children.values()):
+            child._kill()
+        self.children.clear()
+
     def __repr__(self):
         return f"{self.__class__.__name__}"
 
@@ -151,10 +159,14 @@ class Node(GenericNode):
 
     def kill(self):
         """
-        Removes the node from its parent.
+        Removes the node from its parent and kills it and its children.
         """
         if self.id in self.parent.children.keys():
             self.parent.remove(self.id)
+        self._kill()
+
+    def _kill(self):
+        super()._kill()
         self.on_kill()
 
     
@@ -0,0 +1,318 @@
+"""
+The asset pack (.pak) format.
+
+v3 layout, all little endian:
+    header:  magic "FBAP", version (u16), flags (u16), entry count (u32)
+    toc:     one entry per asset, sorted by name hash: name hash (u64), offset (u64), stored length (u32),
+             raw length (u32), crc32 of the stored bytes (u32), compression (u8), name length (u16), utf-8 name
+    data:    asset bytes, each entry aligned to DATA_ALIGNMENT
+
+The table of contents sits at the head of the file, so a reader only has to parse it and can then map the rest of the file.
+Assets are looked up by binary searching the name hashes, the name is compared on a hit. v2 packs are the same
+without the sorting, readers sort their entries after reading them.
+Entries with identical content share the same offset.
+"""
+
+import os
+import mmap
+import zlib
+import struct
+import bisect
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+PACK_MAGIC = b"FBAP"
+PACK_VERSION = 3
+
+HEADER = struct.Struct("<4sHHI")
+TOC_ENTRY = struct.Struct("<QQIIIBH")
+
+DATA_ALIGNMENT = 16
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+COMPRESSION_NAMES = {"none": COMPRESSION_NONE, "zlib": COMPRESSION_ZLIB, "zstd": COMPRESSION_ZSTD}
+
+# already compressed formats are stored as is
+DEFAULT_COMPRESSION = {
+    "png": COMPRESSION_NONE,
+    "jpg": COMPRESSION_NONE,
+    "jpeg": COMPRESSION_NONE,
+    "mp3": COMPRESSION_NONE,
+    "fbmdl": COMPRESSION_NONE, # memory mapped and uploaded without a copy
+    "fbtex": COMPRESSION_NONE,
+    "glb": COMPRESSION_ZSTD,
+    "bin": COMPRESSION_ZSTD,
+    "wav": COMPRESSION_ZSTD,
+}
+DEFAULT_FILE_COMPRESSION = COMPRESSION_ZSTD
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+
+
+def hash_name(name: str) -> int:
+    return int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+@dataclass(slots=True)
+class PackEntry:
+    name: str
+    name_hash: int
+    offset: int
+    length: int
+    raw_length: int
+    checksum: int
+    compression: int
+
+
+def _align(position: int) -> int:
+    return (position + DATA_ALIGNMENT - 1) // DATA_ALIGNMENT * DATA_ALIGNMENT
+
+
+def get_compression(name: str, compression: dict[str, int] = None) -> int:
+    """Picks the compression for a file from its extension."""
+    compression = DEFAULT_COMPRESSION if compression is None else compression
+    method = compression.get(name.rsplit(".", 1)[-1].lower(), DEFAULT_FILE_COMPRESSION)
+    if method == COMPRESSION_ZSTD and not HAS_ZSTD:
+        return COMPRESSION_ZLIB
+    return method
+
+
+def compress(data: bytes, method: int) -> bytes:
+    if method == COMPRESSION_ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    elif method == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return data
+
+
+def decompress(data, method: int, raw_length: int) -> bytes:
+    if method == COMPRESSION_ZLIB:
+        return zlib.decompress(data, bufsize=raw_length)
+    elif method == COMPRESSION_ZSTD:
+        if not HAS_ZSTD:
+            raise ValueError("Asset is zstd compressed but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_length)
+    raise ValueError(f"Unknown compression {method}.")
+
+
+def _pack_file(source: str, method: int):
+    with open(source, "rb") as f:
+        data = f.read()
+    digest = hashlib.blake2b(data, digest_size=16).digest()
+
+    stored = compress(data, method)
+    if len(stored) >= len(data): # not worth decompressing
+        stored, method = data, COMPRESSION_NONE
+    return digest, stored, len(data), method
+
+
+def write_asset_pack(path: str, files: dict[str, str], compression: dict[str, int] = None, workers: int = None):
+    """
+    Writes a v3 asset pack. Files are read and compressed on a thread pool (zlib and zstd release the GIL),
+    and files with identical content are only stored once. At most two files per worker are in flight, so only
+    their compressed data is held in memory while the writer waits on the next one in order.
+
+    :param path: The output path.
+    :param files: Maps source file paths to their name in the pack.
+    :param compression: Maps file extensions to a compression method, defaults to DEFAULT_COMPRESSION.
+    :param workers: The number of worker threads, defaults to the cpu count.
+    """
+    names = list(files.values())
+    toc_size = sum(TOC_ENTRY.size + len(name.encode("utf-8")) for name in names)
+
+    entries: list[PackEntry] = []
+    written: dict[bytes, PackEntry] = {}
+    workers = workers or os.cpu_count()
+    with open(path, "wb") as out, ThreadPoolExecutor(workers) as pool:
+        out.write(b"\0" * (HEADER.size + toc_size)) # filled in once the data is written
+
+        pending = iter(files.items())
+        def submit(source: str, name: str):
+            jobs.append((pool.submit(_pack_file, source, get_compression(name, compression)), name))
+
+        jobs = deque()
+        for source, name in itertools.islice(pending, workers * 2):
+            submit(source, name)
+        while jobs:
+            job, name = jobs.popleft() # drop the future so its compressed data can be freed once written
+            digest, stored, raw_length, method = job.result()
+            following = next(pending, None)
+            if following is not None:
+                submit(*following)
+
+            duplicate = written.get(digest)
+            if duplicate:
+                entries.append(PackEntry(name, hash_name(name), duplicate.offset, duplicate.length, duplicate.raw_length, duplicate.checksum, duplicate.compression))
+                continue
+
+            position = _align(out.tell())
+            out.write(b"\0" * (position - out.tell()))
+            out.write(stored)
+
+            entry = PackEntry(name, hash_name(name), position, len(stored), raw_length, zlib.crc32(stored), method)
+            written[digest] = entry
+            entries.append(entry)
+
+        entries.sort(key=lambda entry: (entry.name_hash, entry.name))
+        out.seek(0)
+        out.write(HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, len(entries)))
+        for entry in entries:
+            encoded = entry.name.encode("utf-8")
+            out.write(TOC_ENTRY.pack(entry.name_hash, entry.offset, entry.length, entry.raw_length, entry.checksum, entry.compression, len(encoded)))
+            out.write(encoded)
+
+
+def is_asset_pack(path: str) -> bool:
+    """Checks if the file is a v2 (or newer) pack rather than a legacy one."""
+    with open(path, "rb") as f:
+        return f.read(4) == PACK_MAGIC
+
+
+class AssetPack:
+    """
+    A memory mapped v2 or v3 asset pack. Only the table of contents is read when opening,
+    uncompressed assets are returned as zero-copy memoryview slices of the mapping.
+
+    Compressed assets are decompressed on first access and kept in an LRU cache.
+
+    :param path: The path of the pack.
+    :param cache_bytes: The maximum size of the decompressed asset cache.
+    """
+    def __init__(self, path: str, cache_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.cache_bytes = cache_bytes
+        self._cache: OrderedDict[int, bytes] = OrderedDict() # keyed by offset, so duplicates share a cache entry
+        self._cache_size = 0
+        self._cache_lock = threading.Lock()
+
+        if os.path.getsize(path) < HEADER.size:
+            # mmap can't map an empty file
+            raise ValueError(f'"{path}" is not a FreeBody asset pack, it is empty or truncated.')
+
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+        self.entries: list[PackEntry] = [] # sorted by name hash
+        self._hashes: list[int] = []
+        try:
+            self._read_toc()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_toc(self):
+        magic, version, flags, count = HEADER.unpack_from(self._view, 0)
+        if magic != PACK_MAGIC:
+            raise ValueError(f'"{self.path}" is not a FreeBody asset pack.')
+        if version > PACK_VERSION:
+            raise ValueError(f'Asset pack "{self.path}" has version {version}, the newest supported version is {PACK_VERSION}.')
+
+        position = HEADER.size
+        for _ in range(count):
+            name_hash, offset, length, raw_length, checksum, compression, name_len = TOC_ENTRY.unpack_from(self._view, position)
+            position += TOC_ENTRY.size
+            name = str(self._view[position:position + name_len], "utf-8")
+            position += name_len
+
+            self.entries.append(PackEntry(name, name_hash, offset, length, raw_length, checksum, compression))
+
+        if version < 3:
+            self.entries.sort(key=lambda entry: (entry.name_hash, entry.name))
+        self._hashes = [entry.name_hash for entry in self.entries]
+
+    def find(self, name: str) -> PackEntry | None:
+        """Gets an asset's entry by binary searching its name hash."""
+        name_hash = hash_name(name)
+        i = bisect.bisect_left(self._hashes, name_hash)
+        while i < len(self._hashes) and self._hashes[i] == name_hash:
+            if self.entries[i].name == name:
+                return self.entries[i]
+            i += 1 # a hash collision
+        return None
+
+    def _stored(self, entry: PackEntry) -> memoryview:
+        return self._view[entry.offset:entry.offset + entry.length]
+
+    def get(self, name: str, default=None):
+        """Gets the asset's bytes, a memoryview into the mapped file when the entry is not compressed."""
+        entry = self.find(name)
+        if entry is None:
+            return default
+
+        if entry.compression == COMPRESSION_NONE:
+            return self._stored(entry)
+        return self._get_decompressed(entry)
+
+    def _get_decompressed(self, entry: PackEntry) -> bytes:
+        with self._cache_lock:
+            data = self._cache.get(entry.offset)
+            if data is not None:
+                self._cache.move_to_end(entry.offset)
+                return data
+
+        data = decompress(self._stored(entry), entry.compression, entry.raw_length)
+        if len(data) > self.cache_bytes:
+            return data
+
+        with self._cache_lock:
+            if entry.offset not in self._cache:
+                self._cache[entry.offset] = data
+                self._cache_size += len(data)
+            while self._cache_size > self.cache_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_size -= len(evicted)
+        return data
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+            self._cache_size = 0
+
+    def verify(self, name: str) -> bool:
+        """Checks the stored bytes of an asset against its checksum."""
+        entry = self.find(name)
+        if entry is None:
+            raise KeyError(name)
+        return zlib.crc32(self._stored(entry)) == entry.checksum
+
+    def keys(self) -> list[str]:
+        return [entry.name for entry in self.entries]
+
+    def close(self):
+        """Closes the pack, the mapping stays alive until every memoryview handed out has been released."""
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __getitem__(self, name: str):
+        data = self.get(name)
+        if data is None:
+            raise KeyError(name)
+        return data
+
+    def __contains__(self, name: str):
+        return self.find(name) is not None
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.entries)
@@ -36,12 +36,13 @@ class PhysicsBody(Node2D):
 
         self.rot_forces = 0
 
-    def _integrate_forces(self):
+    def _integrate_forces(self, dt: float = None):
         rot_accel = self.rot_forces / self.mass
         
         acceleration = self.forces / self.mass
         acceleration += self.accumulated_acceleration
-        dt = physics_delta()
+        if dt is None:
+            dt = physics_delta()
         
         self.vel += acceleration * dt
         self.rot_vel += rot_accel * dt
@@ -1,11 +1,13 @@
 from FreeBodyEngine.utils import abstractmethod
 import uuid
+import gc
 from typing import TYPE_CHECKING
 
 from FreeBodyEngine.core.node import RootNode, Node
 from FreeBodyEngine.core.camera import Camera2D
 from FreeBodyEngine.core.service import Service
-from FreeBodyEngine import register_service_update, unregister_service_update, get_service
+from FreeBodyEngine.graphics.resources import GLOBAL_SCOPE, get_resource_registry
+from FreeBodyEngine import register_service_update, unregister_service_update, get_service, get_flag, physics_delta, DEVMODE
 
 
 if TYPE_CHECKING:
@@ -25,6 +27,7 @@ class SceneManager(Service):
         super().__init__('scene_manager')
         self.scenes: dict[str, 'Scene'] = {}
         self.active_scene: str | None = None
+        self.resources = get_resource_registry()
 
     def on_initialize(self):
         register_service_update('update', self.update)
@@ -39,15 +42,32 @@ class SceneManager(Service):
     
     def add_scene(self, scene: 'Scene'):
         self.scenes[scene.name] = scene
+
+        # GPU resources created while a scene initializes or is active belong to it
+        scope = self.resources.scope
+        self.resources.scope = scene.name
         scene._initialize()
+        self.resources.scope = scope
     
     def set_scene(self, name: str):
         self.active_scene = name
+        self.resources.scope = name
 
     def remove_scene(self, name: str):
-        self.scenes.pop(name, None)
+        scene = self.scenes.pop(name, None)
         if self.active_scene == name:
             self.active_scene = None
+            self.resources.scope = GLOBAL_SCOPE
+
+        if scene is not None:
+            scene._destroy()
+            del scene
+            if get_flag(DEVMODE, False):
+                gc.collect() # so resources only the scene held are reported as collected instead of alive
+                self.resources.collect()
+                self.resources.check_leaks(name)
+            else:
+                self.resources.collect()
 
     def physics_update(self):
         if self.active_scene:
@@ -77,6 +97,14 @@ class Scene:
     def on_initialize(self):
         pass
 
+    def _destroy(self):
+        self.on_destroy()
+        self.root._kill()
+
+    def on_destroy(self):
+        """Called when the scene is removed, GPU resources the scene created should be destroyed here."""
+        pass
+
     def add(self, *node: "Node"):
         """
         Adds the entity to the scene and initializes it. 
@@ -118,8 +146,9 @@ class Scene:
         for node in physics_nodes:
             node.on_physics_process()
 
+        dt = physics_delta()
         for node in physics_nodes:
-            node._integrate_forces()
+            node._integrate_forces(dt)
 
         for node in physics_nodes:
             node._check_collisions()
@@ -1,14 +1,19 @@
-from FreeBodyEngine import warning, service_exists
+from FreeBodyEngine import warning, service_exists, get_service
 
 class ServiceLocator:
+    # bumped whenever any locator changes, invalidates every ServiceRef
+    _generation = 0
+
     def __init__(self):
         self.services: dict[str, Service] = {}
+        ServiceLocator._generation += 1
 
     def _register(self, service: 'Service'):
         dep = service._check_dependencies(self)
 
         if dep:
             self.services[service.name] = service
+            ServiceLocator._generation += 1
             service.on_initialize()
         else:
             warning(f'Dependencies not meant on service "{service.name}"')
@@ -19,6 +24,7 @@ class ServiceLocator:
     
     def _unregister(self, name: str):
         self.services.get(name).on_destroy()
+        ServiceLocator._generation += 1
         return self.services.pop(name, None)
 
     def _exists(self, name: str):
@@ -47,6 +53,32 @@ class Service:
         "Called when a service is unregistered."
         pass
 
+class ServiceRef:
+    """
+    A cached handle to a service. The service is looked up on first use and again only after a service has been registered or unregistered.
+    Can be used with `get`, or as a class attribute where it acts as a descriptor returning the service.
+    """
+    __slots__ = ('name', '_service', '_generation')
+
+    def __init__(self, name: str):
+        self.name = name
+        self._service = None
+        self._generation = -1
+
+    def get(self) -> 'Service':
+        if self._generation != ServiceLocator._generation:
+            self._service = get_service(self.name)
+            self._generation = ServiceLocator._generation
+        return self._service
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        if self._generation != ServiceLocator._generation:
+            self._service = get_service(self.name)
+            self._generation = ServiceLocator._generation
+        return self._service
+
 class NullService:
     def __init__(self, name: str, attr_path: str = None):
         self._name = name
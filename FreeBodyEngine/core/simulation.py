@@ -0,0 +1,105 @@
+"""Runs many headless scene simulations in parallel across processes."""
+
+import time
+import multiprocessing
+from dataclasses import dataclass
+from typing import Callable, Iterator, Any
+
+from FreeBodyEngine import set_flag, register_service, _set_main, _get_pre_flags, HEADLESS
+from FreeBodyEngine.core.main import Main
+from FreeBodyEngine.core.scene import Scene, SceneManager, add_scene, set_scene
+from FreeBodyEngine.core.time import CooldownManager
+
+
+@dataclass
+class SimulationResult:
+    index: int
+    ticks: int
+    elapsed: float
+    result: Any = None
+
+
+@dataclass
+class BatchReport:
+    results: list[SimulationResult]
+    ticks: int
+    elapsed: float
+
+    @property
+    def ticks_per_second(self) -> float:
+        """Aggregate throughput across every worker."""
+        return self.ticks / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _run_simulation(job: tuple) -> SimulationResult:
+    index, scene_factory, ticks, collect, flags = job
+
+    # every job gets a fresh main object. A worker can hold the previous job's main, or a copy of the parent's when
+    # it was forked, so it is cleared first and the flags are set as pre flags the new main is created with
+    _set_main(None)
+    pre_flags = _get_pre_flags()
+    pre_flags.clear()
+    for key, value in flags.items():
+        set_flag(key, value)
+    set_flag(HEADLESS, True)
+
+    main = Main()
+    register_service(SceneManager())
+    register_service(CooldownManager())
+
+    scene: Scene = scene_factory(index)
+    add_scene(scene)
+    set_scene(scene.name)
+
+    start = time.perf_counter()
+    stepped = main.step(ticks)
+    elapsed = time.perf_counter() - start
+
+    result = collect(scene) if collect else None
+    return SimulationResult(index, stepped, elapsed, result)
+
+
+class BatchRunner:
+    """
+    Runs independent headless scenes on a process pool, each worker boots its own Main object.
+
+    The scene factory and collect function are sent to the workers, so they must be picklable (defined at module level).
+
+    :param scene_factory: Called with the simulation index, returns the Scene to simulate.
+    :type scene_factory: Callable[[int], Scene]
+    :param collect: Called with the scene after stepping, its return value is sent back to the runner.
+    :type collect: Callable[[Scene], Any]
+    :param processes: The number of worker processes, defaults to the cpu count.
+    :type processes: int
+    :param flags: Extra flags set in each worker before its Main object is created.
+    :type flags: dict
+    :param start_method: The multiprocessing start method. Spawned workers don't inherit the parent's main object or its threads (like the logger's writer), scripts using it need an `if __name__ == "__main__"` guard.
+    :type start_method: str
+    """
+    def __init__(self, scene_factory: Callable[[int], Scene], collect: Callable[[Scene], Any] = None, processes: int = None, flags: dict = None, start_method: str = "spawn"):
+        self.scene_factory = scene_factory
+        self.collect = collect
+        self.processes = processes or multiprocessing.cpu_count()
+        self.flags = flags or {}
+        self.start_method = start_method
+
+    def _jobs(self, count: int, ticks: int):
+        return [(i, self.scene_factory, ticks, self.collect, self.flags) for i in range(count)]
+
+    def stream(self, count: int, ticks: int) -> Iterator[SimulationResult]:
+        """Runs `count` simulations for `ticks` ticks each, yielding results as soon as each one finishes."""
+        if count <= 0:
+            return
+
+        with multiprocessing.get_context(self.start_method).Pool(min(self.processes, count)) as pool:
+            for result in pool.imap_unordered(_run_simulation, self._jobs(count, ticks)):
+                yield result
+
+    def run(self, count: int, ticks: int) -> BatchReport:
+        """Runs `count` simulations for `ticks` ticks each and waits for all of them."""
+        start = time.perf_counter()
+        results = list(self.stream(count, ticks))
+        elapsed = time.perf_counter() - start
+
+        results.sort(key=lambda r: r.index)
+        return BatchReport(results, sum(r.ticks for r in results), elapsed)
@@ -4,18 +4,20 @@ from FreeBodyEngine.core.tilemap.chunk import Chunk
 from FreeBodyEngine.core.tilemap import _NUM_TILE_VALS
 from FreeBodyEngine.core.node import Node2D
 from FreeBodyEngine import get_service
+from FreeBodyEngine.core.service import ServiceRef
 from FreeBodyEngine.utils import fbnjit
 from fbusl.injector import Injector
 from FreeBodyEngine.graphics.texture import TextureStack
 from FreeBodyEngine.utils import load_texture_stack
 
 from typing import TYPE_CHECKING
-from FreeBodyEngine.graphics.mesh import AttributeType, BufferUsage
+from FreeBodyEngine.graphics.mesh import AttributeType, AttributeFormat, BufferUsage
 import numpy as np
 from numba import types
 
 if TYPE_CHECKING:
     from FreeBodyEngine.core.tilemap.tilemap import Tilemap
+    from FreeBodyEngine.graphics.mesh import Mesh
 
 chunk_mesh_sig = types.Tuple((types.float32[:, :], types.float32[:, :], types.uint32[:]))(types.uint8[:], types.int32, types.int32)
 
@@ -66,11 +68,14 @@ def generate_chunk_mesh(chunk_data: np.ndarray, tile_size: int, chunk_size: int)
 
 
 class TilemapRenderer(Node2D):
+    renderer = ServiceRef('renderer')
+
     def __init__(self, position: Vector, rotation: float, scale: Vector):
         super().__init__(position, rotation, scale)
         self.parental_requirement = "Tilemap"
         self.parent: 'Tilemap'
         self.texture_paths: list[str] = []
+        self._meshes: dict[tuple, 'Mesh'] = {} # (layer, chunk position) -> the mesh drawn last frame
         
     def on_initialize(self):
         self.texture: TextureStack = None
@@ -92,17 +97,27 @@ class TilemapRenderer(Node2D):
         return path_map
 
     def draw(self, camera):
+        renderer = self.renderer
         for layer in self.parent.layers:
             for chunk_pos in self.parent.layers[layer].chunks:
                 chunk = self.parent.layers[layer].chunks[chunk_pos]
 
                 vertices, uvs, indices = generate_chunk_mesh(chunk.tiles, self.parent.tile_size, self.parent.chunk_size)
-                mesh = get_service('renderer').get_mesh_class()(attributes={'vertices': (AttributeType.VEC4, vertices), 'uvs': (AttributeType.VEC2, uvs)}, indices=indices, usage=BufferUsage.DYNAMIC)
+                mesh = renderer.get_mesh_class()(attributes={'vertices': (AttributeType.VEC4, vertices), 'uvs': (AttributeType.VEC2, uvs, AttributeFormat.UNORM8)}, indices=indices, usage=BufferUsage.DYNAMIC)
+                old_mesh = self._meshes.get((layer, chunk_pos))
+                if old_mesh is not None:
+                    old_mesh.destroy()
+                self._meshes[(layer, chunk_pos)] = mesh
                 self.material.shader.set_uniform('chunk_pos', (chunk.position.x, chunk.position.y))
                 if self.texture:
                     self.material.shader.set_uniform('textures', self.texture)
 
-                get_service("renderer").draw_mesh(mesh, self.material, self.world_transform, camera)
+                renderer.draw_mesh(mesh, self.material, self.world_transform, camera)
+
+    def on_kill(self):
+        for mesh in self._meshes.values():
+            mesh.destroy()
+        self._meshes.clear()
 
 
 class TilemapInjector(Injector):
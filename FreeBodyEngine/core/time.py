@@ -1,11 +1,64 @@
 import time
+from collections import deque
+import numpy as np
 from FreeBodyEngine import delta, physics_delta, warning, get_main, register_service_update, unregister_service_update, get_service, service_exists
 from functools import wraps
-from FreeBodyEngine.core.service import Service
+from FreeBodyEngine.core.service import Service, ServiceRef
+
+
+class FrameStats:
+    """
+    Rolling statistics over the last `capacity` frame times (in seconds).
+
+    Samples are stored in a preallocated ring buffer and `sample` writes its results into the
+    object's attributes, so a debug overlay can poll it every frame without allocating.
+    """
+    def __init__(self, capacity: int = 240):
+        self.capacity = capacity
+        self._samples = np.zeros(capacity, dtype=np.float64)
+        self._scratch = np.zeros(capacity, dtype=np.float64)
+        self._index = 0
+        self.count = 0
+
+        self.min = 0.0
+        self.max = 0.0
+        self.mean = 0.0
+        self.stddev = 0.0
+        self.one_percent_low = 0.0 # fps of the slowest 1% of frames
+
+    def push(self, frame_time: float):
+        self._samples[self._index] = frame_time
+        self._index = (self._index + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def clear(self):
+        self._index = 0
+        self.count = 0
+
+    def sample(self) -> 'FrameStats':
+        """Recomputes the statistics in place and returns self."""
+        count = self.count
+        if count == 0:
+            return self
+
+        samples = self._samples[:count]
+        self.min = float(samples.min())
+        self.max = float(samples.max())
+        self.mean = float(samples.mean())
+        self.stddev = float(samples.std())
+
+        worst = max(1, count // 100)
+        scratch = self._scratch[:count]
+        scratch[:] = samples
+        scratch.partition(count - worst)
+        slowest = float(scratch[count - worst:].mean())
+        self.one_percent_low = 1 / slowest if slowest > 0 else 0.0
+        return self
 
 
 class Time:
-    def __init__(self):
+    def __init__(self, frame_stats_capacity: int = 240):
         self._start_time = time.time()
         self._last_time = self._start_time
         self.delta_time = 0.0
@@ -13,8 +66,11 @@ class Time:
         self.time_scale = 1.0
         self.total_time = 0.0
         self.frame_count = 0
-        self._frame_times = []
-        self._tick_times = []
+        self._frame_times: deque[float] = deque()
+        self._tick_times: deque[float] = deque()
+        self._last_frame_time = None
+        self.frame_stats = FrameStats(frame_stats_capacity)
+        self.virtual = False # when set the clock only moves through `advance`
 
     def get_time(self):
         return self.total_time
@@ -24,25 +80,37 @@ class Time:
 
     def get_tps(self):
         return len(self._tick_times)
-    
-    def frame(self):
-        current_time = time.time()
-        
-        self._frame_times.append(current_time)
+
+    def get_frame_stats(self) -> FrameStats:
+        """Returns the frame time statistics, recomputed for the current window."""
+        return self.frame_stats.sample()
+
+    def _now(self):
+        if self.virtual:
+            return self._start_time + self.total_time
+        return time.time()
+
+    def _push_window(self, window: deque, current_time: float):
+        window.append(current_time)
         one_second_ago = current_time - 1.0
-        while self._frame_times and self._frame_times[0] < one_second_ago:
-            self._frame_times.pop(0)
+        while window[0] < one_second_ago:
+            window.popleft()
+
+    def frame(self):
+        current_time = self._now()
+
+        if self._last_frame_time is not None:
+            self.frame_stats.push(current_time - self._last_frame_time)
+        self._last_frame_time = current_time
+
+        self._push_window(self._frame_times, current_time)
 
     def tick(self):
-        current_time = time.time()
-        
-        self._tick_times.append(current_time)
-        one_second_ago = current_time - 1.0
-        while self._tick_times and self._tick_times[0] < one_second_ago:
-            self._tick_times.pop(0)
+        self._push_window(self._tick_times, self._now())
 
     def update(self):
         current_time = time.time()
+        self.virtual = False
 
         raw_delta = current_time - self._last_time
 
@@ -56,6 +124,17 @@ class Time:
         if self.delta_time > 0.05:
             warning(f'Delta time spike: {self.delta_time}')
 
+    def advance(self, dt: float):
+        """Advances the clock by a fixed amount of seconds without reading the wall clock."""
+        self.virtual = True
+
+        self.unscaled_delta_time = dt
+        self.delta_time = dt * self.time_scale
+        self.total_time += dt
+        self.frame_count += 1
+
+_cooldown_manager = ServiceRef('cooldown_manager')
+
 class CooldownManager(Service):
     def __init__(self):
         super().__init__('cooldown_manager')
@@ -83,9 +162,9 @@ def cooldown(seconds: float):
     def decorator(method):
 
         def wrapper(self, *args, **kwargs):
-            if service_exists('cooldown_manager'):
+            manager = _cooldown_manager.get()
+            if manager:
                 id_ = id(self)
-                manager = get_service('cooldown_manager')
 
                 if id_ in manager.cooldowns:
                     if manager.cooldowns[id_] <= 0:
@@ -107,7 +186,7 @@ def physics_cooldown(seconds: float):
         def wrapper(self, *args, **kwargs):
             id_ = id(self)
 
-            manager = get_service('cooldown_manager')
+            manager = _cooldown_manager.get()
             if id_ in manager.physics_cooldowns:
                 if manager.physics_cooldowns[id_] <= 0:
                     return method(self, *args, **kwargs)
@@ -26,17 +26,26 @@ class UpdateCoordinator:
     def unregister(self, phase: Literal["early", 'physics', "update", "draw", "late"], callback: Callable):
         self._phases[phase] = [(p, cb) for (p, cb) in self._phases[phase] if cb != callback]
 
-    def update(self):
+    def _physics_tick(self):
+        for _, callback in self._phases['physics']:
+            callback()
+        self.time.tick()
+
+    def update(self, draw: bool = True, physics_ticks: int = None):
+        """
+        :param physics_ticks: Runs exactly this many physics ticks instead of the ones owed by the scaled delta time.
+        """
         for _, callback in self._phases['early']:
             callback()
 
-        self.physics_accumulator += self.time.delta_time
-        while self.physics_accumulator >= self.physics_timestep:
-            for _, callback in self._phases['physics']:
-                callback()
-            
-            self.physics_accumulator -= self.physics_timestep
-            self.time.tick()
+        if physics_ticks is None:
+            self.physics_accumulator += self.time.delta_time
+            while self.physics_accumulator >= self.physics_timestep:
+                self.physics_accumulator -= self.physics_timestep
+                self._physics_tick()
+        else:
+            for _ in range(physics_ticks):
+                self._physics_tick()
 
         self.update_accumulator += self.time.delta_time
         if self.update_accumulator >= self.update_timestep:
@@ -44,8 +53,9 @@ class UpdateCoordinator:
                 callback()
             
 
-            for _, callback in self._phases['draw']:
-                callback()
+            if draw:
+                for _, callback in self._phases['draw']:
+                    callback()
 
             self.update_accumulator -= self.update_timestep
             self.time.frame()
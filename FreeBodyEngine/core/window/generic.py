@@ -23,20 +23,21 @@ class Window(Service):
     def __init__(self, size: tuple[int, int], title: str):
         super().__init__('window')
         self.window_type = None
+        self.title = title # the title the window was created with
 
     def on_initialize(self):
         register_service_update('early', self.update)
         register_service_update('late', self.draw)
 
         register_event_category('window')
-        register_event(WINDOW_RESIZE, 'window')
+        register_event(WINDOW_RESIZE, 'window', coalesce=True)
 
     def on_destroy(self):
         unregister_service_update('early', self.update)
         unregister_service_update('late', self.draw)
 
-        unregister_event_category('window')
         unregister_event(WINDOW_RESIZE)
+        unregister_event_category('window')
 
     @property
     @abstractmethod
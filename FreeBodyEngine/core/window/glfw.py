@@ -5,7 +5,7 @@ from typing import TYPE_CHECKING
 from FreeBodyEngine.core.input import Key, KeyCallbackType
 from FreeBodyEngine.math import Vector
 from FreeBodyEngine.core.camera import Camera
-from FreeBodyEngine import emit_event
+from FreeBodyEngine import emit_event, emit_event_deferred
 from FreeBodyEngine import get_flag, DEVMODE, QUIT, error, get_main, get_service, get_time
 import numpy
 
@@ -181,7 +181,7 @@ class GLFWWindow(Window):
         return glfw.get_window_size(self._window)
 
     def resize(self, window, width, height):
-        emit_event(WINDOW_RESIZE, (width, height))
+        emit_event_deferred(WINDOW_RESIZE, (width, height))
 
     @size.setter
     def size(self, new: tuple[int, int]):
@@ -1,5 +1,5 @@
 from FreeBodyEngine.utils import abstractmethod
-from FreeBodyEngine import emit_event
+from FreeBodyEngine import emit_event_deferred
 from FreeBodyEngine.core.window import Window, Cursor, WINDOW_RESIZE
 from FreeBodyEngine.core.window.win32cursor import build_cursor_from_pil
 from typing import TYPE_CHECKING, Union, Literal
@@ -87,7 +87,7 @@ class Win32Window(Window):
             height = rect[3] - rect[1]
             size = (width, height)
             
-            emit_event(WINDOW_RESIZE, size)
+            emit_event_deferred(WINDOW_RESIZE, size)
 
         return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
 
@@ -8,6 +8,9 @@ from FreeBodyEngine.graphics import sprite
 from FreeBodyEngine.graphics import gl33
 from FreeBodyEngine.graphics import pbr
 from FreeBodyEngine.graphics import pipeline
+from FreeBodyEngine.graphics import render_graph
+from FreeBodyEngine.graphics import profiler
+from FreeBodyEngine.graphics import dynamic_resolution
 from FreeBodyEngine.graphics import model
 
 import sys
@@ -32,4 +35,4 @@ def get_renderer() -> type[renderer.Renderer]:
     
 
 
-__all__ = ["color", "mesh", "material", "renderer", "pipeline", "image", 'pbr', "gl33", 'sprite', 'model']
+__all__ = ["color", "mesh", "material", "renderer", "pipeline", "image", 'pbr', "gl33", 'sprite', 'model', 'render_graph', 'profiler', 'dynamic_resolution']
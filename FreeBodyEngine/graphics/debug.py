@@ -1,11 +1,13 @@
 """Visual debuging nodes."""
 
-from FreeBodyEngine import get_service
+from FreeBodyEngine.core.service import ServiceRef
 from FreeBodyEngine.utils import load_material
 from FreeBodyEngine.core.node import Node2D
 from FreeBodyEngine.graphics.mesh import Mesh
 from FreeBodyEngine.graphics.renderer import Renderer
 
+_renderer = ServiceRef('renderer')
+
 class Debug2D(Node2D):
     def __init__(self, mesh, material):
         super().__init__()
@@ -14,8 +16,8 @@ class Debug2D(Node2D):
 
 class RectangleColliderDebug(Debug2D):
     def __init__(self):
-        super().__init__(get_service('renderer').mesh_class.generate_quad(), load_material('engine/debug/debug.fbmat'))
+        super().__init__(_renderer.get().mesh_class.generate_quad(), load_material('engine/debug/debug.fbmat'))
 
 class CircleColliderDebug(Debug2D):
     def __init__(self):
-        super().__init__(get_service('renderer').mesh_class.generate_circle(0.5), load_material('engine/debug/debug.fbmat'))
+        super().__init__(_renderer.get().mesh_class.generate_circle(0.5), load_material('engine/debug/debug.fbmat'))
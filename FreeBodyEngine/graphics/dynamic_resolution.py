@@ -0,0 +1,81 @@
+"""
+Dynamic resolution scaling, lowers the render scale when the GPU can't keep up with the frame budget and raises it
+again once there is headroom.
+
+GPU time is assumed to grow with the number of pixels rendered, so the frame time at a new scale is estimated from
+the square of the ratio between the scales. Two things keep the scale from oscillating:
+    hysteresis  the scale is lowered above the target frame time but only raised below `raise_threshold` of it
+    cooldown    after a change, the averaged frame times are thrown away and the scale is held until the history
+                has refilled with frames rendered at the new scale
+"""
+
+from collections import deque
+import math
+
+# GPU times are read a frame late, the frames right after a change were still rendered at the old scale
+LATENCY_FRAMES = 2
+
+
+class DynamicResolution:
+    """
+    :param target_frame_time: The GPU frame time to stay under in milliseconds.
+    :param min_scale: The lowest render scale.
+    :param max_scale: The highest render scale.
+    :param step: Scales are rounded to multiples of the step, small changes in frame time don't change the scale.
+    :param raise_threshold: The fraction of the target the frame time must fall below before the scale is raised.
+    :param frames: The number of frames averaged before a decision.
+    """
+    def __init__(self, target_frame_time: float = 1000 / 60, min_scale: float = 0.5, max_scale: float = 1.0, step: float = 0.05, raise_threshold: float = 0.8, frames: int = 30):
+        self.target_frame_time = target_frame_time
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.step = step
+        self.raise_threshold = raise_threshold
+        self.scale = max_scale
+        self.frame_times: deque[float] = deque(maxlen=frames)
+        self._skip = 0
+
+    def _quantize(self, scale: float) -> float:
+        scale = round(math.floor(scale / self.step + 1e-6) * self.step, 6)
+        return min(max(scale, self.min_scale), self.max_scale)
+
+    def update(self, gpu_frame_time: float) -> float:
+        """
+        Adds a frame's GPU time and returns the render scale to use.
+
+        :param gpu_frame_time: The GPU time of the latest frame in milliseconds, frames without a measurement should pass 0.
+        """
+        if gpu_frame_time <= 0:
+            return self.scale
+        if self._skip > 0:
+            self._skip -= 1
+            return self.scale
+
+        self.frame_times.append(gpu_frame_time)
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return self.scale
+
+        average = sum(self.frame_times) / len(self.frame_times)
+        if average > self.target_frame_time:
+            # aim slightly under the target, so the next measurement lands inside the hysteresis band
+            scale = self._quantize(self.scale * math.sqrt(self.target_frame_time * 0.9 / average))
+            if scale >= self.scale:
+                scale = self._quantize(self.scale - self.step)
+        elif average < self.target_frame_time * self.raise_threshold:
+            # raised one step at a time, and only if the estimated frame time at the new scale is still under the target
+            scale = self._quantize(self.scale + self.step)
+            if average * (scale / self.scale) ** 2 > self.target_frame_time * 0.9:
+                return self.scale
+        else:
+            return self.scale
+
+        if scale != self.scale:
+            self.scale = scale
+            self.frame_times.clear()
+            self._skip = LATENCY_FRAMES
+        return self.scale
+
+    def reset(self):
+        self.scale = self.max_scale
+        self.frame_times.clear()
+        self._skip = 0
@@ -21,21 +21,58 @@ class AttachmentFormat(Enum):
 
     DEPTH24_STENCIL8 = auto()
 
+# the bytes each pixel of an attachment uses, 24 bit depth is padded to 32 bits by most drivers
+ATTACHMENT_SIZES = {
+    AttachmentFormat.R8: 1,
+    AttachmentFormat.RGBA8: 4,
+    AttachmentFormat.RGBA16F: 8,
+    AttachmentFormat.RGBA32F: 16,
+    AttachmentFormat.RGB10_A2: 4,
+    AttachmentFormat.DEPTH24: 4,
+    AttachmentFormat.DEPTH32F: 4,
+    AttachmentFormat.STENCIL8: 1,
+    AttachmentFormat.DEPTH24_STENCIL8: 4,
+}
+
 
 class Framebuffer:
     def __init__(self, width, height, attachments: dict[str, tuple[AttachmentType, AttachmentFormat]]):
         self.width = width
         self.height = height
         self.attachments = attachments
+        self.attachment_formats: dict[str, tuple[AttachmentType, AttachmentFormat]] = dict(attachments)
+        self.viewport: tuple[int, int] = (width, height) # the bottom left region that is rendered to and drawn
+
+    def set_viewport(self, size: tuple[int, int]):
+        """Renders to and draws only the bottom left region of the attachments, without reallocating them."""
+        self.viewport = (max(1, min(int(size[0]), self.width)), max(1, min(int(size[1]), self.height)))
+
+    def get_size(self) -> int:
+        """The estimated bytes of video memory used by the attachments."""
+        return sum(self.width * self.height * ATTACHMENT_SIZES[att_format] for _, att_format in self.attachment_formats.values())
+
+    @abstractmethod
+    def destroy(self):
+        """Deletes the framebuffer and its attachments."""
+        pass
 
     @abstractmethod
     def resize(self, size: tuple[int, int]):
-        """Changes the size of the framebuffer."""
+        """Changes the size of the framebuffer, reallocating the attachments. Resets the viewport to the new size."""
+        pass
+
+    @abstractmethod
+    def set_draw_buffers(self, attachments: list[str | None]):
+        """
+        Sets the attachment each fragment shader output location writes to, by default every color attachment in order.
+
+        :param attachments: The attachment of each output location, None discards the output.
+        """
         pass
 
     @abstractmethod
     def draw(self, attachment, size: tuple[int,int] = None):
-        """Draws the selected attachment to the currently bound framebuffer."""
+        """Draws the viewport of the selected attachment to the currently bound framebuffer, scaled to the size."""
         pass
 
     @abstractmethod
@@ -1,7 +1,13 @@
 from OpenGL.GL import *
 from FreeBodyEngine.graphics.buffer import Buffer
+from FreeBodyEngine.graphics.resources import ResourceType, get_resource_registry
+from FreeBodyEngine.graphics.profiler import get_render_stats
+from functools import partial
 import numpy as np
 
+def _delete_buffer(ubo: int):
+    glDeleteBuffers(1, [ubo])
+
 class UBOBuffer(Buffer):
     """The OpenGL 3.3 implementation of the buffer class."""
     def __init__(self, data: np.ndarray):
@@ -14,8 +20,10 @@ class UBOBuffer(Buffer):
         glBufferData(GL_UNIFORM_BUFFER, self.buffer_size, None, GL_DYNAMIC_DRAW) 
     
         glBufferSubData(GL_UNIFORM_BUFFER, 0, self.buffer_size, self.data)
+        get_render_stats().count_buffer_upload(self.buffer_size)
 
         glBindBuffer(GL_UNIFORM_BUFFER, 0)
+        self.resource = get_resource_registry().register(ResourceType.BUFFER, self.buffer_size, self, partial(_delete_buffer, self.ubo))
 
     def bind(self, point: int):
 
@@ -34,8 +42,10 @@ class UBOBuffer(Buffer):
         if new_size != self.buffer_size:
             glBufferData(GL_UNIFORM_BUFFER, new_size, None, GL_DYNAMIC_DRAW)
             self.buffer_size = new_size
+            get_resource_registry().resize(self.resource, new_size)
 
         glBufferSubData(GL_UNIFORM_BUFFER, 0, new_size, new_data)
+        get_render_stats().count_buffer_upload(new_size)
         glBindBuffer(GL_UNIFORM_BUFFER, 0)
 
     def get_data(self):
@@ -49,7 +59,9 @@ class UBOBuffer(Buffer):
     def update(self, data: np.ndarray, offset: int = 0):
         glBindBuffer(GL_UNIFORM_BUFFER, self.ubo)
         glBufferSubData(GL_UNIFORM_BUFFER, offset, data.nbytes, data)
+        get_render_stats().count_buffer_upload(data.nbytes)
         glBindBuffer(GL_UNIFORM_BUFFER, 0)
 
     def destroy(self):
-        glDeleteBuffers(1, [self.ubo])
\ No newline at end of file
+        if get_resource_registry().release(self.resource):
+            _delete_buffer(self.ubo)
\ No newline at end of file
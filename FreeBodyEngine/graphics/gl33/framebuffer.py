@@ -1,4 +1,7 @@
 from FreeBodyEngine.graphics.framebuffer import Framebuffer, AttachmentFormat, AttachmentType
+from FreeBodyEngine.graphics.resources import ResourceType, get_resource_registry
+from FreeBodyEngine import error
+from functools import partial
 from OpenGL.GL import *
 
 
@@ -33,6 +36,13 @@ GL_ATTACHMENT_TYPE = {
 }
 
 
+def _delete_framebuffer(fbo: int, textures: dict[str, int], renderbuffers: list[int]):
+    for tex in textures.values():
+        glDeleteTextures(1, [tex])
+    for renderbuffer in renderbuffers:
+        glDeleteRenderbuffers(1, [renderbuffer])
+    glDeleteFramebuffers(1, [fbo])
+
 
 class GLFramebuffer(Framebuffer):
     def __init__(self, width, height, attachments, transparent=False):
@@ -40,6 +50,8 @@ class GLFramebuffer(Framebuffer):
         self.fbo = glGenFramebuffers(1)
         self.textures = {}
         self._attachments = attachments.copy()
+        self._renderbuffers: list[int] = [] # kept in sync with `depth_renderbuffer`, shared with the leak release callback
+        self._draw_buffers: list[str | None] = None # set by `set_draw_buffers`, otherwise every color attachment in order
 
         glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
 
@@ -107,6 +119,10 @@ class GLFramebuffer(Framebuffer):
 
         glBindFramebuffer(GL_FRAMEBUFFER, 0)
 
+        if hasattr(self, "depth_renderbuffer"):
+            self._renderbuffers.append(self.depth_renderbuffer)
+        self.resource = get_resource_registry().register(ResourceType.FRAMEBUFFER, self.get_size(), self, partial(_delete_framebuffer, self.fbo, self.textures, self._renderbuffers))
+
     def _draw_depth_texture(tex, size):
         pass
 
@@ -115,7 +131,7 @@ class GLFramebuffer(Framebuffer):
         if attachment not in self.attachments:
             raise ValueError(f"No attachment named '{attachment}'")
 
-        size = (self.width, self.height) if size is None else size
+        size = self.viewport if size is None else size
         tex = self.textures.get(attachment)
 
         if self._attachments[attachment][0] == AttachmentType.DEPTH:
@@ -128,10 +144,11 @@ class GLFramebuffer(Framebuffer):
         glReadBuffer(attachment_enum)
 
         glBindFramebuffer(GL_DRAW_FRAMEBUFFER, 0)
+        # scaled viewports are upscaled with linear filtering
         glBlitFramebuffer(
-            0, 0, self.width, self.height,
+            0, 0, self.viewport[0], self.viewport[1],
             0, 0, size[0], size[1],
-            GL_COLOR_BUFFER_BIT, GL_NEAREST
+            GL_COLOR_BUFFER_BIT, GL_NEAREST if tuple(size) == self.viewport else GL_LINEAR
         )
 
         glBindFramebuffer(GL_READ_FRAMEBUFFER, 0)
@@ -145,6 +162,7 @@ class GLFramebuffer(Framebuffer):
 
     def resize(self, size: tuple[int, int]):
         self.width, self.height = size
+        self.viewport = (self.width, self.height)
 
         glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
 
@@ -190,7 +208,9 @@ class GLFramebuffer(Framebuffer):
                 elif att_type == AttachmentType.DEPTH_STENCIL:
                     glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_STENCIL_ATTACHMENT, GL_RENDERBUFFER, self.depth_renderbuffer)
 
-        if draw_buffers:
+        if self._draw_buffers is not None:
+            self._apply_draw_buffers()
+        elif draw_buffers:
             glDrawBuffers(len(draw_buffers), draw_buffers)
         else:
             glDrawBuffer(GL_NONE)
@@ -202,9 +222,30 @@ class GLFramebuffer(Framebuffer):
 
         glBindFramebuffer(GL_FRAMEBUFFER, 0)
 
+        if hasattr(self, "depth_renderbuffer"):
+            self._renderbuffers[:] = [self.depth_renderbuffer]
+        get_resource_registry().resize(self.resource, self.get_size())
+
+    def _apply_draw_buffers(self):
+        draw_buffers = [GL_NONE if name is None else self.attachments[name] for name in self._draw_buffers]
+        glDrawBuffers(len(draw_buffers), draw_buffers)
+
+    def set_draw_buffers(self, attachments: list[str | None]):
+        for name in attachments:
+            if name is not None and self.textures.get(name) is None:
+                raise ValueError(f"No color attachment named '{name}'")
+        self._draw_buffers = list(attachments)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        self._apply_draw_buffers()
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    def destroy(self):
+        if get_resource_registry().release(self.resource):
+            _delete_framebuffer(self.fbo, self.textures, self._renderbuffers)
+
     def bind(self):
         glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
-        glViewport(0, 0, self.width, self.height)
+        glViewport(0, 0, self.viewport[0], self.viewport[1])
 
     def unbind(self):
         glBindFramebuffer(GL_FRAMEBUFFER, 0)
\ No newline at end of file
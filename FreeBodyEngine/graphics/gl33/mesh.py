@@ -1,103 +1,147 @@
 from OpenGL.GL import *
-from FreeBodyEngine.graphics.mesh import Mesh, BufferUsage, IndexType, AttributeType, PrimitiveType
+from FreeBodyEngine.graphics.mesh import Mesh, BufferUsage, IndexType, AttributeFormat, PrimitiveType, VertexAttribute, convert_attribute, interleave_attributes
+from FreeBodyEngine.graphics.resources import ResourceType, get_resource_registry
+from FreeBodyEngine.graphics.profiler import get_render_stats
+from functools import partial
 import numpy as np
+import ctypes
+
+USAGE_MAP = {
+    BufferUsage.STATIC: GL_STATIC_DRAW,
+    BufferUsage.DYNAMIC: GL_DYNAMIC_DRAW,
+    BufferUsage.STREAM: GL_STREAM_DRAW
+}
+
+FORMAT_MAP = {
+    AttributeFormat.FLOAT32: GL_FLOAT,
+    AttributeFormat.FLOAT16: GL_HALF_FLOAT,
+    AttributeFormat.UNORM8: GL_UNSIGNED_BYTE,
+    AttributeFormat.SNORM8: GL_BYTE,
+    AttributeFormat.UNORM16: GL_UNSIGNED_SHORT,
+    AttributeFormat.SNORM16: GL_SHORT,
+    AttributeFormat.INT32: GL_INT,
+}
+
+INDEX_TYPE_MAP = {
+    IndexType.UINT16: GL_UNSIGNED_SHORT,
+    IndexType.UINT32: GL_UNSIGNED_INT,
+}
+
+# the key of the vertex buffer in `vbos` when the attributes are interleaved
+INTERLEAVED_BUFFER = "_interleaved"
+
+
+def _delete_mesh_buffers(vao: int, vbos: dict[str, int], ebo: int):
+    for vbo in vbos.values():
+        glDeleteBuffers(1, [vbo])
+    if ebo:
+        glDeleteBuffers(1, [ebo])
+    glDeleteVertexArrays(1, [vao])
 
 
 class GLMesh(Mesh):
     def __init__(self, attributes: dict[str, tuple], indices: np.ndarray = None,
-                 primitive=None, index_type=None, usage=None):
-        super().__init__(attributes, indices, primitive, index_type, usage)
+                 primitive: PrimitiveType = PrimitiveType.TRIANGLES, index_type: IndexType = None,
+                 usage: BufferUsage = BufferUsage.STATIC, interleaved: bool = True, vertex_data: np.ndarray = None):
+        super().__init__(attributes, indices, primitive, index_type, usage, interleaved, vertex_data)
 
         self.vao = glGenVertexArrays(1)
-        self.vbos = {} 
+        self.vbos = {}
         self.ebo = glGenBuffers(1) if indices is not None else None
+        self.gl_index_type = INDEX_TYPE_MAP[self.index_type]
 
         self._render_mode = {
             PrimitiveType.TRIANGLES: GL_TRIANGLES,
             PrimitiveType.TRIANGLE_STRIP: GL_TRIANGLE_STRIP,
             PrimitiveType.TRIANGLE_FAN: GL_TRIANGLE_FAN
         }.get(self.primitive, GL_TRIANGLES)
+        self._buffer_sizes: dict[str, int] = {}
+        self.upload()
+        self.resource = get_resource_registry().register(ResourceType.MESH, self.get_size(), self, partial(_delete_mesh_buffers, self.vao, self.vbos, self.ebo))
 
+    def get_size(self) -> int:
+        """The bytes of video memory used by the vertex and index buffers."""
+        return sum(self._buffer_sizes.values())
 
-        self.upload()
+    def _get_buffer_data(self, attribute_name: str = None) -> np.ndarray:
+        if self.interleaved:
+            if self.vertex_data is not None:
+                return self.vertex_data
+            return interleave_attributes(self.attributes, self.layout, self.stride, self.vertex_count)
+        attribute = next(attribute for attribute in self.layout if attribute.name == attribute_name)
+        return convert_attribute(self.attributes[attribute_name][1], attribute.format)
 
     def _set_attribute_data(self, attribute_name, data):
-        usage_map = {
-            BufferUsage.STATIC: GL_STATIC_DRAW,
-            BufferUsage.DYNAMIC: GL_DYNAMIC_DRAW,
-            BufferUsage.STREAM: GL_STREAM_DRAW
-        }
-        glBindBuffer(GL_ARRAY_BUFFER, self.vbos[attribute_name])
-        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, usage_map.get(self.usage, GL_STATIC_DRAW))
+        if self.interleaved:
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbos[INTERLEAVED_BUFFER])
+        else:
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbos[attribute_name])
+        buffer_data = self._get_buffer_data(attribute_name)
+        glBufferData(GL_ARRAY_BUFFER, buffer_data.nbytes, buffer_data, USAGE_MAP.get(self.usage, GL_STATIC_DRAW))
+        get_render_stats().count_buffer_upload(buffer_data.nbytes)
+        self._buffer_sizes[INTERLEAVED_BUFFER if self.interleaved else attribute_name] = buffer_data.nbytes
+        get_resource_registry().resize(self.resource, self.get_size())
+
+    def _set_attribute_pointer(self, location: int, attribute: VertexAttribute, stride: int, offset: int):
+        glEnableVertexAttribArray(location)
+        glVertexAttribPointer(location, attribute.components, FORMAT_MAP[attribute.format],
+                              GL_TRUE if attribute.normalized else GL_FALSE, stride, ctypes.c_void_p(offset))
 
     def upload(self):
         glBindVertexArray(self.vao)
+        gl_usage = USAGE_MAP.get(self.usage, GL_STATIC_DRAW)
 
-        usage_map = {
-            BufferUsage.STATIC: GL_STATIC_DRAW,
-            BufferUsage.DYNAMIC: GL_DYNAMIC_DRAW,
-            BufferUsage.STREAM: GL_STREAM_DRAW
-        }
-        gl_usage = usage_map.get(self.usage, GL_STATIC_DRAW)
-        
-        location = 0
-        for semantic, (attr_type, data) in self.attributes.items():
+        if self.interleaved:
             vbo = glGenBuffers(1)
-            self.vbos[semantic] = vbo
+            self.vbos[INTERLEAVED_BUFFER] = vbo
+            vertices = self._get_buffer_data()
 
             glBindBuffer(GL_ARRAY_BUFFER, vbo)
-            glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, gl_usage)
-
-            if attr_type == AttributeType.FLOAT:
-                size, gl_type = 1, GL_FLOAT
-            elif attr_type == AttributeType.VEC2:
-                size, gl_type = 2, GL_FLOAT
-            elif attr_type == AttributeType.VEC3:
-                size, gl_type = 3, GL_FLOAT
-            elif attr_type == AttributeType.VEC4:
-                size, gl_type = 4, GL_FLOAT
-
-            elif attr_type == AttributeType.INT:
-                size, gl_type = 1, GL_INT
-            elif attr_type == AttributeType.IVEC2:
-                size, gl_type = 2, GL_INT
-            elif attr_type == AttributeType.IVEC3:
-                size, gl_type = 3, GL_INT
-            elif attr_type == AttributeType.IVEC4:
-                size, gl_type = 4, GL_INT
-            else:
-                raise ValueError(f"Unsupported AttributeType: {attr_type}")
-
-            glEnableVertexAttribArray(location)
-            glVertexAttribPointer(location, size, gl_type, GL_FALSE, 0, None)
-            location += 1
+            glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, gl_usage)
+            self._buffer_sizes[INTERLEAVED_BUFFER] = vertices.nbytes
+            get_render_stats().count_buffer_upload(vertices.nbytes)
+            for location, attribute in enumerate(self.layout):
+                self._set_attribute_pointer(location, attribute, self.stride, attribute.offset)
+        else:
+            for location, attribute in enumerate(self.layout):
+                vbo = glGenBuffers(1)
+                self.vbos[attribute.name] = vbo
+                data = self._get_buffer_data(attribute.name)
 
-        if self.indices is not None:
+                glBindBuffer(GL_ARRAY_BUFFER, vbo)
+                glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, gl_usage)
+                self._buffer_sizes[attribute.name] = data.nbytes
+                get_render_stats().count_buffer_upload(data.nbytes)
+                self._set_attribute_pointer(location, attribute, 0, 0)
 
+        if self.indices is not None:
             glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ebo)
-            if self.index_type == IndexType.UINT16:
-                gl_index_type = GL_UNSIGNED_SHORT
-            else:
-                gl_index_type = GL_UNSIGNED_INT
             glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, gl_usage)
-            self.gl_index_type = gl_index_type
+            self._buffer_sizes["_indices"] = self.indices.nbytes
+            get_render_stats().count_buffer_upload(self.indices.nbytes)
 
         glBindVertexArray(0)
 
     def draw(self):
+        get_render_stats().count_draw(self.triangle_count)
         glBindVertexArray(self.vao)
 
         if self.indices is not None:
             glDrawElements(self._render_mode, len(self.indices), self.gl_index_type, None)
         else:
-            
-            first_attr = next(iter(self.attributes.values()))[1]
-            glDrawArrays(self._render_mode, 0, len(first_attr) // 3)
+            glDrawArrays(self._render_mode, 0, self.vertex_count)
+        glBindVertexArray(0)
+
+    def draw_instanced(self, instances: int):
+        get_render_stats().count_draw(self.triangle_count, instances)
+        glBindVertexArray(self.vao)
+
+        if self.indices is not None:
+            glDrawElementsInstanced(self._render_mode, len(self.indices), self.gl_index_type, None, instances)
+        else:
+            glDrawArraysInstanced(self._render_mode, 0, self.vertex_count, instances)
         glBindVertexArray(0)
 
     def destroy(self):
-        for vbo in self.vbos.values():
-            glDeleteBuffers(1, [vbo])
-        if self.ebo:
-            glDeleteBuffers(1, [self.ebo])
-        glDeleteVertexArrays(1, [self.vao])
\ No newline at end of file
+        if get_resource_registry().release(self.resource):
+            _delete_mesh_buffers(self.vao, self.vbos, self.ebo)
@@ -0,0 +1,74 @@
+from OpenGL.GL import *
+
+# the number of frames of queries in flight, results are read a frame after they were issued so the CPU never waits on the GPU
+QUERY_FRAMES = 2
+
+
+class GLTimerQueries:
+    """
+    Times nested scopes of GPU work with GL_TIME_ELAPSED queries. Only one GL_TIME_ELAPSED query can run at a time,
+    so each scope is split into segments at the scopes nested inside it and every segment counts toward all the
+    scopes open while it ran.
+
+    Queries are double buffered, the results of a frame are read at the end of the next one, when the GPU has almost
+    always finished with them.
+    """
+    def __init__(self):
+        self.frames: list[list[tuple[tuple[str, ...], int]]] = [[] for _ in range(QUERY_FRAMES)] # (open scopes, query) of each segment
+        self.frame = 0
+        self.times: dict[str, float] = {} # milliseconds, from the latest frame whose results were ready
+        self.stack: list[str] = []
+        self._free: list[int] = []
+
+    def _begin_segment(self):
+        query = self._free.pop() if self._free else glGenQueries(1)
+        glBeginQuery(GL_TIME_ELAPSED, query)
+        self.frames[self.frame].append((tuple(self.stack), query))
+
+    def begin(self, name: str):
+        if self.stack:
+            glEndQuery(GL_TIME_ELAPSED)
+        self.stack.append(name)
+        self._begin_segment()
+
+    def end(self):
+        if not self.stack:
+            return
+        glEndQuery(GL_TIME_ELAPSED)
+        self.stack.pop()
+        if self.stack:
+            self._begin_segment()
+
+    def end_frame(self) -> bool:
+        """
+        Closes any open scope, moves on to the next frame and reads the results of the queries issued a frame ago.
+        Returns whether new results were read, `times` keeps the previous results otherwise.
+        """
+        while self.stack:
+            self.end()
+        self.frame = (self.frame + 1) % QUERY_FRAMES
+        pending = self.frames[self.frame]
+        if not pending:
+            return False
+
+        # queries finish in order, if the last one isn't ready the frame is dropped rather than stalling
+        ready = bool(glGetQueryObjectuiv(pending[-1][1], GL_QUERY_RESULT_AVAILABLE))
+        if ready:
+            times = {}
+            for scopes, query in pending:
+                elapsed = int(glGetQueryObjectui64v(query, GL_QUERY_RESULT)) / 1e6
+                for name in dict.fromkeys(scopes):
+                    times[name] = times.get(name, 0.0) + elapsed
+            self.times = times
+
+        self._free.extend(query for _, query in pending)
+        pending.clear()
+        return ready
+
+    def destroy(self):
+        queries = self._free + [query for frame in self.frames for _, query in frame]
+        if queries:
+            glDeleteQueries(len(queries), queries)
+        self._free.clear()
+        for frame in self.frames:
+            frame.clear()
@@ -9,6 +9,10 @@ from FreeBodyEngine.graphics.texture import Texture
 from FreeBodyEngine.graphics.material import Material
 from FreeBodyEngine import DEVMODE, get_flag
 from FreeBodyEngine.graphics.gl33.buffer import UBOBuffer
+from FreeBodyEngine.graphics.gl33.query import GLTimerQueries
+from FreeBodyEngine.graphics.gl33.shader import create_shader_program
+from FreeBodyEngine.graphics.profiler import FRAME_SCOPE, FRAME_BEGIN_PRIORITY, FRAME_END_PRIORITY
+from FreeBodyEngine.graphics.resources import ResourceType, GLOBAL_SCOPE
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -17,7 +21,7 @@ if TYPE_CHECKING:
     from FreeBodyEngine.graphics.material import Material
     from FreeBodyEngine.math import Vector
 
-from FreeBodyEngine import get_service
+from FreeBodyEngine import get_service, register_service_update, unregister_service_update
 
 import numpy as np
 
@@ -26,6 +30,25 @@ from OpenGL.GL import *
 from OpenGL.GL.ARB.debug_output import * # for debug_callback
 
 
+LINE_VERTEX_SHADER = """
+#version 330 core
+layout(location = 0) in vec2 position;
+
+void main() {
+    gl_Position = vec4(position, 0.0, 1.0);
+}
+"""
+
+LINE_FRAGMENT_SHADER = """
+#version 330 core
+uniform vec4 line_color;
+out vec4 color;
+
+void main() {
+    color = line_color;
+}
+"""
+
 @GLDEBUGPROC
 def debug_callback(source, type, id, severity, length, message, userParam):
     msg = ctypes.string_at(message, length).decode('utf-8')
@@ -41,6 +64,8 @@ class GL33Renderer(Renderer):
 
         self.mesh_class = GLMesh
         self.image_class = GLImage
+        self._line_vao = None
+        self._line_vbo = None
         
     def on_initialize(self):
         self.texture_manager = GLTextureManager()
@@ -55,6 +80,25 @@ class GL33Renderer(Renderer):
         glDebugMessageCallback(debug_callback, None)
         width, height = self.window.size
         glViewport(0, 0, width, height)
+
+        self.timers = GLTimerQueries()
+        register_service_update('late', self.resources.collect)
+        register_service_update('draw', self.begin_frame, FRAME_BEGIN_PRIORITY)
+        register_service_update('draw', self.end_frame, FRAME_END_PRIORITY)
+
+    def on_destroy(self):
+        unregister_service_update('late', self.resources.collect)
+        unregister_service_update('draw', self.begin_frame)
+        unregister_service_update('draw', self.end_frame)
+        self.timers.destroy()
+
+    def begin_frame(self):
+        self.stats.begin_frame()
+        self.timers.begin(FRAME_SCOPE)
+
+    def end_frame(self):
+        # frames whose query results weren't ready yet get no GPU times, rather than repeating the previous ones
+        self.stats.end_frame(self.timers.times if self.timers.end_frame() else {})
         
     def create_buffer(self, data):
         return UBOBuffer(data)
@@ -78,6 +122,18 @@ class GL33Renderer(Renderer):
     def create_framebuffer(self, width, height, attachments, **kwargs):
         return GLFramebuffer(width, height, attachments, **kwargs)
 
+    def set_viewport(self, size: tuple[int, int]):
+        glViewport(0, 0, int(size[0]), int(size[1]))
+
+    def begin_gpu_timer(self, name: str):
+        self.timers.begin(name)
+
+    def end_gpu_timer(self):
+        self.timers.end()
+
+    def get_gpu_times(self) -> dict[str, float]:
+        return self.timers.times
+
     def clear(self, color: 'Color'):
         glClearColor(*color.float_normalized_a)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
@@ -91,10 +147,7 @@ class GL33Renderer(Renderer):
         material.use(transform, camera)
         material.shader.use()
 
-        glBindVertexArray(mesh.vao)
-        glDrawElementsInstanced(GL_TRIANGLES, len(mesh.indices), GL_UNSIGNED_INT, ctypes.c_void_p(0), instances)
-
-        glBindVertexArray(0)
+        mesh.draw_instanced(instances)
 
     def enable_depth_testing(self):
         glEnable(GL_DEPTH_TEST)
@@ -112,37 +165,46 @@ class GL33Renderer(Renderer):
             if render_mode == "wireframe":
                 glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
             
-        glBindVertexArray(mesh.vao)
-        glDrawElements(GL_TRIANGLES, len(mesh.indices), GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        mesh.draw()
 
         if render_mode != None:
             if render_mode == "wireframe":
                 glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
 
+    def _create_line_buffers(self):
+        self._line_vao = glGenVertexArrays(1)
+        self._line_vbo = glGenBuffers(1)
+        glBindVertexArray(self._line_vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self._line_vbo)
+        glBufferData(GL_ARRAY_BUFFER, 4 * 4, None, GL_DYNAMIC_DRAW)
+
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
         glBindVertexArray(0)
+        self.resources.register(ResourceType.BUFFER, 4 * 4, label="line", scope=GLOBAL_SCOPE)
+        self.line_program = create_shader_program(LINE_VERTEX_SHADER, LINE_FRAGMENT_SHADER)
 
     def draw_line(self, start, end, width, color: 'Color'):
         glLineWidth(width)
         line_vertices = np.array([
-            -start[0], start[1],
+            start[0], start[1],
             end[0], end[1]
         ], dtype=np.float32)
-        vao = glGenVertexArrays(1)
-        vbo = glGenBuffers(1)
-        glBindVertexArray(vao)
-        glBindBuffer(GL_ARRAY_BUFFER, vbo)
-        glBufferData(GL_ARRAY_BUFFER, line_vertices.nbytes, line_vertices, GL_STATIC_DRAW)
 
-        glEnableVertexAttribArray(0)
-        glVertexAttribPointer(0, 2, GL_FLOAT, GL_FALSE, 0, None)
-
-        glBindVertexArray(0)
+        # one buffer is reused by every line instead of creating a new one each call
+        if self._line_vao is None:
+            self._create_line_buffers()
+        glBindBuffer(GL_ARRAY_BUFFER, self._line_vbo)
+        glBufferSubData(GL_ARRAY_BUFFER, 0, line_vertices.nbytes, line_vertices)
+        self.stats.count_buffer_upload(line_vertices.nbytes)
 
         glUseProgram(self.line_program)
 
         glUniform4f(glGetUniformLocation(self.line_program, "line_color"), *color.float_normalized_a)
+        self.stats.count_uniforms()
+        self.stats.count_draw(0)
 
-        glBindVertexArray(vao)
+        glBindVertexArray(self._line_vao)
         glDrawArrays(GL_LINES, 0, 2)
         glBindVertexArray(0)
 
@@ -8,11 +8,12 @@ from FreeBodyEngine import error as fb_error
 from FreeBodyEngine import warning
 from FreeBodyEngine.graphics.gl33.image import Image
 from FreeBodyEngine import get_time
-from FreeBodyEngine.graphics.texture import Texture, TextureStack
+from FreeBodyEngine.graphics.texture import Texture, TextureStack, get_sample_rect
 from FreeBodyEngine.graphics.buffer import Buffer as DataBuffer
 from OpenGL.GL import *
 import numpy as np
 from FreeBodyEngine.graphics.color import Color
+from FreeBodyEngine.graphics.profiler import get_render_stats
 
 from dataclasses import dataclass
 import numpy
@@ -82,9 +83,24 @@ class GLShader(Shader):
             self.uniform_cache[name] = None
         
                 
-    def rebuild(self, injector = ...):
-        super().__init__(self.vertex_source, self.fragment_source, self.generator, injector)
-        self._shader = create_shader_program(self.fbusl_fragment_source, self.fbusl_vertex_source)
+    def rebuild(self, injector = ..., vertex_source: str = None, fragment_source: str = None):
+        if injector is not ...:
+            self.injector = injector
+        self.reload(self.compile_sources(vertex_source, fragment_source))
+
+    def reload(self, compiled):
+        """Links a new program from compiled sources, the current program stays in use if linking fails."""
+        vertex_source, fragment_source, fbusl_vertex_source, fbusl_fragment_source = compiled
+        program = create_shader_program(fbusl_vertex_source, fbusl_fragment_source)
+        glDeleteProgram(self._shader)
+        self._shader = program
+
+        self.vertex_source, self.fragment_source = vertex_source, fragment_source
+        self.fbusl_vertex_source, self.fbusl_fragment_source = fbusl_vertex_source, fbusl_fragment_source
+
+        self.uniforms = {}
+        self.setup_uniforms()
+        self.uniform_cache = {name: None for name in self.uniforms}
 
     def setup_uniforms(self):
         count = glGetProgramiv(self._shader, GL_ACTIVE_UNIFORMS)
@@ -193,6 +209,7 @@ class GLShader(Shader):
 
         if not self.check_val_type(val, gl_type, name):
             return
+        get_render_stats().count_uniforms()
 
         if gl_type == GL_INT:
             glUniform1i(loc, val)
@@ -279,8 +296,10 @@ class GLShader(Shader):
 
     def use(self):
         glUseProgram(self._shader)
+        uploads = 0
         if 'TIME' in self.uniforms:
             glUniform1f(self.uniforms['TIME'].location, get_time())
+            uploads += 1
 
         for name in self.uniforms: # reload texture slots
             if self.uniforms[name].type == GL_SAMPLER_2D:
@@ -289,13 +308,16 @@ class GLShader(Shader):
                     if img != None and isinstance(img, Image):
                         glUniform1i(self.uniforms[name].location, img.texture.use())
                         rect = img.texture.uv_rect
+                        uploads += 1
                     if img != None and isinstance(img, Texture):
                         glUniform1i(self.uniforms[name].location, img.use())
                         rect = img.uv_rect
+                        uploads += 1
                     
                     uv_rect = f"_ENGINE_{name}_uv_rect"
                     if uv_rect in self.uniforms:
-                        glUniform4f(self.uniforms[uv_rect].location, rect[0], rect[1], rect[2], rect[3])
+                        glUniform4f(self.uniforms[uv_rect].location, *get_sample_rect(rect))
+                        uploads += 1
                 else:
                     images = self.uniform_cache[name]
                     locations = []
@@ -307,13 +329,17 @@ class GLShader(Shader):
                                 locations.append(img.use())
                             
                         glUniform1i(self.uniforms[name].location, locations)
+                        uploads += 1
             if self.uniforms[name].type == GL_SAMPLER_2D_ARRAY:
                 stack = self.uniform_cache[name]
                 if stack != None:
                     glUniform1i(self.uniforms[name].location, stack.use())
+                    uploads += 1
                 
                 for i in range(len(stack.uv_rects)):
                     uv_rect = f"_ENGINE_{name}_uv_rect[{i}]"
                     if uv_rect in self.uniforms:
                         loc = i * 4
-                        glUniform4f(self.uniforms[uv_rect].location, stack.uv_rects[0+loc], stack.uv_rects[1+loc], stack.uv_rects[2+loc], stack.uv_rects[3+loc])
\ No newline at end of file
+                        glUniform4f(self.uniforms[uv_rect].location, *get_sample_rect(stack.uv_rects[loc:loc+4]))
+                        uploads += 1
+        get_render_stats().count_uniforms(uploads)
\ No newline at end of file
@@ -1,34 +1,119 @@
-from FreeBodyEngine.graphics.texture import TextureManager, Texture, TextureStack, MAX_TEXTURE_STACK_SIZE
+from FreeBodyEngine.graphics.texture import TextureManager, Texture, TextureStack, MAX_TEXTURE_STACK_SIZE, get_texture_size, open_image, decode_image
+from FreeBodyEngine.graphics.resources import ResourceType, GLOBAL_SCOPE, get_resource_registry
+from FreeBodyEngine.graphics.texture_file import TextureFile, TextureFormat, TextureFilter, decode_level
+from FreeBodyEngine.graphics.profiler import get_render_stats
 from FreeBodyEngine import warning, error
 from OpenGL.GL import *
+from OpenGL.GL.EXT.texture_compression_s3tc import GL_COMPRESSED_RGB_S3TC_DXT1_EXT, GL_COMPRESSED_RGBA_S3TC_DXT5_EXT
+from functools import partial
 import numpy as np
-from PIL import Image
 import uuid
-import io
+
+S3TC_FORMATS = {
+    TextureFormat.BC1: GL_COMPRESSED_RGB_S3TC_DXT1_EXT,
+    TextureFormat.BC3: GL_COMPRESSED_RGBA_S3TC_DXT5_EXT,
+}
 
 class GLTextureManager(TextureManager):
-    def _create_standalone_texture(self, data) -> Texture:
-        """Gets a standalone texture."""
-        img: Image.Image = Image.open(io.BytesIO(data)).transpose(Image.Transpose.FLIP_TOP_BOTTOM).transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-        image_data = np.array(img.convert('RGBA'), dtype=np.uint8)
-        width, height = img.size
+    def __init__(self):
+        super().__init__()
+        self._supports_s3tc: bool = None
+        self.mipmaps: dict[str, bool] = {} # {id, whether the standalone texture has mipmaps}
 
-        tex_id = glGenTextures(1)
-        glBindTexture(GL_TEXTURE_2D, tex_id)
+    def supports_s3tc(self) -> bool:
+        """Whether the driver can sample BC1/BC3 textures, texture files using them are decoded on the CPU otherwise."""
+        if self._supports_s3tc is None:
+            extensions = {glGetStringi(GL_EXTENSIONS, i) for i in range(glGetIntegerv(GL_NUM_EXTENSIONS))}
+            self._supports_s3tc = b"GL_EXT_texture_compression_s3tc" in extensions
+            if not self._supports_s3tc:
+                warning("S3TC texture compression is not supported, compressed textures will be decoded at load time.")
+        return self._supports_s3tc
+
+    def _upload_texture_2d(self, decoded: tuple[np.ndarray, int, int] | TextureFile, mipmaps: bool = True) -> int:
+        """
+        Uploads decoded pixels or a texture file to the bound 2D texture, returns the estimated bytes of video memory used.
+        Texture files bring their own mipmaps, `mipmaps` only applies to decoded pixels.
+        """
+        if isinstance(decoded, TextureFile):
+            return self._upload_texture_file(decoded)
 
+        image_data, width, height = decoded
         glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0,
                      GL_RGBA, GL_UNSIGNED_BYTE, image_data)
-        glGenerateMipmap(GL_TEXTURE_2D)
+        get_render_stats().count_texture_upload(width * height * 4)
+        self._set_mipmaps(mipmaps)
+        return get_texture_size(width, height, mipmaps=mipmaps)
+
+    def _set_mipmaps(self, mipmaps: bool):
+        """Generates the mipmaps of the bound 2D texture, or limits it to the base level so it samples without them."""
+        if mipmaps:
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, 1000) # the GL default
+            glGenerateMipmap(GL_TEXTURE_2D)
+        else:
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, 0)
+
+    def _upload_texture_file(self, texture: TextureFile) -> int:
+        """Uploads the precomputed levels of a texture file as they are stored, without decoding."""
+        compressed = texture.compressed and self.supports_s3tc()
+        size = 0
+        for level, (width, height, data) in enumerate(texture.levels):
+            if compressed:
+                glCompressedTexImage2D(GL_TEXTURE_2D, level, S3TC_FORMATS[texture.format], width, height, 0, len(data), np.frombuffer(data, np.uint8))
+                size += len(data)
+            else:
+                pixels = decode_level(data, width, height, texture.format) if texture.compressed else np.frombuffer(data, np.uint8)
+                glTexImage2D(GL_TEXTURE_2D, level, GL_RGBA8, width, height, 0, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+                size += width * height * 4
+        get_render_stats().count_texture_upload(size)
+
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAX_LEVEL, len(texture.levels) - 1)
+        self._set_filter(texture.filter, texture.mipmaps)
+        return size
+
+    def _set_filter(self, filter: TextureFilter, mipmaps: bool):
+        """Sets the filtering of the bound 2D texture."""
+        nearest = filter == TextureFilter.NEAREST
+        if mipmaps:
+            min_filter = GL_NEAREST_MIPMAP_NEAREST if nearest else GL_LINEAR_MIPMAP_LINEAR
+        else:
+            min_filter = GL_NEAREST if nearest else GL_LINEAR
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, min_filter)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST if nearest else GL_LINEAR)
+
+    def _set_sampling(self, id, filter: TextureFilter, mipmaps: bool):
+        if id not in self.standalone_textures:
+            return
+        glBindTexture(GL_TEXTURE_2D, self.standalone_textures[id])
+        self._set_filter(filter, mipmaps)
+
+        if self.mipmaps.get(id) != mipmaps:
+            self.mipmaps[id] = mipmaps
+            self._set_mipmaps(mipmaps)
+            if mipmaps:
+                # levels that are dropped stay allocated until the texture is deleted, so only generating them changes the size
+                width = glGetTexLevelParameteriv(GL_TEXTURE_2D, 0, GL_TEXTURE_WIDTH)
+                height = glGetTexLevelParameteriv(GL_TEXTURE_2D, 0, GL_TEXTURE_HEIGHT)
+                get_resource_registry().resize(self.resources.get(id), get_texture_size(width, height, mipmaps=True))
+
+    def _upload_standalone_texture(self, decoded, mipmaps: bool = True) -> Texture:
+        """Gets a standalone texture."""
+        tex_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, tex_id)
+        size = self._upload_texture_2d(decoded, mipmaps)
 
         id = self.gen_id()
         self.standalone_textures[id] = tex_id
-        return Texture(self, id, (0, 0, 1, 1))
+        self.mipmaps[id] = mipmaps
+        texture = Texture(self, id, (0, 0, 1, 1))
+        self.resources[id] = get_resource_registry().register(ResourceType.TEXTURE, size, texture, partial(self._delete_collected_texture, id))
+        return texture
+
+    def _replace_texture(self, texture: Texture, decoded):
+        glBindTexture(GL_TEXTURE_2D, self.standalone_textures[texture.id])
+        get_resource_registry().resize(self.resources.get(texture.id), self._upload_texture_2d(decoded, self.mipmaps.get(texture.id, True)))
 
     def _atlas_exists(self, file_path):
-        for atlas in self.atlas_textures: 
-            if atlas[1] == file_path: # file path
-                return True
-        return False
+        return file_path in self.atlas_ids
         
     def _create_texture_stack(self, rects):
         if len(rects) > MAX_TEXTURE_STACK_SIZE:
@@ -39,47 +124,44 @@ class GLTextureManager(TextureManager):
         if len(image_datas) > MAX_TEXTURE_STACK_SIZE:
             error(f'Could not create texture stack because the max size was exceeded, size: {len(image_datas)}, max: {MAX_TEXTURE_STACK_SIZE}')
             return
-        
-        max_width = 0
-        max_height = 0
-        processed_data = []
-
-        loaded_images = []
-
-        for data in image_datas:
-            img = Image.open(data).transpose(Image.Transpose.FLIP_TOP_BOTTOM).transpose(Image.Transpose.FLIP_LEFT_RIGHT).convert('RGBA')
-            loaded_images.append(img)
-            w, h = img.size
-            if w > max_width:
-                max_width = w
-            if h > max_height:
-                max_height = h
-
-        for img in loaded_images:
-            padded_img = Image.new('RGBA', (max_width, max_height), (0, 0, 0, 0))
-            padded_img.paste(img, (0, 0))
-            image_data = np.array(padded_img, dtype=np.uint8)
-            processed_data.append(image_data)  
-
-        layers = len(image_datas)
+
+        # opening only reads the headers, so the layer size is known before anything is decoded
+        images = [open_image(data) for data in image_datas]
+        max_width = max(img.width for img in images)
+        max_height = max(img.height for img in images)
+
+        layers = len(images)
         texture_id = glGenTextures(1)
         
         glBindTexture(GL_TEXTURE_2D_ARRAY, texture_id)
 
         glTexStorage3D(GL_TEXTURE_2D_ARRAY, 1, GL_RGBA8, max_width, max_height, layers)
 
-        for layer, img_data in enumerate(processed_data):
+        # every layer is decoded into the same buffer and uploaded at its own size, smaller layers get their
+        # padding cleared from one shared transparent layer instead of being pasted into a padded copy
+        scratch = np.empty(max_width * max_height * 4, np.uint8)
+        empty_layer = None
+        for layer, img in enumerate(images):
+            width, height = img.size
+            if (width, height) != (max_width, max_height):
+                if empty_layer is None:
+                    empty_layer = np.zeros((max_height, max_width, 4), np.uint8)
+                glTexSubImage3D(GL_TEXTURE_2D_ARRAY, 0, 0, 0, layer, max_width, max_height, 1, GL_RGBA, GL_UNSIGNED_BYTE, empty_layer)
+                get_render_stats().count_texture_upload(empty_layer.nbytes)
+
+            pixels = decode_image(img, scratch[:width * height * 4].reshape(height, width, 4))
             glTexSubImage3D(
                 GL_TEXTURE_2D_ARRAY,
                 0,              # mipmap level
                 0, 0, layer,    # xoffset, yoffset, zoffset (layer index)
-                max_width,
-                max_height,
+                width,
+                height,
                 1,              # depth (1 layer)
                 GL_RGBA,
                 GL_UNSIGNED_BYTE,
-                img_data
+                pixels
             )
+            get_render_stats().count_texture_upload(pixels.nbytes)
 
         glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
         glTexParameteri(GL_TEXTURE_2D_ARRAY, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
@@ -91,36 +173,33 @@ class GLTextureManager(TextureManager):
         texture_stack_id = self.gen_id()
         self.texture_stacks[texture_stack_id] = texture_id
         uv_rects = [(0, 0, 1, 1) for _ in range(layers)]
+        texture_stack = TextureStack(self, texture_stack_id, uv_rects)
+        self.resources[texture_stack_id] = get_resource_registry().register(ResourceType.TEXTURE_STACK, get_texture_size(max_width, max_height, layers),
+                                                                            texture_stack, partial(self._delete_collected_texture, texture_stack_id))
 
-        return TextureStack(self, texture_stack_id, uv_rects)
+        return texture_stack
 
-    def _create_atlas_texture(self, atlas_img, file_path, atlas_data, name):
+    def _create_atlas_texture(self, atlas_img, file_path, atlas_data, name, decoded=None):
         """Gets a texture from an atlas."""
         if not self._atlas_exists(file_path):
-            img: Image.Image = Image.open(io.BytesIO(atlas_img)).transpose(Image.Transpose.FLIP_TOP_BOTTOM).transpose(Image.Transpose.FLIP_LEFT_RIGHT)
-            img_data = np.array(img.convert('RGBA'), dtype=np.uint8)
-            width, height = img.size
             tex_id = glGenTextures(1)
         
             glBindTexture(GL_TEXTURE_2D, tex_id)
-
-            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0,
-                        GL_RGBA, GL_UNSIGNED_BYTE, img_data)
-            glGenerateMipmap(GL_TEXTURE_2D)
+            size = self._upload_texture_2d(decoded or self._decode_image(atlas_img))
 
             id = self.gen_id()
             self.atlas_textures[id] = [tex_id, file_path]
+            self.atlas_ids[file_path] = id
+            self.resources[id] = get_resource_registry().register(ResourceType.TEXTURE, size, label=file_path, scope=GLOBAL_SCOPE) # atlases are cached for the whole program
 
         else:
             id = self.get_atlas_id_from_path(file_path)
+            get_resource_registry().acquire(self.resources.get(id))
 
         return Texture(self, id, atlas_data[name])
 
     def get_atlas_id_from_path(self, file_path: str):
-        for atlas in self.atlas_textures:
-            if self.atlas_textures[atlas][1] == file_path:
-                return atlas
-        return None
+        return self.atlas_ids.get(file_path)
 
     def gen_id(self):
         return uuid.uuid4()
@@ -128,6 +207,7 @@ class GLTextureManager(TextureManager):
     def _use_texture_stack(self, id):
         glActiveTexture(GL_TEXTURE0)
         glBindTexture(GL_TEXTURE_2D_ARRAY, self.texture_stacks[id])
+        get_render_stats().count_texture_bind()
         return 0
 
     def _use_texture(self, id):
@@ -136,10 +216,12 @@ class GLTextureManager(TextureManager):
 
         if id in self.standalone_textures:
             glBindTexture(GL_TEXTURE_2D, self.standalone_textures[id])
+            get_render_stats().count_texture_bind()
             self.current_texture = id
 
         elif id in self.atlas_textures:
             glBindTexture(GL_TEXTURE_2D, self.atlas_textures[id][0])
+            get_render_stats().count_texture_bind()
             self.current_texture = id
         
         else:
@@ -147,5 +229,34 @@ class GLTextureManager(TextureManager):
         
         return 0
 
-    def _delete_texture(self):
-        pass
\ No newline at end of file
+    def _delete_texture(self, id):
+        if id not in self.resources:
+            warning(f"Cannot delete texture with id '{id}' as it doesn't exsist.")
+            return
+
+        if not get_resource_registry().release(self.resources[id]):
+            return
+        del self.resources[id]
+
+        if id in self.standalone_textures:
+            glDeleteTextures(1, [self.standalone_textures.pop(id)])
+            self.mipmaps.pop(id, None)
+        elif id in self.texture_stacks:
+            glDeleteTextures(1, [self.texture_stacks.pop(id)])
+        elif id in self.atlas_textures:
+            tex_id, file_path = self.atlas_textures.pop(id)
+            self.atlas_ids.pop(file_path, None)
+            glDeleteTextures(1, [tex_id])
+
+        if self.current_texture == id:
+            self.current_texture = None
+
+    def _delete_collected_texture(self, id):
+        """Deletes a standalone texture or texture stack whose object was garbage collected, the registry already dropped its resource."""
+        self.resources.pop(id, None)
+        self.mipmaps.pop(id, None)
+        tex_id = self.standalone_textures.pop(id, None) or self.texture_stacks.pop(id, None)
+        if tex_id is not None:
+            glDeleteTextures(1, [tex_id])
+        if self.current_texture == id:
+            self.current_texture = None
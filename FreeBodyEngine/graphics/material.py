@@ -118,11 +118,36 @@ class Material:
         self.properties = self.parse_properties(property_definitions)
         self.property_definitions = property_definitions
 
+        self.injector = injector
+        self.shader_paths = self.get_shader_paths(data)
+        self.shader: Shader = self.load_shader()
+
+    def get_shader_paths(self, data: dict) -> tuple[str, str]:
         shader = data.get('shader', {})
         frag_source = shader.get('frag','engine/shader/default_shader.fbfrag')
         vert_source = shader.get('vert', 'engine/shader/default_shader.fbvert')
+        return vert_source, frag_source
+
+    def load_shader(self) -> Shader:
+        vert_source, frag_source = self.shader_paths
+        return get_service('renderer').load_shader(get_service('files').load_data(vert_source), get_service('files').load_data(frag_source), self.injector)
+
+    def refresh(self, data: dict):
+        """
+        Re-reads the material's data in place, the shader is only reloaded when its source paths changed.
+        Properties missing from the new data keep their current value, like a sprite's image.
+        """
+        properties = self.parse_properties_from(data)
+        for name, value in self.properties.items():
+            properties.setdefault(name, value)
 
-        self.shader: Shader = get_service('renderer').load_shader(get_service('files').load_data(vert_source), get_service('files').load_data(frag_source), injector) 
+        self.data = data
+        self.properties = properties
+
+        shader_paths = self.get_shader_paths(data)
+        if shader_paths != self.shader_paths:
+            self.shader_paths = shader_paths
+            self.shader = self.load_shader()
 
     def __getattribute__(self, name):
         if name not in ('data', 'properties'):
@@ -140,10 +165,14 @@ class Material:
         object.__setattr__(self, name, value)
 
     def parse_properties(self, property_definitions):
+        return self.parse_properties_from(self.data, property_definitions)
+
+    def parse_properties_from(self, material_data: dict, property_definitions=None):
+        property_definitions = self.property_definitions if property_definitions is None else property_definitions
         properties = {}
-        for data in self.data:
+        for data in material_data:
             if data in property_definitions:
-                val = self.data[data]
+                val = material_data[data]
 
                 properties[data] = self.parse_property_val(val, data, property_definitions)
         
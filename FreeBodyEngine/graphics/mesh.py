@@ -23,6 +23,17 @@ class AttributeType(Enum):
     MAT4 = auto()
 
 
+class AttributeFormat(Enum):
+    """How an attribute is stored in the vertex buffer, normalized formats are read as floats in [0, 1] or [-1, 1] by shaders."""
+    FLOAT32 = auto()
+    FLOAT16 = auto()
+    UNORM8 = auto()
+    SNORM8 = auto()
+    UNORM16 = auto()
+    SNORM16 = auto()
+    INT32 = auto()
+
+
 class PrimitiveType(Enum):
     TRIANGLES = auto()
     TRIANGLE_STRIP = auto()
@@ -40,21 +51,171 @@ class BufferUsage(Enum):
     STREAM = auto()
 
 
+ATTRIBUTE_COMPONENTS = {
+    AttributeType.FLOAT: 1,
+    AttributeType.VEC2: 2,
+    AttributeType.VEC3: 3,
+    AttributeType.VEC4: 4,
+    AttributeType.INT: 1,
+    AttributeType.IVEC2: 2,
+    AttributeType.IVEC3: 3,
+    AttributeType.IVEC4: 4,
+}
+INTEGER_ATTRIBUTES = {AttributeType.INT, AttributeType.IVEC2, AttributeType.IVEC3, AttributeType.IVEC4}
+
+FORMAT_DTYPES = {
+    AttributeFormat.FLOAT32: np.dtype(np.float32),
+    AttributeFormat.FLOAT16: np.dtype(np.float16),
+    AttributeFormat.UNORM8: np.dtype(np.uint8),
+    AttributeFormat.SNORM8: np.dtype(np.int8),
+    AttributeFormat.UNORM16: np.dtype(np.uint16),
+    AttributeFormat.SNORM16: np.dtype(np.int16),
+    AttributeFormat.INT32: np.dtype(np.int32),
+}
+NORMALIZED_FORMATS = {AttributeFormat.UNORM8, AttributeFormat.SNORM8, AttributeFormat.UNORM16, AttributeFormat.SNORM16}
+
+INDEX_DTYPES = {IndexType.UINT16: np.dtype(np.uint16), IndexType.UINT32: np.dtype(np.uint32)}
+MAX_UINT16_VERTICES = 0x10000
+
+# attributes in an interleaved buffer start on 4 byte boundaries
+ATTRIBUTE_ALIGNMENT = 4
+
+
+class VertexAttribute:
+    """Where an attribute is stored in a mesh's vertex buffer."""
+    __slots__ = ("name", "type", "format", "components", "offset")
+
+    def __init__(self, name: str, type: AttributeType, format: AttributeFormat, components: int, offset: int):
+        self.name = name
+        self.type = type
+        self.format = format
+        self.components = components
+        self.offset = offset
+
+    @property
+    def normalized(self) -> bool:
+        return self.format in NORMALIZED_FORMATS
+
+
+def get_index_type(vertex_count: int) -> IndexType:
+    """The smallest index type that can address every vertex."""
+    return IndexType.UINT16 if vertex_count <= MAX_UINT16_VERTICES else IndexType.UINT32
+
+
+def get_attribute_format(attribute: tuple) -> AttributeFormat:
+    if len(attribute) > 2:
+        return attribute[2]
+    return AttributeFormat.INT32 if attribute[0] in INTEGER_ATTRIBUTES else AttributeFormat.FLOAT32
+
+
+def convert_attribute(data: np.ndarray, format: AttributeFormat) -> np.ndarray:
+    """Converts attribute data to its storage format, floats stored in normalized formats are clamped and scaled."""
+    dtype = FORMAT_DTYPES[format]
+    data = np.asarray(data)
+    if format in NORMALIZED_FORMATS and data.dtype.kind == "f":
+        info = np.iinfo(dtype)
+        data = np.rint(np.clip(data, -1.0 if info.min < 0 else 0.0, 1.0) * info.max)
+    return data.astype(dtype, copy=False)
+
+
+def get_vertex_count(attributes: dict[str, tuple]) -> int:
+    vertex_count = None
+    for name, attribute in attributes.items():
+        count = np.asarray(attribute[1]).size // ATTRIBUTE_COMPONENTS.get(attribute[0], 1)
+        if vertex_count is not None and count != vertex_count:
+            raise ValueError(f"Mesh attribute '{name}' has {count} vertices, expected {vertex_count}.")
+        vertex_count = count
+    return vertex_count or 0
+
+
+def get_vertex_layout(attributes: dict[str, tuple]) -> tuple[list[VertexAttribute], int]:
+    """Computes the offset of every attribute in an interleaved vertex and the vertex stride."""
+    layout = []
+    offset = 0
+    for name, attribute in attributes.items():
+        attribute_type = attribute[0]
+        if attribute_type not in ATTRIBUTE_COMPONENTS:
+            raise ValueError(f"Unsupported AttributeType: {attribute_type}")
+
+        format = get_attribute_format(attribute)
+        components = ATTRIBUTE_COMPONENTS[attribute_type]
+        layout.append(VertexAttribute(name, attribute_type, format, components, offset))
+
+        size = FORMAT_DTYPES[format].itemsize * components
+        offset += (size + ATTRIBUTE_ALIGNMENT - 1) & ~(ATTRIBUTE_ALIGNMENT - 1)
+    return layout, offset
+
+
+def get_layout_dtype(layout: list[VertexAttribute], stride: int) -> np.dtype:
+    """The structured dtype of one interleaved vertex, every attribute is a field."""
+    return np.dtype({
+        "names": [attribute.name for attribute in layout],
+        "formats": [(FORMAT_DTYPES[attribute.format].newbyteorder("<"), (attribute.components,)) for attribute in layout],
+        "offsets": [attribute.offset for attribute in layout],
+        "itemsize": stride,
+    })
+
+
+def interleave_attributes(attributes: dict[str, tuple], layout: list[VertexAttribute], stride: int, vertex_count: int) -> np.ndarray:
+    """Packs every attribute into one buffer laid out by `get_vertex_layout`."""
+    vertices = np.zeros(vertex_count, get_layout_dtype(layout, stride))
+    for attribute in layout:
+        data = convert_attribute(attributes[attribute.name][1], attribute.format)
+        vertices[attribute.name] = data.reshape(vertex_count, attribute.components)
+    return vertices
+
+
 class Mesh:
+    """
+    A mesh stored on the GPU. Attributes are `(AttributeType, data)` or `(AttributeType, data, AttributeFormat)`
+    tuples, by default every attribute is packed into a single interleaved vertex buffer.
+
+    :param index_type: The index type, picked from the vertex count if not given.
+    :param interleaved: Stores every attribute in one vertex buffer instead of one buffer per attribute.
+    :param vertex_data: An interleaved vertex buffer already laid out like the attributes, uploaded as it is. Use `from_interleaved` to create one.
+    """
     def __init__(
         self,
-        attributes: dict[str, tuple[AttributeType, np.ndarray]],
+        attributes: dict[str, tuple[AttributeType, np.ndarray] | tuple[AttributeType, np.ndarray, AttributeFormat]],
         indices: np.ndarray = None,
         primitive: PrimitiveType = PrimitiveType.TRIANGLES,
-        index_type: IndexType = IndexType.UINT16,
+        index_type: IndexType = None,
         usage: BufferUsage = BufferUsage.STATIC,
+        interleaved: bool = True,
+        vertex_data: np.ndarray = None,
     ):
 
         self.attributes = attributes
-        self.indices = indices
         self.primitive = primitive
-        self.index_type = index_type
         self.usage = usage
+        self.interleaved = interleaved
+
+        self.vertex_count = get_vertex_count(attributes)
+        self.layout, self.stride = get_vertex_layout(attributes)
+
+        if vertex_data is not None and (not interleaved or vertex_data.dtype != get_layout_dtype(self.layout, self.stride)):
+            raise ValueError("The vertex data isn't laid out like the mesh's interleaved attributes.")
+        self.vertex_data = vertex_data
+
+        if index_type is None:
+            index_type = get_index_type(self.vertex_count)
+        elif index_type == IndexType.UINT16 and self.vertex_count > MAX_UINT16_VERTICES:
+            warning(f"A mesh with {self.vertex_count} vertices can't use 16 bit indices, using 32 bit indices instead.")
+            index_type = IndexType.UINT32
+        self.index_type = index_type
+        self.indices = np.asarray(indices).astype(INDEX_DTYPES[index_type], copy=False).ravel() if indices is not None else None
+
+    @classmethod
+    def from_interleaved(cls, vertices: np.ndarray, attributes: dict[str, tuple[AttributeType, AttributeFormat]], indices: np.ndarray = None, **kwargs) -> 'Mesh':
+        """
+        Creates a mesh from a vertex buffer that is already interleaved, like the vertices of a model file. The buffer
+        is uploaded without being converted or copied, its attributes are views of it.
+
+        :param vertices: A structured array with the dtype `get_layout_dtype` gives for the attributes.
+        :param attributes: The type and format of each attribute, in the order they are laid out.
+        """
+        views = {name: (type, vertices[name], format) for name, (type, format) in attributes.items()}
+        return cls(views, indices, vertex_data=vertices, **kwargs)
 
     @abstractmethod
     def destroy(self):
@@ -68,8 +229,19 @@ class Mesh:
         if self.usage == BufferUsage.STATIC:
             warning("Cannot set data of a static Mesh.")
             return
+        attribute = self.attributes[attribute_name]
+        self.attributes[attribute_name] = (attribute[0], data, *attribute[2:])
+        self.vertex_data = None # interleaved again from the attributes
         self._set_attribute_data(attribute_name, data)
 
+    @property
+    def triangle_count(self) -> int:
+        """The number of triangles one draw of the mesh submits."""
+        count = len(self.indices) if self.indices is not None else self.vertex_count
+        if self.primitive == PrimitiveType.TRIANGLES:
+            return count // 3
+        return max(count - 2, 0)
+
     @abstractmethod
     def draw(self):
         pass
@@ -82,7 +254,22 @@ def create_static_mesh(
     indices: np.ndarray,
     buffer_usage: BufferUsage = BufferUsage.STATIC,
     primitive: PrimitiveType = PrimitiveType.TRIANGLES,
+    optimize: bool = False,
 ) -> Mesh:
+    """
+    :param optimize: Welds duplicate vertices and reorders the mesh for the vertex cache, triangle lists only.
+    """
+    if optimize and primitive == PrimitiveType.TRIANGLES:
+        # imported here, the optimizer depends on the model package which depends on this module
+        from FreeBodyEngine.graphics.mesh_optimizer import optimize_mesh
+        vertex_count = len(verticies) // 3
+        attributes, indices = optimize_mesh({
+            "verticies": np.reshape(verticies, (vertex_count, 3)),
+            "uvs": np.reshape(uvs, (vertex_count, 2)),
+            "normals": np.reshape(normals, (vertex_count, 3)),
+        }, np.asarray(indices))
+        verticies, uvs, normals = attributes["verticies"], attributes["uvs"], attributes["normals"]
+
     return get_service("renderer").get_mesh_class()(
         {
             "verticies": (AttributeType.VEC3, verticies),
@@ -132,7 +319,7 @@ def generate_quad(width=1.0, height=1.0):
     )
 
     normals = np.array(
-        [0.0, 0.0, 1.0, 0.0, 0.0, 1.0, 1.0, 1.0],
+        [0.0, 0.0, 1.0] * 4,
         dtype=np.float32,
     )
 
@@ -148,7 +335,7 @@ def generate_quad(width=1.0, height=1.0):
         dtype=np.uint32,
     )
 
-    return create_static_mesh(vertices, normals, uvs, indices)
+    return create_static_mesh(vertices, uvs, normals, indices)
 
 
 def generate_circle(radius=0.5, segments=32):
@@ -170,10 +357,11 @@ def generate_circle(radius=0.5, segments=32):
             indices.extend([0, i, i + 1])
 
     return create_static_mesh(
-        vertices=np.array(vertices, dtype=np.float32),
+        verticies=np.array(vertices, dtype=np.float32),
         normals=np.array(normals, dtype=np.float32),
         uvs=np.array(uvs, dtype=np.float32),
         indices=np.array(indices, dtype=np.uint32),
+        optimize=True,
     )
 
 
@@ -265,10 +453,10 @@ def generate_cube(width: float = 1.0, height: float = 1.0, depth: float = 1.0):
         [0.0, -1.0, 0.0],  # Bottom
     ]
     normals = (
-        np.array(normals_per_face * 6, dtype=np.float32).repeat(6, axis=0).flatten()
+        np.array(normals_per_face, dtype=np.float32).repeat(6, axis=0).flatten()
     )
     indices = np.array([i for i in range(36)], dtype=np.uint32)
-    return create_static_mesh(vertices, normals, uvs, indices)
+    return create_static_mesh(vertices, uvs, normals, indices)
 
 
 def generate_sphere(radius=1.0, sectors=36, stacks=18):
@@ -301,10 +489,11 @@ def generate_sphere(radius=1.0, sectors=36, stacks=18):
             indices.extend([second, second + 1, first + 1])
 
     return create_static_mesh(
-        vertices=np.array(vertices, dtype=np.float32),
+        verticies=np.array(vertices, dtype=np.float32),
         normals=np.array(normals, dtype=np.float32),
         uvs=np.array(uvs, dtype=np.float32),
         indices=np.array(indices, dtype=np.uint32),
+        optimize=True,
     )
 
 
@@ -338,10 +527,11 @@ def generate_sphere(radius=1.0, sectors=36, stacks=18):
             indices.extend([second, second + 1, first + 1])
 
     return create_static_mesh(
-        vertices=np.array(vertices, dtype=np.float32),
+        verticies=np.array(vertices, dtype=np.float32),
         normals=np.array(normals, dtype=np.float32),
         uvs=np.array(uvs, dtype=np.float32),
         indices=np.array(indices, dtype=np.uint32),
+        optimize=True,
     )
 
 
@@ -0,0 +1,432 @@
+"""
+Mesh processing: welding duplicate vertices, ordering triangles for the post-transform vertex cache, ordering
+vertices for fetch locality, and simplifying meshes into LOD levels by edge collapse.
+"""
+
+import heapq
+
+import numpy as np
+
+from FreeBodyEngine.utils import fbnjit
+from FreeBodyEngine.graphics.model.model_file import DecodedPrimitive, get_bounds
+
+VERTEX_CACHE_SIZE = 32
+
+# the fraction of triangles kept by each generated LOD level
+LOD_RATIOS = (0.5, 0.25, 0.125)
+
+
+def weld_vertices(vertices: np.ndarray, indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Merges vertices with identical attributes.
+
+    :param vertices: A (vertex count, values) array holding every attribute of each vertex.
+    :returns: The indices of the vertices that were kept, in first use order, and the remapped indices.
+    """
+    vertices = np.ascontiguousarray(vertices)
+    rows = vertices.view(np.dtype((np.void, vertices.dtype.itemsize * vertices.shape[1])))[:, 0]
+    _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+
+    order = np.argsort(first)
+    remap = np.empty_like(order)
+    remap[order] = np.arange(len(order))
+    return first[order], remap[inverse.ravel()][indices].astype(indices.dtype)
+
+
+def optimize_vertex_fetch(indices: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Orders vertices by their first use in the index buffer so vertex fetches walk memory forward,
+    unused vertices are dropped.
+
+    :returns: The indices of the vertices to keep, in their new order, and the remapped indices.
+    """
+    used, first = np.unique(indices, return_index=True)
+    order = used[np.argsort(first)]
+    remap = np.zeros(int(used[-1]) + 1 if len(used) else 0, np.int64)
+    remap[order] = np.arange(len(order))
+    return order, remap[indices].astype(indices.dtype)
+
+
+@fbnjit(cache=True)
+def _vertex_score(cache_position, remaining, cache_size):
+    if remaining == 0:
+        return -1.0
+    score = 0.0
+    if cache_position >= 0:
+        if cache_position < 3: # the last triangle's vertices, scored lower so strips don't form
+            score = 0.75
+        else:
+            score = (1.0 - (cache_position - 3) / (cache_size - 3)) ** 1.5
+    return score + 2.0 * remaining ** -0.5 # favours finishing off vertices with few triangles left
+
+
+@fbnjit(cache=True)
+def _optimize_vertex_cache(indices, vertex_count, cache_size):
+    triangle_count = len(indices) // 3
+
+    # the triangles of each vertex, the live ones are kept at the front of each range
+    offsets = np.zeros(vertex_count + 1, np.int64)
+    for i in range(len(indices)):
+        offsets[indices[i] + 1] += 1
+    for v in range(vertex_count):
+        offsets[v + 1] += offsets[v]
+    remaining = offsets[1:] - offsets[:-1]
+    vertex_triangles = np.empty(len(indices), np.int64)
+    fill = offsets[:-1].copy()
+    for t in range(triangle_count):
+        for k in range(3):
+            v = indices[t * 3 + k]
+            vertex_triangles[fill[v]] = t
+            fill[v] += 1
+
+    cache_position = np.full(vertex_count, -1, np.int64)
+    vertex_score = np.empty(vertex_count, np.float64)
+    for v in range(vertex_count):
+        vertex_score[v] = _vertex_score(-1, remaining[v], cache_size)
+
+    added = np.zeros(triangle_count, np.bool_)
+    cache = np.empty(cache_size + 3, np.int64)
+    new_cache = np.empty(cache_size + 3, np.int64)
+    cache_length = 0
+
+    out = np.empty_like(indices)
+    best = -1
+    next_triangle = 0
+    for i in range(triangle_count):
+        if best < 0:
+            # nothing in the cache has triangles left, continue from the first triangle not yet added
+            while added[next_triangle]:
+                next_triangle += 1
+            best = next_triangle
+
+        t = best
+        added[t] = True
+        new_length = 0
+        for k in range(3):
+            v = indices[t * 3 + k]
+            out[i * 3 + k] = v
+
+            start = offsets[v]
+            end = start + remaining[v]
+            for j in range(start, end):
+                if vertex_triangles[j] == t:
+                    vertex_triangles[j] = vertex_triangles[end - 1]
+                    remaining[v] -= 1
+                    break
+
+            duplicate = False
+            for j in range(new_length):
+                if new_cache[j] == v:
+                    duplicate = True
+            if not duplicate:
+                new_cache[new_length] = v
+                new_length += 1
+
+        for j in range(cache_length):
+            v = cache[j]
+            if v != indices[t * 3] and v != indices[t * 3 + 1] and v != indices[t * 3 + 2]:
+                new_cache[new_length] = v
+                new_length += 1
+
+        # vertices pushed past the end of the cache are evicted, but still rescored below
+        for j in range(new_length):
+            v = new_cache[j]
+            cache_position[v] = j if j < cache_size else -1
+            vertex_score[v] = _vertex_score(cache_position[v], remaining[v], cache_size)
+        cache_length = min(new_length, cache_size)
+        cache[:cache_length] = new_cache[:cache_length]
+
+        best = -1
+        best_score = -1.0
+        for j in range(new_length):
+            v = new_cache[j]
+            for k in range(offsets[v], offsets[v] + remaining[v]):
+                triangle = vertex_triangles[k]
+                score = vertex_score[indices[triangle * 3]] + vertex_score[indices[triangle * 3 + 1]] + vertex_score[indices[triangle * 3 + 2]]
+                if score > best_score:
+                    best_score = score
+                    best = triangle
+    return out
+
+
+def optimize_vertex_cache(indices: np.ndarray, vertex_count: int, cache_size: int = VERTEX_CACHE_SIZE) -> np.ndarray:
+    """Reorders triangles so vertices are reused while still in the post-transform cache (Forsyth's algorithm)."""
+    if len(indices) < 3:
+        return indices
+    return _optimize_vertex_cache(np.ascontiguousarray(indices, np.int64), vertex_count, cache_size).astype(indices.dtype)
+
+
+def get_acmr(indices: np.ndarray, cache_size: int = VERTEX_CACHE_SIZE) -> float:
+    """The average number of vertices transformed per triangle with a FIFO cache, lower is better."""
+    cache = []
+    misses = 0
+    for v in indices.tolist():
+        if v not in cache:
+            misses += 1
+            cache.append(v)
+            if len(cache) > cache_size:
+                cache.pop(0)
+    return misses / max(len(indices) // 3, 1)
+
+
+@fbnjit(cache=True)
+def _find(parent, v):
+    root = v
+    while parent[root] != root:
+        root = parent[root]
+    while parent[v] != root:
+        next_v = parent[v]
+        parent[v] = root
+        v = next_v
+    return root
+
+
+@fbnjit(cache=True)
+def _quadric_error(q, p):
+    x, y, z = p[0], p[1], p[2]
+    return (q[0] * x * x + 2 * q[1] * x * y + 2 * q[2] * x * z + 2 * q[3] * x
+            + q[4] * y * y + 2 * q[5] * y * z + 2 * q[6] * y
+            + q[7] * z * z + 2 * q[8] * z + q[9])
+
+
+@fbnjit(cache=True)
+def _collapse_cost(quadrics, positions, source, target):
+    return max(_quadric_error(quadrics[source] + quadrics[target], positions[target]), 0.0)
+
+
+@fbnjit(cache=True)
+def _collapse_flips(positions, triangles, parent, offsets, vertex_triangles, group_next, source, target):
+    """Checks if moving `source` onto `target` would flip or collapse a triangle that survives the collapse."""
+    v = source
+    while v != -1:
+        for k in range(offsets[v], offsets[v + 1]):
+            t = vertex_triangles[k]
+            a = _find(parent, triangles[t, 0])
+            b = _find(parent, triangles[t, 1])
+            c = _find(parent, triangles[t, 2])
+            if a == b or b == c or a == c or a == target or b == target or c == target:
+                continue
+
+            before = np.cross(positions[b] - positions[a], positions[c] - positions[a])
+            pa = positions[target] if a == source else positions[a]
+            pb = positions[target] if b == source else positions[b]
+            pc = positions[target] if c == source else positions[c]
+            after = np.cross(pb - pa, pc - pa)
+            if np.dot(before, after) <= 1e-12 * np.dot(before, before):
+                return True
+        v = group_next[v]
+    return False
+
+
+@fbnjit(cache=True)
+def _simplify(positions, triangles, target_count, max_error):
+    vertex_count = len(positions)
+    triangle_count = len(triangles)
+
+    # plane quadrics, weighted by triangle area
+    quadrics = np.zeros((vertex_count, 10))
+    for t in range(triangle_count):
+        p0 = positions[triangles[t, 0]]
+        normal = np.cross(positions[triangles[t, 1]] - p0, positions[triangles[t, 2]] - p0)
+        length = np.sqrt(np.dot(normal, normal))
+        if length == 0.0:
+            continue
+        a = normal[0] / length
+        b = normal[1] / length
+        c = normal[2] / length
+        d = -(a * p0[0] + b * p0[1] + c * p0[2])
+        area = length * 0.5
+        plane = np.array([a * a, a * b, a * c, a * d, b * b, b * c, b * d, c * c, c * d, d * d]) * area
+        for k in range(3):
+            quadrics[triangles[t, k]] += plane
+
+    # edges used by a single triangle are on the boundary (or a uv seam), their vertices never move
+    edge_keys = np.empty(triangle_count * 3, np.int64)
+    for t in range(triangle_count):
+        for k in range(3):
+            a = triangles[t, k]
+            b = triangles[t, (k + 1) % 3]
+            edge_keys[t * 3 + k] = min(a, b) * vertex_count + max(a, b)
+    edge_keys = np.sort(edge_keys)
+    locked = np.zeros(vertex_count, np.bool_)
+    i = 0
+    while i < len(edge_keys):
+        j = i
+        while j < len(edge_keys) and edge_keys[j] == edge_keys[i]:
+            j += 1
+        if j - i == 1:
+            locked[edge_keys[i] // vertex_count] = True
+            locked[edge_keys[i] % vertex_count] = True
+        i = j
+
+    offsets = np.zeros(vertex_count + 1, np.int64)
+    for t in range(triangle_count):
+        for k in range(3):
+            offsets[triangles[t, k] + 1] += 1
+    for v in range(vertex_count):
+        offsets[v + 1] += offsets[v]
+    vertex_triangles = np.empty(triangle_count * 3, np.int64)
+    fill = offsets[:-1].copy()
+    for t in range(triangle_count):
+        for k in range(3):
+            v = triangles[t, k]
+            vertex_triangles[fill[v]] = t
+            fill[v] += 1
+
+    # collapsed vertices point at the vertex they were merged into, each vertex keeps a list of what merged into it
+    parent = np.arange(vertex_count)
+    group_next = np.full(vertex_count, -1, np.int64)
+    group_tail = np.arange(vertex_count)
+
+    heap = [(0.0, 0, 0)]
+    heap.pop()
+    i = 0
+    while i < len(edge_keys):
+        a = edge_keys[i] // vertex_count
+        b = edge_keys[i] % vertex_count
+        if a != b:
+            if not locked[a]:
+                heap.append((_collapse_cost(quadrics, positions, a, b), a, b))
+            if not locked[b]:
+                heap.append((_collapse_cost(quadrics, positions, b, a), b, a))
+        while i < len(edge_keys) and edge_keys[i] == a * vertex_count + b:
+            i += 1
+    heapq.heapify(heap)
+
+    live = 0
+    for t in range(triangle_count):
+        if triangles[t, 0] != triangles[t, 1] and triangles[t, 1] != triangles[t, 2] and triangles[t, 0] != triangles[t, 2]:
+            live += 1
+
+    while live > target_count and len(heap) > 0:
+        cost, source, target = heapq.heappop(heap)
+        if parent[source] != source or parent[target] != target or source == target:
+            continue
+
+        current = _collapse_cost(quadrics, positions, source, target)
+        if current > cost * (1.0 + 1e-9) + 1e-12:
+            heapq.heappush(heap, (current, source, target)) # the quadrics changed since it was queued
+            continue
+        if current > max_error:
+            break
+        if _collapse_flips(positions, triangles, parent, offsets, vertex_triangles, group_next, source, target):
+            continue
+
+        # triangles using both vertices disappear
+        v = source
+        while v != -1:
+            for k in range(offsets[v], offsets[v + 1]):
+                t = vertex_triangles[k]
+                a = _find(parent, triangles[t, 0])
+                b = _find(parent, triangles[t, 1])
+                c = _find(parent, triangles[t, 2])
+                if a != b and b != c and a != c and (a == target or b == target or c == target):
+                    live -= 1
+            v = group_next[v]
+
+        parent[source] = target
+        quadrics[target] += quadrics[source]
+        group_next[group_tail[target]] = source
+        group_tail[target] = group_tail[source]
+
+        # requeue the edges around the merged vertex
+        v = target
+        while v != -1:
+            for k in range(offsets[v], offsets[v + 1]):
+                t = vertex_triangles[k]
+                for j in range(3):
+                    w = _find(parent, triangles[t, j])
+                    if w == target:
+                        continue
+                    if not locked[w]:
+                        heapq.heappush(heap, (_collapse_cost(quadrics, positions, w, target), w, target))
+                    if not locked[target]:
+                        heapq.heappush(heap, (_collapse_cost(quadrics, positions, target, w), target, w))
+            v = group_next[v]
+
+    out = np.empty((live, 3), triangles.dtype)
+    n = 0
+    for t in range(triangle_count):
+        a = _find(parent, triangles[t, 0])
+        b = _find(parent, triangles[t, 1])
+        c = _find(parent, triangles[t, 2])
+        if a != b and b != c and a != c and n < live:
+            out[n, 0] = a
+            out[n, 1] = b
+            out[n, 2] = c
+            n += 1
+    return out[:n]
+
+
+def simplify(positions: np.ndarray, indices: np.ndarray, ratio: float, max_error: float = np.inf) -> np.ndarray:
+    """
+    Simplifies a triangle mesh by collapsing the edges that change its shape the least (quadric error metrics).
+    Vertices only move onto their neighbours, so the result indexes the same vertex buffer.
+
+    :param ratio: The fraction of triangles to keep.
+    :param max_error: Stops early once every remaining collapse costs more than this.
+    """
+    triangles = np.ascontiguousarray(indices, np.int64).reshape(-1, 3)
+    target_count = int(len(triangles) * ratio)
+    simplified = _simplify(np.ascontiguousarray(positions, np.float64).reshape(-1, 3), triangles, target_count, float(max_error))
+    return simplified.ravel().astype(indices.dtype)
+
+
+def optimize_mesh(attributes: dict[str, np.ndarray], indices: np.ndarray, weld: bool = True) -> tuple[dict[str, np.ndarray], np.ndarray]:
+    """
+    Welds duplicate vertices, reorders triangles for the vertex cache and vertices for fetch locality.
+
+    :param attributes: A (vertex count, components) array for each attribute.
+    """
+    vertex_count = len(next(iter(attributes.values()))) if attributes else 0
+
+    if weld and attributes:
+        vertices = np.concatenate([data.astype(np.float32) for data in attributes.values()], axis=1)
+        kept, indices = weld_vertices(vertices, indices)
+        attributes = {name: data[kept] for name, data in attributes.items()}
+        vertex_count = len(kept)
+
+    indices = optimize_vertex_cache(indices, vertex_count)
+    order, indices = optimize_vertex_fetch(indices)
+    return {name: data[order] for name, data in attributes.items()}, indices
+
+
+def _get_attributes(primitive: DecodedPrimitive) -> dict[str, np.ndarray]:
+    attributes = {'positions': primitive.positions}
+    if primitive.normals is not None:
+        attributes['normals'] = primitive.normals
+    if primitive.uvs is not None:
+        attributes['uvs'] = primitive.uvs
+    return attributes
+
+
+def _with_attributes(primitive: DecodedPrimitive, attributes: dict[str, np.ndarray], indices: np.ndarray, lod: int) -> DecodedPrimitive:
+    return DecodedPrimitive(primitive.name, attributes['positions'], attributes.get('normals'), attributes.get('uvs'), indices,
+                            primitive.material, get_bounds(attributes['positions']), primitive.model, lod)
+
+
+def optimize_primitive(primitive: DecodedPrimitive) -> DecodedPrimitive:
+    attributes, indices = optimize_mesh(_get_attributes(primitive), np.asarray(primitive.indices))
+    return _with_attributes(primitive, attributes, indices, primitive.lod)
+
+
+def generate_lods(primitive: DecodedPrimitive, ratios: tuple[float, ...] = LOD_RATIOS, max_error: float = np.inf) -> list[DecodedPrimitive]:
+    """
+    Generates simplified versions of a primitive, each keeping a fraction of the original triangles.
+    Levels that couldn't be simplified further than the previous one are left out.
+    """
+    # weld first, otherwise every split vertex looks like a boundary the simplifier can't touch
+    attributes, indices = optimize_mesh(_get_attributes(primitive), np.asarray(primitive.indices))
+    triangle_count = len(indices) // 3
+
+    lods = []
+    previous = triangle_count
+    for ratio in ratios:
+        simplified = simplify(attributes['positions'], indices, ratio, max_error)
+        if len(simplified) // 3 >= previous:
+            break
+        previous = len(simplified) // 3
+
+        lod_attributes, lod_indices = optimize_mesh(attributes, simplified, weld=False)
+        lods.append(_with_attributes(primitive, lod_attributes, lod_indices, len(lods) + 1))
+    return lods
@@ -1,4 +1,5 @@
 from FreeBodyEngine.graphics.model.model import Model, Model3D
+from FreeBodyEngine.graphics.model.model_file import ModelFile
 
 
-__all__ = ['Model', 'Model3D']
\ No newline at end of file
+__all__ = ['Model', 'Model3D', 'ModelFile']
\ No newline at end of file
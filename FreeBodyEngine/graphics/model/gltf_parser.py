@@ -1,6 +1,10 @@
 import struct
 import json
+import os
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
 from FreeBodyEngine.graphics.model import Model
+from FreeBodyEngine.graphics.model.model_file import DecodedModel, DecodedPrimitive, encode_model, get_bounds
 from FreeBodyEngine.graphics.mesh import Mesh
 from FreeBodyEngine.graphics.material import Material
 from FreeBodyEngine.graphics.pipeline import GraphicsPipeline
@@ -9,6 +13,9 @@ from FreeBodyEngine.graphics.gl33 import GL33Renderer
 from FreeBodyEngine.graphics.pbr.pipeline import PBRPipeline
 import numpy as np
 
+if TYPE_CHECKING:
+    from FreeBodyEngine.graphics.texture import TextureManager
+
 class GLBParser:
     def __init__(self, data_bytes):
         "Parses .glb (glTF blob) files into its glTF + bin data."
@@ -35,7 +42,7 @@ class GLBParser:
             raise ValueError("First chunk must be JSON")
 
         json_bytes = self.bytes[offset:offset+chunk_length]
-        self.json_chunk = json.loads(json_bytes.decode('utf-8'))
+        self.json_chunk = json.loads(str(json_bytes, 'utf-8'))
         offset += chunk_length
 
         if offset < len(self.bytes):
@@ -53,62 +60,104 @@ class GLBParser:
 
 
 
+COMPONENT_DTYPES = {
+    5120: '<i1',  # BYTE
+    5121: '<u1',  # UNSIGNED_BYTE
+    5122: '<i2',  # SHORT
+    5123: '<u2',  # UNSIGNED_SHORT
+    5125: '<u4',  # UNSIGNED_INT
+    5126: '<f4',  # FLOAT
+}
+
+TYPE_NUM_COMPONENTS = {
+    "SCALAR": 1,
+    "VEC2": 2,
+    "VEC3": 3,
+    "VEC4": 4,
+    "MAT2": 4,
+    "MAT3": 9,
+    "MAT4": 16
+}
+
+TYPE_NUM_COLUMNS = {
+    "MAT2": 2,
+    "MAT3": 3,
+    "MAT4": 4
+}
+
+
+def normalize_components(data: np.ndarray) -> np.ndarray:
+    """Converts normalized integers to floats as the glTF spec defines it, signed values are clamped to -1."""
+    max_value = np.float32(np.iinfo(data.dtype).max)
+    result = data.astype(np.float32) / max_value
+    if data.dtype.kind == "i":
+        np.maximum(result, -1.0, out=result)
+    return result
+
+
 class GLTFParser:
     def __init__(self, gltf_dict, bin_data):
         self.gltf = gltf_dict
         self.bin_data = bin_data
 
-    def get_accessor_data(self, accessor_index):
-        accessor = self.gltf["accessors"][accessor_index]
-        buffer_view = self.gltf["bufferViews"][accessor["bufferView"]]
+    def get_accessor_data(self, accessor_index, normalize: bool = True) -> np.ndarray:
+        """
+        Decodes an accessor into an array of shape (count, components), or (count,) for scalars.
+        Accessors that need no conversion are zero-copy (read only) views of the binary buffer, interleaved ones included.
 
-        buffer_offset = buffer_view.get("byteOffset", 0)
-        accessor_offset = accessor.get("byteOffset", 0)
-        total_offset = buffer_offset + accessor_offset
+        :param normalize: Converts normalized integer accessors to floats.
+        """
+        accessor = self.gltf["accessors"][accessor_index]
 
         count = accessor["count"]
-        component_type = accessor["componentType"]
-        data_type = accessor["type"]
-
-        type_num_components = {
-            "SCALAR": 1,
-            "VEC2": 2,
-            "VEC3": 3,
-            "VEC4": 4,
-            "MAT2": 4,
-            "MAT3": 9,
-            "MAT4": 16
-        }
-
-        component_format = {
-            5120: 'b',  # BYTE
-            5121: 'B',  # UNSIGNED_BYTE
-            5122: 'h',  # SHORT
-            5123: 'H',  # UNSIGNED_SHORT
-            5125: 'I',  # UNSIGNED_INT
-            5126: 'f',  # FLOAT
-        }
-
-        num_components = type_num_components[data_type]
-        fmt_char = component_format[component_type]
-        component_size = struct.calcsize(fmt_char)
-
-        byte_stride = buffer_view.get("byteStride", num_components * component_size)
-
-        values = []
-        for i in range(count):
-            start = total_offset + i * byte_stride
-            end = start + num_components * component_size
-            chunk = self.bin_data[start:end]
-            fmt = '<' + fmt_char * num_components
-            values.append(struct.unpack(fmt, chunk))
-
-        return values
-    
+        dtype = np.dtype(COMPONENT_DTYPES[accessor["componentType"]])
+        num_components = TYPE_NUM_COMPONENTS[accessor["type"]]
+        columns = TYPE_NUM_COLUMNS.get(accessor["type"], 1)
+
+        if "bufferView" in accessor:
+            data = self._read_view(accessor["bufferView"], accessor.get("byteOffset", 0), count, dtype, num_components, columns)
+        else:
+            data = np.zeros((count, num_components), dtype) # all zeros unless overridden by sparse values
+
+        sparse = accessor.get("sparse")
+        if sparse:
+            indices = self._read_view(sparse["indices"]["bufferView"], sparse["indices"].get("byteOffset", 0), sparse["count"], np.dtype(COMPONENT_DTYPES[sparse["indices"]["componentType"]]), 1)
+            values = self._read_view(sparse["values"]["bufferView"], sparse["values"].get("byteOffset", 0), sparse["count"], dtype, num_components, columns)
+            data = data.copy()
+            data[indices[:, 0]] = values
+
+        if normalize and accessor.get("normalized", False) and dtype.kind in "iu":
+            data = normalize_components(data)
+
+        if num_components == 1:
+            data = data.reshape(count)
+        return data
+
+    def _read_view(self, buffer_view_index, byte_offset, count, dtype: np.dtype, num_components, columns: int = 1) -> np.ndarray:
+        """
+        Views `count` elements of a buffer view. Matrix columns start on 4 byte boundaries, so MAT2 and MAT3
+        elements with 1 or 2 byte components have padded columns, those are copied without the padding.
+        """
+        buffer_view = self.gltf["bufferViews"][buffer_view_index]
+        offset = buffer_view.get("byteOffset", 0) + byte_offset
+
+        rows = num_components // columns
+        column_size = (rows * dtype.itemsize + 3) & ~3 if columns > 1 else rows * dtype.itemsize
+        element_size = column_size * columns
+        stride = buffer_view.get("byteStride", element_size)
+        if stride == element_size and column_size == rows * dtype.itemsize:
+            return np.frombuffer(self.bin_data, dtype, count * num_components, offset).reshape(count, num_components)
+
+        end = offset + stride * (count - 1) + column_size * (columns - 1) + rows * dtype.itemsize if count else offset
+        if end > len(self.bin_data):
+            raise ValueError(f"Buffer view {buffer_view_index} reads past the end of the buffer.")
+        data = np.ndarray((count, columns, rows), dtype, self.bin_data, offset, (stride, column_size, dtype.itemsize))
+        return data.reshape(count, num_components)
+
     def get_model_index(self, name: str):
         i = 0
         for model in self.gltf['meshes']:
-            if model['name'] == name:
+            if model.get('name') == name:
                 return i
             i += 1   
 
@@ -133,22 +182,14 @@ class GLTFParser:
         else:
             raise ValueError("Image has no bufferView or URI")
 
-    def build_model(self, model_name: str, pipeline: GraphicsPipeline, renderer: Renderer, scale: tuple[int, int, int] = None) -> Model:
-        if model_name is None:
-            model_name = self.gltf['meshes'][0].get('name')
-
-        model = self.gltf['meshes'][self.get_model_index(model_name)]
+    def get_images(self) -> dict[int, bytes]:
+        """The encoded data of every image in the file."""
+        return {i: self.get_image_data(i) for i in range(len(self.gltf.get('images', [])))}
 
-        meshes = {}
+    def get_materials(self) -> dict[str, dict]:
+        """The material properties of the file, textures are referenced as {"texture": image index}."""
         materials = {}
-        textures = {}
-        material_map = {}
-
-        for texture_index in range(len(self.gltf['images'])):
-            data = self.get_image_data(texture_index)
-            textures[texture_index] = renderer.texture_manager._create_standalone_texture(data)
-
-        for i, material in enumerate(self.gltf['materials']):
+        for i, material in enumerate(self.gltf.get('materials', [])):
             data = {
                 'albedo': [0.0, 0.0, 0.0, 1.0],
                 'normal': [0.0, 0.0, 0.0, 1.0],
@@ -161,36 +202,87 @@ class GLTFParser:
             if 'baseColorFactor' in pbr:
                 data['albedo'] = pbr['baseColorFactor']
             if 'baseColorTexture' in pbr:
-                tex = textures[pbr['baseColorTexture']['index']]
-                data['albedo'] = tex
-
-            materials[material.get('name', f'material_{i}')] = pipeline.create_material(data)
-
-        for i, mesh in enumerate(model['primitives']):
-            pos_accessor = mesh['attributes']['POSITION']
-            positions = np.array(self.get_accessor_data(pos_accessor), np.float32)
-
-            if scale:
-                positions *= np.array(scale, dtype=np.float32)
-
-            normal_accessor = mesh['attributes'].get('NORMAL')
-            normals = np.array(self.get_accessor_data(normal_accessor), np.float32) if normal_accessor is not None else None
+                texture_index = pbr['baseColorTexture']['index']
+                textures = self.gltf.get('textures')
+                data['albedo'] = {'texture': textures[texture_index].get('source', texture_index) if textures else texture_index}
+
+            materials[material.get('name', f'material_{i}')] = data
+        return materials
+
+    def decode_primitives(self, model_indices: list[int] = None, scale: tuple[int, int, int] = None) -> list[DecodedPrimitive]:
+        """Decodes the vertex data of the models at the indices, or of every model in the file."""
+        if model_indices is None:
+            model_indices = range(len(self.gltf['meshes']))
+
+        primitives = []
+        for model_index in model_indices:
+            model = self.gltf['meshes'][model_index]
+            name = model.get('name', f'model_{model_index}')
+            for i, mesh in enumerate(model['primitives']):
+                pos_accessor = mesh['attributes']['POSITION']
+                positions = np.asarray(self.get_accessor_data(pos_accessor), np.float32)
+
+                if scale:
+                    positions = positions * np.array(scale, dtype=np.float32)
+
+                normal_accessor = mesh['attributes'].get('NORMAL')
+                normals = np.asarray(self.get_accessor_data(normal_accessor), np.float32) if normal_accessor is not None else None
+
+                uv_accessor = mesh['attributes'].get('TEXCOORD_0')
+                uvs = np.asarray(self.get_accessor_data(uv_accessor), np.float32) if uv_accessor is not None else None
+
+                index_accessor = mesh.get('indices')
+                if index_accessor is not None:
+                    indices = np.asarray(self.get_accessor_data(index_accessor), np.uint32)
+                else:
+                    indices = np.arange(len(positions), dtype=np.uint32)
+
+                material_index = mesh.get('material')
+                material_name = "default"
+                if material_index is not None:
+                    material = self.gltf['materials'][material_index]
+                    material_name = material.get('name', f'material_{material_index}')
+
+                primitives.append(DecodedPrimitive(f"Mesh_{i}", positions, normals, uvs, indices, material_name, get_bounds(positions), name))
+        return primitives
+
+    def decode_model(self, model_name: str = None, texture_manager: 'TextureManager' = None, scale: tuple[int, int, int] = None) -> DecodedModel:
+        """Decodes the image pixels and vertex data of a model without touching the GPU, safe to call off the main thread."""
+        model_index = 0 if model_name is None else self.get_model_index(model_name)
+        if model_index is None:
+            raise ValueError(f'No model named "{model_name}".')
+
+        image_data = self.get_images()
+        images = {}
+        if texture_manager is not None:
+            images = {i: texture_manager._decode_image(data) for i, data in image_data.items()}
+
+        return DecodedModel(images, self.decode_primitives([model_index], scale), self.get_materials(), image_data)
+
+    def upload_model(self, decoded: DecodedModel, pipeline: GraphicsPipeline, renderer: Renderer) -> Model:
+        """Creates the textures, materials and meshes of a decoded model, main thread only."""
+        return Model.from_decoded(decoded, pipeline, renderer)
 
-            uv_accessor = mesh['attributes'].get('TEXCOORD_0')
-            uvs = np.array(self.get_accessor_data(uv_accessor), np.float32) if uv_accessor is not None else None
-
-            index_accessor = mesh['indices']
-            indices = np.array(self.get_accessor_data(index_accessor), np.int32)
-
-            mesh_name = f"Mesh_{i}"
-
-            material_index = mesh.get('material')
-            material_name = "default"
-            if material_index is not None:
-                material = self.gltf['materials'][material_index]
-                material_name = material.get('name', f'material_{material_index}')
-
-            meshes[mesh_name] = renderer.mesh_class(positions, normals, uvs, indices)
-            material_map[mesh_name] = material_name
-
-        return Model(meshes, material_map, materials)
\ No newline at end of file
+    def build_model(self, model_name: str, pipeline: GraphicsPipeline, renderer: Renderer, scale: tuple[int, int, int] = None) -> Model:
+        return self.upload_model(self.decode_model(model_name, renderer.texture_manager, scale), pipeline, renderer)
+
+    def to_data(self) -> bytes:
+        """Converts every model in the file to the engine's binary model format."""
+        return encode_model(self.decode_primitives(), self.get_materials(), self.get_images())
+
+
+def read_gltf(path: str) -> GLTFParser:
+    """Reads a .gltf (with its .bin buffer next to it) or .glb file from disk."""
+    if path.endswith('.glb'):
+        with open(path, 'rb') as f:
+            glb_parser = GLBParser(f.read())
+        return GLTFParser(glb_parser.get_json(), glb_parser.get_binary_buffer())
+
+    with open(path, 'r') as f:
+        gltf = json.load(f)
+    bin_data = b''
+    bin_path = path.removesuffix('.gltf') + '.bin'
+    if os.path.exists(bin_path):
+        with open(bin_path, 'rb') as f:
+            bin_data = f.read()
+    return GLTFParser(gltf, bin_data)
@@ -1,28 +1,139 @@
 from FreeBodyEngine.core.node import Node3D
 from FreeBodyEngine.graphics.mesh import Mesh
 from FreeBodyEngine.graphics.material import Material
+from FreeBodyEngine.graphics.model.model_file import DecodedModel, DecodedPrimitive, ModelFile, MODEL_ATTRIBUTES, encode_model, get_bounds, interleave_vertices
 from FreeBodyEngine.math import Vector3
+from FreeBodyEngine.core.camera import CAMERA_PROJECTION
+from typing import TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from FreeBodyEngine.graphics.pipeline import GraphicsPipeline
+    from FreeBodyEngine.graphics.renderer import Renderer
+    from FreeBodyEngine.core.camera import Camera
+
+# the screen height fraction a model must fall below to switch to each LOD level
+LOD_SCREEN_SIZES = (0.25, 0.1, 0.04)
 
 class Model:
-    def __init__(self, meshes: dict[str, Mesh], material_map: dict[str, str], materials: dict[str, Material]):
+    def __init__(self, meshes: dict[str, Mesh], material_map: dict[str, str], materials: dict[str, Material], bounds: dict[str, np.ndarray] = None):
         self.meshes: dict[str, Mesh] = meshes
         self.material_map: dict[str, str] = material_map
         self.materials: dict[str, Material] = materials
-        
+        self.bounds: dict[str, np.ndarray] = bounds or {} # mesh name -> [[min x, y, z], [max x, y, z]]
+        self.lods: dict[str, list[Mesh]] = {} # mesh name -> simplified meshes, from most to least detailed
+
+        # the source material properties and encoded images, used by "to_data"
+        self.material_data: dict[str, dict] = {}
+        self.image_data: dict[int, bytes] = {}
+
         self.animations = None
         self.skeleton = None
 
-    def to_data(self) -> dict:
-        pass
+    def get_bounds(self) -> np.ndarray:
+        """The bounds of every mesh combined."""
+        bounds = [self.bounds.get(name) if name in self.bounds else get_bounds(np.asarray(mesh.attributes['verticies'][1]).reshape(-1, 3)) for name, mesh in self.meshes.items()]
+        if not bounds:
+            return np.zeros((2, 3), np.float32)
+        bounds = np.array(bounds)
+        return np.array([bounds[:, 0].min(axis=0), bounds[:, 1].max(axis=0)], np.float32)
+
+    @property
+    def lod_count(self) -> int:
+        """The number of detail levels, including the full detail meshes."""
+        return 1 + max((len(lods) for lods in self.lods.values()), default=0)
+
+    def get_meshes(self, lod: int = 0) -> dict[str, Mesh]:
+        """The meshes to draw at a detail level, meshes with fewer levels use their least detailed one."""
+        if lod <= 0:
+            return self.meshes
+        return {name: self.lods[name][min(lod, len(self.lods[name])) - 1] if self.lods.get(name) else mesh for name, mesh in self.meshes.items()}
+
+    def to_data(self) -> bytes:
+        """Writes the model to the engine's binary model format."""
+        primitives = []
+        for name, mesh in self.meshes.items():
+            for lod, lod_mesh in enumerate([mesh] + self.lods.get(name, [])):
+                attributes = {semantic: np.asarray(attribute[1]).reshape(lod_mesh.vertex_count, -1) for semantic, attribute in lod_mesh.attributes.items()}
+                primitives.append(DecodedPrimitive(name, attributes['verticies'], attributes.get('normals'), attributes.get('uvs'), lod_mesh.indices, self.material_map.get(name, 'default'), self.bounds.get(name) if lod == 0 else None, lod=lod, vertices=lod_mesh.vertex_data))
+        return encode_model(primitives, self.material_data, self.image_data)
 
     @classmethod
-    def from_data(self) -> 'Model':
+    def from_data(cls, data: bytes, pipeline: 'GraphicsPipeline', renderer: 'Renderer', model_name: str = None) -> 'Model':
         '''Creates a model object from the data generated by the "to_data" function. '''
-        pass
+        return cls.from_decoded(ModelFile(data).decode_model(model_name, renderer.texture_manager), pipeline, renderer)
+
+    @classmethod
+    def from_decoded(cls, decoded: DecodedModel, pipeline: 'GraphicsPipeline', renderer: 'Renderer') -> 'Model':
+        """Creates the textures, materials and meshes of a decoded model, main thread only."""
+        meshes = {}
+        materials = {}
+        textures = {}
+        material_map = {}
+        bounds = {}
+
+        for texture_index, pixels in decoded.images.items():
+            textures[texture_index] = renderer.texture_manager._upload_standalone_texture(pixels)
+
+        for name, properties in decoded.materials.items():
+            data = {key: textures[value['texture']] if isinstance(value, dict) and 'texture' in value else value for key, value in properties.items()}
+            materials[name] = pipeline.create_material(data)
+
+        mesh_class = renderer.get_mesh_class()
+        lods: dict[str, list[tuple[int, Mesh]]] = {}
+        for primitive in decoded.primitives:
+            # model files are already in the runtime layout and upload without a copy, glTF primitives are interleaved here
+            mesh = mesh_class.from_interleaved(interleave_vertices(primitive), MODEL_ATTRIBUTES, primitive.indices)
+            if primitive.lod > 0:
+                lods.setdefault(primitive.name, []).append((primitive.lod, mesh))
+                continue
+
+            meshes[primitive.name] = mesh
+            material_map[primitive.name] = primitive.material
+            bounds[primitive.name] = primitive.bounds if primitive.bounds is not None else get_bounds(primitive.positions)
+
+        model = cls(meshes, material_map, materials, bounds)
+        model.lods = {name: [mesh for _, mesh in sorted(levels, key=lambda level: level[0])] for name, levels in lods.items()}
+        model.material_data = decoded.materials
+        model.image_data = decoded.image_data
+        return model
 
 
 class Model3D(Node3D):
-    def __init__(self, model: Model, position: Vector3 = Vector3(), rotation: Vector3 = Vector3(), scale: Vector3 = Vector3(1, 1, 1)):
+    """
+    Draws a model, switching to its simplified LOD meshes as it gets smaller on screen.
+
+    :param lod_screen_sizes: The screen height fraction the model's bounding sphere must fall below to use each LOD level.
+    """
+    def __init__(self, model: Model, position: Vector3 = Vector3(), rotation: Vector3 = Vector3(), scale: Vector3 = Vector3(1, 1, 1), lod_screen_sizes: tuple[float, ...] = LOD_SCREEN_SIZES):
         super().__init__(position, rotation, scale)
 
         self._model = model
+        self.lod_screen_sizes = lod_screen_sizes
+
+    def get_screen_size(self, camera: 'Camera') -> float:
+        """The fraction of the screen's height covered by the model's bounding sphere."""
+        transform = self.world_transform
+        bounds = self._model.get_bounds()
+        scale = np.abs(np.array(tuple(transform.scale), np.float32))
+        radius = float(np.linalg.norm((bounds[1] - bounds[0]) * 0.5 * scale))
+        center = np.array(tuple(transform.position), np.float32) + (bounds[0] + bounds[1]) * 0.5 * scale
+
+        projection_scale = float(camera.proj_matrix[1][1])
+        if camera.projection == CAMERA_PROJECTION.ORTHOGRAPHIC:
+            return radius * projection_scale
+
+        distance = float(np.linalg.norm(center - np.array(tuple(camera.world_transform.position), np.float32)))
+        if distance <= radius:
+            return float('inf')
+        return radius * projection_scale / distance
+
+    def get_lod(self, camera: 'Camera') -> int:
+        if self._model.lod_count <= 1:
+            return 0
+        screen_size = self.get_screen_size(camera)
+        lod = 0
+        for threshold in self.lod_screen_sizes[:self._model.lod_count - 1]:
+            if screen_size < threshold:
+                lod += 1
+        return lod
@@ -0,0 +1,220 @@
+"""
+The engine's binary model format, written by release builds so models load without parsing glTF.
+
+Layout (little endian):
+    header          magic "FBMD", version, flags, primitive count, image count, materials length
+    primitive table vertex offset, index offset, vertex count, index count, index size, lod level, bounds,
+                    the lengths of the model, primitive and material names, followed by the names
+    image table     offset and length of each encoded image
+    materials       utf-8 json, material name -> properties, textures are {"texture": image index}
+    data            16 byte aligned vertex buffers, index buffers and images. Vertices are interleaved in the layout
+                    model meshes use at runtime (`MODEL_ATTRIBUTES`), so they are uploaded straight from the file
+"""
+
+import json
+import struct
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from FreeBodyEngine.graphics.mesh import AttributeType, AttributeFormat, get_vertex_layout, get_layout_dtype, convert_attribute
+
+MODEL_MAGIC = b"FBMD"
+MODEL_VERSION = 3
+MODEL_FILE_EXTENSION = "fbmdl"
+
+HEADER = struct.Struct("<4sHHIII")
+PRIMITIVE_ENTRY = struct.Struct("<QQIIBB6fHHH")
+IMAGE_ENTRY = struct.Struct("<QQ")
+DATA_ALIGNMENT = 16
+
+# the attributes of model meshes, in the order they are interleaved
+MODEL_ATTRIBUTES = {
+    "verticies": (AttributeType.VEC3, AttributeFormat.FLOAT32),
+    "uvs": (AttributeType.VEC2, AttributeFormat.FLOAT32),
+    "normals": (AttributeType.VEC3, AttributeFormat.SNORM16),
+}
+VERTEX_DTYPE = get_layout_dtype(*get_vertex_layout({name: (type, None, format) for name, (type, format) in MODEL_ATTRIBUTES.items()}))
+INDEX_DTYPES = {2: np.dtype("<u2"), 4: np.dtype("<u4")}
+
+
+@dataclass
+class DecodedPrimitive:
+    name: str
+    positions: np.ndarray
+    normals: np.ndarray | None # floats, or SNORM16 when viewed from a model file
+    uvs: np.ndarray | None
+    indices: np.ndarray
+    material: str
+    bounds: np.ndarray = None # [[min x, y, z], [max x, y, z]]
+    model: str = ""
+    lod: int = 0 # 0 is the full detail mesh, higher levels are simplified versions of the primitive with the same name
+    vertices: np.ndarray = None # the interleaved vertices in the `VERTEX_DTYPE` layout, the other attributes are views of it
+
+
+@dataclass
+class DecodedModel:
+    images: dict[int, tuple[np.ndarray, int, int]]
+    primitives: list[DecodedPrimitive]
+    materials: dict[str, dict] = field(default_factory=dict)
+    image_data: dict[int, bytes] = field(default_factory=dict) # the encoded images, kept to write the model back out
+
+
+def get_bounds(positions: np.ndarray) -> np.ndarray:
+    if len(positions) == 0:
+        return np.zeros((2, 3), np.float32)
+    return np.array([positions.min(axis=0), positions.max(axis=0)], np.float32)
+
+
+def get_model_file_path(path: str) -> str:
+    """The path release builds write the converted version of a model file to."""
+    return path.rsplit(".", 1)[0] + "." + MODEL_FILE_EXTENSION
+
+
+def _align(offset: int) -> int:
+    return (offset + DATA_ALIGNMENT - 1) & ~(DATA_ALIGNMENT - 1)
+
+
+def interleave_vertices(primitive: DecodedPrimitive) -> np.ndarray:
+    """The primitive's vertices in the runtime layout, normals are converted to SNORM16."""
+    if primitive.vertices is not None:
+        return primitive.vertices
+    vertices = np.zeros(len(primitive.positions), VERTEX_DTYPE)
+    vertices["verticies"] = primitive.positions
+    if primitive.normals is not None:
+        vertices["normals"] = convert_attribute(primitive.normals, MODEL_ATTRIBUTES["normals"][1])
+    if primitive.uvs is not None:
+        vertices["uvs"] = primitive.uvs
+    return vertices
+
+
+def encode_model(primitives: list[DecodedPrimitive], materials: dict[str, dict], images: dict[int, bytes] = None) -> bytes:
+    """
+    Writes primitives, material properties and encoded images to the binary model format.
+    Indices are stored as uint16 whenever the vertex count allows it.
+    """
+    images = images or {}
+    image_list = [images[i] for i in sorted(images)]
+    material_bytes = json.dumps(materials).encode("utf-8")
+
+    blobs: list[bytes] = []
+    names = []
+    index_sizes = []
+    for primitive in primitives:
+        vertices = interleave_vertices(primitive)
+        index_size = 2 if len(vertices) <= 0xFFFF else 4
+        index_sizes.append(index_size)
+        indices = np.asarray(primitive.indices).astype(INDEX_DTYPES[index_size], copy=False)
+        blobs.extend((vertices.tobytes(), indices.tobytes()))
+        names.append(tuple(name.encode("utf-8") for name in (primitive.model, primitive.name, primitive.material)))
+    blobs.extend(bytes(image) for image in image_list)
+
+    table_size = sum(PRIMITIVE_ENTRY.size + sum(len(name) for name in entry_names) for entry_names in names)
+    offset = _align(HEADER.size + table_size + IMAGE_ENTRY.size * len(image_list) + len(material_bytes))
+    offsets = []
+    for blob in blobs:
+        offsets.append(offset)
+        offset = _align(offset + len(blob))
+
+    out = bytearray(offset)
+    HEADER.pack_into(out, 0, MODEL_MAGIC, MODEL_VERSION, 0, len(primitives), len(image_list), len(material_bytes))
+    position = HEADER.size
+    for i, primitive in enumerate(primitives):
+        bounds = primitive.bounds if primitive.bounds is not None else get_bounds(primitive.positions)
+        model_name, name, material = names[i]
+        PRIMITIVE_ENTRY.pack_into(out, position, offsets[i * 2], offsets[i * 2 + 1], len(primitive.positions), len(primitive.indices), index_sizes[i], primitive.lod, *np.ravel(bounds), len(model_name), len(name), len(material))
+        position += PRIMITIVE_ENTRY.size
+        for string in names[i]:
+            out[position:position + len(string)] = string
+            position += len(string)
+
+    image_offsets = offsets[len(primitives) * 2:]
+    for image_offset, image in zip(image_offsets, image_list):
+        IMAGE_ENTRY.pack_into(out, position, image_offset, len(image))
+        position += IMAGE_ENTRY.size
+    out[position:position + len(material_bytes)] = material_bytes
+
+    for blob_offset, blob in zip(offsets, blobs):
+        out[blob_offset:blob_offset + len(blob)] = blob
+    return bytes(out)
+
+
+@dataclass(slots=True)
+class ModelFilePrimitive:
+    model: str
+    name: str
+    material: str
+    vertex_offset: int
+    vertex_count: int
+    index_offset: int
+    index_count: int
+    index_size: int
+    lod: int
+    bounds: np.ndarray
+
+
+class ModelFile:
+    """
+    Reads the binary model format. Vertex and index arrays are views of the data passed in, so a file read
+    from a memory mapped pack is never copied before upload, unless the model is scaled.
+
+    :param data: The model file bytes, or a memoryview of them.
+    """
+    def __init__(self, data):
+        self.data = data
+        magic, version, _, primitive_count, image_count, materials_length = HEADER.unpack_from(data, 0)
+        if magic != MODEL_MAGIC:
+            raise ValueError("Not a FreeBody model file.")
+        if version != MODEL_VERSION:
+            raise ValueError(f"Unsupported model file version {version}, expected {MODEL_VERSION}.")
+
+        self.primitives: list[ModelFilePrimitive] = []
+        position = HEADER.size
+        for _ in range(primitive_count):
+            vertex_offset, index_offset, vertex_count, index_count, index_size, lod, *entry = PRIMITIVE_ENTRY.unpack_from(data, position)
+            bounds, lengths = entry[:6], entry[6:]
+            position += PRIMITIVE_ENTRY.size
+
+            names = []
+            for length in lengths:
+                names.append(str(data[position:position + length], "utf-8"))
+                position += length
+            self.primitives.append(ModelFilePrimitive(*names, vertex_offset, vertex_count, index_offset, index_count, index_size, lod, np.array(bounds, np.float32).reshape(2, 3)))
+
+        self.images: dict[int, memoryview] = {}
+        view = memoryview(data)
+        for i in range(image_count):
+            offset, length = IMAGE_ENTRY.unpack_from(data, position)
+            self.images[i] = view[offset:offset + length]
+            position += IMAGE_ENTRY.size
+
+        self.materials: dict[str, dict] = json.loads(str(data[position:position + materials_length], "utf-8"))
+
+    def get_model_names(self) -> list[str]:
+        return list(dict.fromkeys(primitive.model for primitive in self.primitives))
+
+    def decode_model(self, model_name: str = None, texture_manager=None, scale: tuple[int, int, int] = None) -> DecodedModel:
+        """Decodes the images of a model, its vertex data is only viewed. Safe to call off the main thread."""
+        if model_name is None:
+            model_name = self.primitives[0].model if self.primitives else ""
+
+        primitives = []
+        for primitive in self.primitives:
+            if primitive.model != model_name:
+                continue
+            vertices = np.frombuffer(self.data, VERTEX_DTYPE, primitive.vertex_count, primitive.vertex_offset)
+            indices = np.frombuffer(self.data, INDEX_DTYPES[primitive.index_size], primitive.index_count, primitive.index_offset)
+
+            bounds = primitive.bounds
+            if scale:
+                scale = np.array(scale, np.float32)
+                vertices = vertices.copy()
+                vertices["verticies"] *= scale
+                bounds = np.sort(bounds * scale, axis=0)
+
+            primitives.append(DecodedPrimitive(primitive.name, vertices["verticies"], vertices["normals"], vertices["uvs"], indices, primitive.material, bounds, model_name, primitive.lod, vertices))
+
+        images = {}
+        if texture_manager is not None:
+            images = {i: texture_manager._decode_image(image) for i, image in self.images.items()}
+        return DecodedModel(images, primitives, self.materials, dict(self.images))
@@ -1,52 +1,85 @@
 from FreeBodyEngine.graphics.pipeline import GraphicsPipeline
 from FreeBodyEngine.core.scene import SceneManager
 from FreeBodyEngine import get_service
+from FreeBodyEngine.core.service import ServiceRef
 from FreeBodyEngine.graphics.color import Color
 from FreeBodyEngine.graphics.pbr.material import PBRMaterial
 
 from FreeBodyEngine.graphics.framebuffer import AttachmentFormat, AttachmentType
+from FreeBodyEngine.graphics.render_graph import RenderGraph, BACKBUFFER
+from FreeBodyEngine.graphics.dynamic_resolution import DynamicResolution
 from FreeBodyEngine.core.tilemap.renderer import TilemapRenderer
 from FreeBodyEngine.graphics.sprite import Sprite2D, Sprite
 from FreeBodyEngine.graphics.debug import Debug2D
 from FreeBodyEngine.graphics.model.model import Model3D
 
 class PBRPipeline(GraphicsPipeline):
-    def __init__(self):
+    """
+    :param dynamic_resolution: Renders the G-buffer at a lower resolution when GPU frame times go over the target, and upscales it to the window.
+    :param render_scale: The fixed render scale when dynamic resolution is off.
+    """
+    window = ServiceRef('window')
+
+    def __init__(self, dynamic_resolution: DynamicResolution = None, render_scale: float = 1.0):
         super().__init__()
         self.dependencies.append('scene_manager')
-        
+        self.dynamic_resolution = dynamic_resolution
+        self.render_scale = render_scale
+        self._measured_frame = None
+
 
     def on_initialize(self):
         super().on_initialize()
         self.scene_manager = get_service('scene_manager')
         self.scene_manager: SceneManager
         
-        self.main_framebuffer = self.renderer.create_framebuffer(int(get_service('window').size[0]), int(get_service('window').size[1]), {
-            'albedo': (AttachmentType.COLOR, AttachmentFormat.RGBA8),
-            'normal': (AttachmentType.COLOR, AttachmentFormat.RGBA8),
-            'emmision': (AttachmentType.COLOR, AttachmentFormat.RGBA8),
-            'roughness': (AttachmentType.COLOR, AttachmentFormat.R8),
-            'metallic': (AttachmentType.COLOR, AttachmentFormat.R8),
-            'depth': (AttachmentType.DEPTH, AttachmentFormat.DEPTH24)
-        }, transparent = True
-        )
-        
+        # the G-buffer, attachments no pass reads are culled from the graph
+        self.graph = RenderGraph(self.renderer, self.window.size)
+        self.graph.set_render_scale(self.render_scale)
+        self.graph.add_attachment('albedo', AttachmentType.COLOR, AttachmentFormat.RGBA8)
+        self.graph.add_attachment('normal', AttachmentType.COLOR, AttachmentFormat.RGBA8)
+        self.graph.add_attachment('emmision', AttachmentType.COLOR, AttachmentFormat.RGBA8)
+        self.graph.add_attachment('roughness', AttachmentType.COLOR, AttachmentFormat.R8)
+        self.graph.add_attachment('metallic', AttachmentType.COLOR, AttachmentFormat.R8)
+        self.graph.add_attachment('depth', AttachmentType.DEPTH, AttachmentFormat.DEPTH24)
+
+        self.graph.add_pass('gbuffer', self.draw_gbuffer, outputs=['albedo', 'normal', 'emmision', 'roughness', 'metallic', 'depth'], transparent=True)
+        self.graph.add_pass('present', self.present, inputs=['albedo'], outputs=[BACKBUFFER])
+
+    def on_destroy(self):
+        super().on_destroy()
+        self.graph.destroy()
+
     def resize(self, size: tuple[int, int]):
-        self.main_framebuffer.resize(size)
+        self.graph.resize(size)
+
+    def get_pass_times(self) -> dict[str, float]:
+        """The GPU time of each render pass in milliseconds."""
+        return self.graph.get_pass_times()
 
     def draw(self):
-        self.main_framebuffer.bind()
+        if self.dynamic_resolution is not None:
+            # only a frame that read new query results is a measurement, the others pass 0
+            stats = self.renderer.get_frame_stats()
+            gpu_time = stats.gpu_time if stats is not self._measured_frame else 0.0
+            self._measured_frame = stats
+            self.graph.set_render_scale(self.dynamic_resolution.update(gpu_time))
+        self.graph.execute()
+
+    def draw_gbuffer(self, graph: RenderGraph):
         camera = self.scene_manager.get_active().camera
         self.renderer.clear(camera.background_color)
         self.renderer.enable_depth_testing()
 
         tilemaps: list[TilemapRenderer] = camera.scene.root.find_nodes_with_type('TilemapRenderer')
-        for tilemap in tilemaps:
-            tilemap.draw(camera)
+        with self.renderer.gpu_scope('tilemaps'):
+            for tilemap in tilemaps:
+                tilemap.draw(camera)
 
         sprites: list[Sprite2D] = camera.scene.root.find_nodes_with_type('Sprite2D')
-        for sprite in sprites:
-            self.renderer.draw_mesh(sprite._sprite.quad, sprite._sprite.material, sprite.world_transform, camera)
+        with self.renderer.gpu_scope('sprites'):
+            for sprite in sprites:
+                self.renderer.draw_mesh(sprite._sprite.quad, sprite._sprite.material, sprite.world_transform, camera)
 
         debugs: list[Debug2D] = camera.scene.root.find_nodes_with_type('Debug2D')
         for debug in debugs:
@@ -54,15 +87,15 @@ class PBRPipeline(GraphicsPipeline):
 
 
         models: list[Model3D] = camera.scene.root.find_nodes_with_type('Model3D')
-        for model in models:    
-            self.renderer.draw_model(
-                model._model, model.world_transform, camera)
+        with self.renderer.gpu_scope('models'):
+            for model in models:    
+                self.renderer.draw_model(
+                    model._model, model.world_transform, camera, model.get_lod(camera))
             
         self.renderer.disable_depth_testing()
 
-        self.main_framebuffer.unbind()
-        window_size = get_service('window').size
-        self.main_framebuffer.draw('albedo', window_size)
+    def present(self, graph: RenderGraph):
+        graph.draw_attachment('albedo', self.window.size)
 
 
     def create_material(self, data, injector):
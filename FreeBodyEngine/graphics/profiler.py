@@ -0,0 +1,183 @@
+"""
+Per frame render statistics and the debug overlay that shows them.
+
+The renderer counts the work it submits (draw calls, triangles, uniform uploads, texture binds and uploaded bytes)
+into the current frame's `FrameStats`, and times the GPU work of named scopes with timer queries. The whole draw
+phase is timed as the "frame" scope. GPU times are read a frame late, so a frame's stats hold the GPU times of the
+frame before it. When the results aren't ready in time the frame's `gpu_times` is empty, and its `gpu_time` is 0.
+
+Automated performance tests can read the stats through `get_render_stats()`, for example the average of the last
+frames with `get_render_stats().get_average()`.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field, fields
+import time
+
+from FreeBodyEngine import get_service, register_service_update, unregister_service_update
+from FreeBodyEngine.core.service import Service, ServiceRef
+from FreeBodyEngine.graphics.color import Color
+
+# the draw phase priorities the renderer starts and ends its frames at, draws registered between them are counted
+FRAME_BEGIN_PRIORITY = -1000
+FRAME_END_PRIORITY = 1000
+# drawn after the pipeline so the overlay is on top, and inside the frame so it is counted too
+OVERLAY_PRIORITY = 900
+
+FRAME_SCOPE = "frame"
+HISTORY_FRAMES = 120
+
+
+@dataclass(slots=True)
+class FrameStats:
+    draw_calls: int = 0
+    triangles: int = 0
+    uniform_uploads: int = 0
+    texture_binds: int = 0
+    buffer_upload_bytes: int = 0
+    texture_upload_bytes: int = 0
+    cpu_time: float = 0.0 # milliseconds spent in the draw phase
+    gpu_times: dict[str, float] = field(default_factory=dict) # milliseconds of GPU time per scope, empty without new results
+
+    @property
+    def gpu_time(self) -> float:
+        """The GPU time of the whole frame in milliseconds."""
+        return self.gpu_times.get(FRAME_SCOPE, 0.0)
+
+    def __str__(self):
+        # counts are floats in averaged stats
+        return (f"{self.gpu_time:.2f} ms GPU, {self.cpu_time:.2f} ms CPU, {self.draw_calls:.0f} draws, {self.triangles:.0f} tris, "
+                f"{self.uniform_uploads:.0f} uniforms, {self.texture_binds:.0f} binds, {(self.buffer_upload_bytes + self.texture_upload_bytes) / 1024:.1f} KB uploaded")
+
+
+class RenderStats:
+    """Collects the stats of each frame, keeps the last `HISTORY_FRAMES` of them."""
+    def __init__(self):
+        self.current = FrameStats()
+        self.last = FrameStats()
+        self.history: deque[FrameStats] = deque(maxlen=HISTORY_FRAMES)
+        self.gpu_times: dict[str, float] = {} # the latest GPU times that were read
+        self._frame_start = None
+
+    def count_draw(self, triangles: int, instances: int = 1):
+        self.current.draw_calls += 1
+        self.current.triangles += triangles * instances
+
+    def count_uniforms(self, count: int = 1):
+        self.current.uniform_uploads += count
+
+    def count_texture_bind(self):
+        self.current.texture_binds += 1
+
+    def count_buffer_upload(self, size: int):
+        self.current.buffer_upload_bytes += size
+
+    def count_texture_upload(self, size: int):
+        self.current.texture_upload_bytes += size
+
+    def begin_frame(self):
+        self._frame_start = time.perf_counter()
+
+    def end_frame(self, gpu_times: dict[str, float]):
+        """Finishes the current frame, uploads made between frames (like asset loading) count toward the next one."""
+        if self._frame_start is not None:
+            self.current.cpu_time = (time.perf_counter() - self._frame_start) * 1000
+            self._frame_start = None
+        if gpu_times:
+            self.current.gpu_times = dict(gpu_times)
+            self.gpu_times = self.current.gpu_times
+        self.last = self.current
+        self.history.append(self.current)
+        self.current = FrameStats()
+
+    def get_average(self, frames: int = None) -> FrameStats:
+        """The average stats of the last frames, every recorded frame by default. GPU times are averaged over the frames that have them."""
+        history = list(self.history)[-frames:] if frames else list(self.history)
+        average = FrameStats()
+        if not history:
+            return average
+
+        for stat in fields(FrameStats):
+            if stat.name != "gpu_times":
+                setattr(average, stat.name, sum(getattr(frame, stat.name) for frame in history) / len(history))
+        timed = [frame for frame in history if frame.gpu_times]
+        for frame in timed:
+            for name, elapsed in frame.gpu_times.items():
+                average.gpu_times[name] = average.gpu_times.get(name, 0.0) + elapsed / len(timed)
+        return average
+
+    def reset(self):
+        self.current = FrameStats()
+        self.last = FrameStats()
+        self.history.clear()
+        self.gpu_times = {}
+
+
+_stats = RenderStats()
+
+def get_render_stats() -> RenderStats:
+    return _stats
+
+
+OVERLAY_COLORS = [Color("#4fc3f7"), Color("#81c784"), Color("#ffb74d"), Color("#e57373"), Color("#ba68c8"), Color("#fff176")]
+BUDGET_COLOR = Color("#ffffff")
+
+
+class RenderStatsOverlay(Service):
+    """
+    Draws the GPU time of each scope as a stacked bar in the top left corner, with a white mark at the frame budget,
+    and shows the averaged frame stats in the window title.
+
+    :param budget: The frame budget in milliseconds, the full width of the bar.
+    :param scopes: The GPU scopes drawn in the bar, the render passes of the pipeline by default.
+    :param update_interval: Seconds between updates of the window title.
+    """
+    window = ServiceRef('window')
+
+    def __init__(self, budget: float = 1000 / 60, scopes: list[str] = None, update_interval: float = 0.5):
+        super().__init__('render_stats_overlay')
+        self.dependencies.extend(['renderer', 'window'])
+        self.budget = budget
+        self.scopes = scopes
+        self.update_interval = update_interval
+        self.title: str = None
+        self._last_update = 0.0
+
+    def on_initialize(self):
+        self.renderer = get_service('renderer')
+        register_service_update('draw', self.draw, OVERLAY_PRIORITY)
+
+    def on_destroy(self):
+        unregister_service_update('draw', self.draw)
+        if self.title is not None:
+            self.window.set_title(self.title)
+
+    def get_scopes(self) -> list[str]:
+        if self.scopes is not None:
+            return self.scopes
+        graphics = get_service('graphics')
+        graph = getattr(graphics, 'graph', None)
+        if graph is not None:
+            return [render_pass.name for render_pass in graph.schedule]
+        return [FRAME_SCOPE]
+
+    def draw(self):
+        stats = get_render_stats()
+        times = stats.gpu_times
+
+        # NDC, the bar is 40% of the screen wide at the top left
+        left, top, width = -0.98, 0.96, 0.4
+        x = left
+        for i, scope in enumerate(self.get_scopes()):
+            length = width * times.get(scope, 0.0) / self.budget
+            if length > 0:
+                self.renderer.draw_line((x, top), (x + length, top), 8, OVERLAY_COLORS[i % len(OVERLAY_COLORS)])
+                x += length
+        self.renderer.draw_line((left + width, top + 0.02), (left + width, top - 0.02), 2, BUDGET_COLOR)
+
+        now = time.perf_counter()
+        if now - self._last_update >= self.update_interval:
+            self._last_update = now
+            if self.title is None:
+                self.title = self.window.title
+            self.window.set_title(f"{self.title} | {stats.get_average(30)}")
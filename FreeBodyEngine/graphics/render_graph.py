@@ -0,0 +1,298 @@
+"""
+A declarative render graph. Passes declare the attachments they read and write, the graph works out which passes and
+attachments a frame needs, creates their framebuffers and runs the passes in the order they were added.
+
+Compiling the graph:
+    culling     passes are only run if something they write is read on the way to the backbuffer. Color attachments
+                nothing reads are left out of their pass's framebuffer, the shader outputs for them are discarded.
+    aliasing    a pass reuses the framebuffer of an earlier pass with the same attachment layout once nothing reads
+                the earlier pass's attachments anymore, so transient attachments share video memory.
+    resizing    resizes are recorded and applied before the next frame, a window dragged through several resize
+                events only reallocates once. Attachments are allocated at the largest size the graph has had and
+                rendered to through a viewport, so shrinking the window or changing the render scale never
+                reallocates them.
+
+The render scale renders every attachment at a fraction of the graph's size, passes drawing to the backbuffer
+upscale them. Passes sampling attachments need to scale their UVs by `get_uv_scale`.
+
+Each pass is timed with a GPU timer named after it.
+"""
+
+from typing import Callable, TYPE_CHECKING
+
+from FreeBodyEngine import warning
+from FreeBodyEngine.graphics.framebuffer import AttachmentFormat, AttachmentType, Framebuffer
+
+if TYPE_CHECKING:
+    from FreeBodyEngine.graphics.renderer import Renderer
+
+# the window's framebuffer, passes writing to it are the roots the graph is culled from
+BACKBUFFER = "backbuffer"
+
+
+class GraphAttachment:
+    """An attachment declared on a render graph, the GPU storage behind it is picked when the graph is compiled."""
+    def __init__(self, name: str, type: AttachmentType, format: AttachmentFormat, transient: bool):
+        self.name = name
+        self.type = type
+        self.format = format
+        self.transient = transient # transient attachments are only valid during the frame, their storage can be shared
+
+        self.framebuffer: Framebuffer = None
+        self.target: str = None # the name of the attachment in its framebuffer
+
+
+class RenderPass:
+    """
+    A pass of a render graph.
+
+    :param execute: Called with the graph when the pass runs, after its framebuffer is bound.
+    :param inputs: The attachments the pass reads, they must be written by passes added before it.
+    :param outputs: The attachments the pass writes, color attachments in the order of the fragment shader's output locations. `BACKBUFFER` draws to the window.
+    :param framebuffer_options: Passed on to `Renderer.create_framebuffer`.
+    """
+    def __init__(self, name: str, execute: Callable[['RenderGraph'], None], inputs: list[str], outputs: list[str], framebuffer_options: dict):
+        self.name = name
+        self.execute = execute
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.framebuffer_options = framebuffer_options
+        self.enabled = True
+
+        self.framebuffer: Framebuffer = None # None for passes drawing to the backbuffer
+        self.culled = True
+
+
+class RenderGraph:
+    """
+    :param renderer: The renderer the framebuffers are created with.
+    :param size: The size of every attachment, usually the window size.
+    """
+    def __init__(self, renderer: 'Renderer', size: tuple[int, int]):
+        self.renderer = renderer
+        self.size: tuple[int, int] = (int(size[0]), int(size[1]))
+        self.allocated_size: tuple[int, int] = self.size # the size of the framebuffers, at least `size`
+        self.render_scale = 1.0
+        self.attachments: dict[str, GraphAttachment] = {}
+        self.passes: list[RenderPass] = []
+
+        self.schedule: list[RenderPass] = [] # the passes that run, in order
+        self.framebuffers: list[Framebuffer] = []
+        self._dirty = True
+        self._pending_size: tuple[int, int] = None
+
+    def add_attachment(self, name: str, type: AttachmentType, format: AttachmentFormat, transient: bool = True) -> GraphAttachment:
+        if name in self.attachments or name == BACKBUFFER:
+            raise ValueError(f"Render graph attachment '{name}' already exists.")
+        attachment = GraphAttachment(name, type, format, transient)
+        self.attachments[name] = attachment
+        self._dirty = True
+        return attachment
+
+    def add_pass(self, name: str, execute: Callable[['RenderGraph'], None], inputs: list[str] = (), outputs: list[str] = (), **framebuffer_options) -> RenderPass:
+        """Adds a pass after every pass already in the graph, see `RenderPass`."""
+        if self.get_pass(name) is not None:
+            raise ValueError(f"Render pass '{name}' already exists.")
+        for attachment in (*inputs, *outputs):
+            if attachment != BACKBUFFER and attachment not in self.attachments:
+                raise ValueError(f"Render pass '{name}' uses undeclared attachment '{attachment}'.")
+        if BACKBUFFER in outputs and len(outputs) > 1:
+            raise ValueError(f"Render pass '{name}' draws to the backbuffer, it can't write other attachments.")
+
+        render_pass = RenderPass(name, execute, inputs, outputs, framebuffer_options)
+        self.passes.append(render_pass)
+        self._dirty = True
+        return render_pass
+
+    def get_pass(self, name: str) -> RenderPass | None:
+        return next((render_pass for render_pass in self.passes if render_pass.name == name), None)
+
+    def set_pass_enabled(self, name: str, enabled: bool):
+        """Enables or disables a pass, passes reading attachments only a disabled pass writes are skipped too."""
+        render_pass = self.get_pass(name)
+        if render_pass is None:
+            raise ValueError(f"No render pass named '{name}'.")
+        if render_pass.enabled != enabled:
+            render_pass.enabled = enabled
+            self._dirty = True
+
+    def resize(self, size: tuple[int, int]):
+        """Changes the size of the graph before the next frame, the attachments are only reallocated if it grows past their size."""
+        self._pending_size = (int(size[0]), int(size[1]))
+
+    def set_render_scale(self, scale: float):
+        """Renders the attachments at a fraction of the graph's size from the next frame, without reallocating them."""
+        self.render_scale = min(max(float(scale), 0.01), 1.0)
+
+    def get_render_size(self) -> tuple[int, int]:
+        """The size the attachments are rendered at, the graph's size scaled by the render scale."""
+        return (max(1, round(self.size[0] * self.render_scale)), max(1, round(self.size[1] * self.render_scale)))
+
+    def get_uv_scale(self) -> tuple[float, float]:
+        """The part of an attachment's texture that was rendered to, for passes sampling it."""
+        width, height = self.get_render_size()
+        return (width / self.allocated_size[0], height / self.allocated_size[1])
+
+    def _get_runnable_passes(self) -> list[RenderPass]:
+        """The enabled passes whose inputs are all written by an earlier runnable pass."""
+        runnable = []
+        written = set()
+        for render_pass in self.passes:
+            if not render_pass.enabled:
+                continue
+            missing = [name for name in render_pass.inputs if name not in written]
+            if missing:
+                warning(f"Render pass '{render_pass.name}' reads {', '.join(repr(name) for name in missing)}, which no earlier enabled pass writes. Skipping it.")
+                continue
+            for name in render_pass.outputs:
+                if name != BACKBUFFER and name in written:
+                    raise ValueError(f"Attachment '{name}' is written by more than one render pass.")
+            written.update(render_pass.outputs)
+            runnable.append(render_pass)
+        return runnable
+
+    def compile(self):
+        """Culls the graph and creates its framebuffers, called by `execute` whenever the graph changed."""
+        self._destroy_framebuffers()
+        for render_pass in self.passes:
+            render_pass.culled = True
+            render_pass.framebuffer = None
+        for attachment in self.attachments.values():
+            attachment.framebuffer = attachment.target = None
+
+        runnable = self._get_runnable_passes()
+        writers = {name: render_pass for render_pass in runnable for name in render_pass.outputs if name != BACKBUFFER}
+
+        # walk back from the passes drawing to the backbuffer
+        needed = set()
+        stack = [render_pass for render_pass in runnable if BACKBUFFER in render_pass.outputs]
+        while stack:
+            render_pass = stack.pop()
+            if render_pass.name not in needed:
+                needed.add(render_pass.name)
+                stack.extend(writers[name] for name in render_pass.inputs)
+        self.schedule = [render_pass for render_pass in runnable if render_pass.name in needed]
+
+        last_read: dict[str, int] = {}
+        for i, render_pass in enumerate(self.schedule):
+            render_pass.culled = False
+            for name in render_pass.inputs:
+                last_read[name] = i
+
+        pool: list[tuple[tuple, Framebuffer, int, bool]] = [] # (layout, framebuffer, index of the last pass using it, transient)
+        for i, render_pass in enumerate(self.schedule):
+            if BACKBUFFER in render_pass.outputs:
+                continue
+
+            # depth and stencil attachments are used by the pass itself, only unread color attachments are culled
+            targets: dict[str, GraphAttachment] = {}
+            draw_buffers: list[str | None] = []
+            for name in render_pass.outputs:
+                attachment = self.attachments[name]
+                if attachment.type == AttachmentType.COLOR:
+                    target = f"color{len(draw_buffers)}" if name in last_read else None
+                    draw_buffers.append(target)
+                else:
+                    target = attachment.type.name.lower()
+                if target is not None:
+                    targets[target] = attachment
+            while draw_buffers and draw_buffers[-1] is None:
+                draw_buffers.pop()
+
+            layout = (tuple((target, attachment.type, attachment.format) for target, attachment in targets.items()), tuple(draw_buffers), tuple(sorted(render_pass.framebuffer_options.items())))
+            transient = all(attachment.transient for attachment in targets.values())
+            end = max([i] + [last_read.get(attachment.name, i) for attachment in targets.values()])
+
+            framebuffer = None
+            if transient:
+                for j, (pooled_layout, pooled, pooled_end, pooled_transient) in enumerate(pool):
+                    if pooled_transient and pooled_layout == layout and pooled_end < i:
+                        framebuffer = pooled
+                        pool[j] = (layout, framebuffer, end, transient)
+                        break
+
+            if framebuffer is None:
+                framebuffer = self.renderer.create_framebuffer(self.allocated_size[0], self.allocated_size[1], {target: (attachment.type, attachment.format) for target, attachment in targets.items()}, **render_pass.framebuffer_options)
+                if None in draw_buffers:
+                    framebuffer.set_draw_buffers(draw_buffers)
+                self.framebuffers.append(framebuffer)
+                pool.append((layout, framebuffer, end, transient))
+
+            render_pass.framebuffer = framebuffer
+            for target, attachment in targets.items():
+                attachment.framebuffer = framebuffer
+                attachment.target = target
+
+        self._dirty = False
+
+    def execute(self):
+        """Applies pending resizes, recompiles the graph if it changed and runs its passes."""
+        if self._pending_size is not None:
+            size, self._pending_size = self._pending_size, None
+            # a minimized window has no area to render to, the attachments keep their last size
+            if size != self.size and size[0] > 0 and size[1] > 0:
+                self.size = size
+                allocated_size = (max(self.allocated_size[0], size[0]), max(self.allocated_size[1], size[1]))
+                if allocated_size != self.allocated_size:
+                    self.allocated_size = allocated_size
+                    if not self._dirty:
+                        for framebuffer in self.framebuffers:
+                            framebuffer.resize(allocated_size)
+
+        if self._dirty:
+            self.compile()
+
+        render_size = self.get_render_size()
+        for framebuffer in self.framebuffers:
+            if framebuffer.viewport != render_size:
+                framebuffer.set_viewport(render_size)
+
+        bound: Framebuffer = None
+        for render_pass in self.schedule:
+            if render_pass.framebuffer is not None:
+                render_pass.framebuffer.bind()
+                bound = render_pass.framebuffer
+            elif bound is not None:
+                bound.unbind()
+                self.renderer.set_viewport(self.size)
+                bound = None
+
+            self.renderer.begin_gpu_timer(render_pass.name)
+            render_pass.execute(self)
+            self.renderer.end_gpu_timer()
+
+        if bound is not None:
+            bound.unbind()
+            self.renderer.set_viewport(self.size)
+
+    def get_attachment(self, name: str) -> tuple[Framebuffer, str]:
+        """The framebuffer an attachment was compiled into and its name in that framebuffer."""
+        attachment = self.attachments[name]
+        if attachment.framebuffer is None:
+            raise ValueError(f"Attachment '{name}' was culled from the render graph.")
+        return attachment.framebuffer, attachment.target
+
+    def get_texture(self, name: str):
+        """The texture of an attachment, for passes that sample it."""
+        framebuffer, target = self.get_attachment(name)
+        return framebuffer.get_attachment_texture(target)
+
+    def draw_attachment(self, name: str, size: tuple[int, int] = None):
+        """Draws an attachment to the currently bound framebuffer."""
+        framebuffer, target = self.get_attachment(name)
+        framebuffer.draw(target, size)
+
+    def get_pass_times(self) -> dict[str, float]:
+        """The GPU time of each pass that ran in milliseconds, from the latest frame whose results are ready."""
+        times = self.renderer.get_gpu_times()
+        return {render_pass.name: times[render_pass.name] for render_pass in self.schedule if render_pass.name in times}
+
+    def _destroy_framebuffers(self):
+        for framebuffer in self.framebuffers:
+            framebuffer.destroy()
+        self.framebuffers.clear()
+
+    def destroy(self):
+        self._destroy_framebuffers()
+        self.schedule.clear()
+        self._dirty = True
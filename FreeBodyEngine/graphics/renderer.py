@@ -9,6 +9,9 @@ from FreeBodyEngine.graphics.buffer import Buffer
 from FreeBodyEngine.graphics.mesh import Mesh
 from FreeBodyEngine.graphics.framebuffer import AttachmentFormat, AttachmentType, Framebuffer
 from FreeBodyEngine.graphics.texture import TextureManager, Texture
+from FreeBodyEngine.graphics.resources import ResourceRegistry, ResourceType, get_resource_registry
+from FreeBodyEngine.graphics.profiler import RenderStats, FrameStats, get_render_stats
+from contextlib import contextmanager
 import numpy as np
 from FreeBodyEngine.core.service import Service
 
@@ -25,6 +28,8 @@ class Renderer(Service):
     def __init__(self):
         super().__init__('renderer')
         self.texture_manager = TextureManager()
+        self.resources: ResourceRegistry = get_resource_registry()
+        self.stats: RenderStats = get_render_stats()
 
     def on_initialize(self):
         register_event_callback(WINDOW_RESIZE, self.resize)
@@ -32,6 +37,10 @@ class Renderer(Service):
     def on_destroy(self):
         unregister_event_callback(WINDOW_RESIZE, self.resize)
 
+    def get_resource_stats(self) -> dict[ResourceType, tuple[int, int]]:
+        """The number of live GPU resources and their estimated bytes of video memory, by type."""
+        return self.resources.get_stats()
+
     @abstractmethod
     def get_mesh_class(self) -> type[Mesh]:
         pass
@@ -68,6 +77,38 @@ class Renderer(Service):
     def create_framebuffer(self, width: int, height: int, attachments: dict[str, tuple[AttachmentFormat, AttachmentType]], **kwargs) -> Framebuffer:
         pass
 
+    @abstractmethod
+    def set_viewport(self, size: tuple[int, int]):
+        """Sets the region of the bound framebuffer that is rendered to, from its bottom left corner."""
+        pass
+
+    @abstractmethod
+    def begin_gpu_timer(self, name: str):
+        """Starts timing the GPU work submitted until `end_gpu_timer`, timers can be nested."""
+        pass
+
+    @abstractmethod
+    def end_gpu_timer(self):
+        pass
+
+    @abstractmethod
+    def get_gpu_times(self) -> dict[str, float]:
+        """The GPU time of each timer in milliseconds, from the latest frame whose results are ready."""
+        pass
+
+    @contextmanager
+    def gpu_scope(self, name: str):
+        """Times the GPU work submitted inside the with block, scopes can be nested."""
+        self.begin_gpu_timer(name)
+        try:
+            yield
+        finally:
+            self.end_gpu_timer()
+
+    def get_frame_stats(self) -> FrameStats:
+        """The stats of the last finished frame."""
+        return self.stats.last
+
     @abstractmethod
     def clear(self, color: 'Color'):
         pass 
@@ -102,9 +143,10 @@ class Renderer(Service):
     def draw_mesh(self, mesh: 'Mesh', material: 'Material', transform: 'Transform', camera: 'Camera2D'):
         pass
 
-    def draw_model(self, model: 'Model', transform: 'Transform', camera: 'Camera2D'):
-        for mesh_name in model.meshes:
-            mesh = model.meshes[mesh_name]
+    def draw_model(self, model: 'Model', transform: 'Transform', camera: 'Camera2D', lod: int = 0):
+        meshes = model.get_meshes(lod)
+        for mesh_name in meshes:
+            mesh = meshes[mesh_name]
 
             material_name = model.material_map[mesh_name]
             material = model.materials[material_name]
@@ -0,0 +1,160 @@
+"""
+Tracks the GPU resources created by the renderer, with an estimate of the video memory each one uses.
+
+Backends register a resource when they create it and release it when it is destroyed. Resources are reference
+counted, shared resources (like atlas textures) are acquired by every user and only deleted by the last release.
+A resource whose owner is garbage collected before it is released is reported as a leak, its GPU objects are deleted
+on the main thread the next time the registry is collected. Resources belong to the scene that was active when they
+were created, so anything a scene leaves alive is reported when the scene is removed.
+"""
+
+from enum import Enum
+from typing import Callable
+import threading
+import weakref
+
+from FreeBodyEngine import warning
+
+class ResourceType(Enum):
+    MESH = "mesh"
+    TEXTURE = "texture"
+    TEXTURE_STACK = "texture stack"
+    FRAMEBUFFER = "framebuffer"
+    BUFFER = "buffer"
+
+# the scope of resources created outside of any scene, these are never reported as leaks
+GLOBAL_SCOPE = "global"
+
+
+class Resource:
+    __slots__ = ('handle', 'type', 'size', 'label', 'scope', 'references', 'release_callback', 'finalizer')
+
+    def __init__(self, handle: int, type: ResourceType, size: int, label: str, scope: str, release_callback: Callable):
+        self.handle = handle
+        self.type = type
+        self.size = size # estimated bytes of video memory
+        self.label = label
+        self.scope = scope
+        self.references = 1
+        self.release_callback = release_callback
+        self.finalizer: weakref.finalize = None
+
+    def __repr__(self):
+        label = f" '{self.label}'" if self.label else ""
+        return f"{self.type.value}{label} ({format_size(self.size)}, scope: {self.scope})"
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class ResourceRegistry:
+    def __init__(self):
+        self.resources: dict[int, Resource] = {}
+        self.scope: str = GLOBAL_SCOPE # the scope new resources are created in
+        self._next_handle = 1
+        self._collected: list[Resource] = [] # resources whose owner was garbage collected before they were released
+        self._lock = threading.RLock()
+
+    def register(self, type: ResourceType, size: int, owner: object = None, release_callback: Callable = None, label: str = "", scope: str = None) -> int:
+        """
+        Registers a newly created resource and returns its handle.
+
+        :param size: The estimated bytes of video memory the resource uses.
+        :param owner: The object holding the resource, if it is garbage collected before the resource is released it is reported as a leak.
+        :param release_callback: Deletes the GPU objects of a leaked resource, must not reference the owner. Called on the main thread by `collect`.
+        :param scope: The scope the resource belongs to, defaults to the current scope.
+        """
+        handle = self._next_handle
+        self._next_handle += 1
+
+        resource = Resource(handle, type, size, label, scope or self.scope, release_callback)
+        if owner is not None:
+            resource.finalizer = weakref.finalize(owner, self._on_collected, handle)
+        self.resources[handle] = resource
+        return handle
+
+    def acquire(self, handle: int):
+        """Adds a reference to a shared resource."""
+        resource = self.resources.get(handle)
+        if resource is not None:
+            resource.references += 1
+
+    def release(self, handle: int) -> bool:
+        """Removes a reference to a resource, returns True when it was the last one and the resource should be deleted."""
+        resource = self.resources.get(handle)
+        if resource is None:
+            return False
+
+        resource.references -= 1
+        if resource.references > 0:
+            return False
+
+        del self.resources[handle]
+        if resource.finalizer is not None:
+            resource.finalizer.detach()
+        return True
+
+    def resize(self, handle: int, size: int):
+        """Updates the estimated size of a resource, for resources that are reallocated."""
+        resource = self.resources.get(handle)
+        if resource is not None:
+            resource.size = size
+
+    def _on_collected(self, handle: int):
+        # called by the garbage collector, which can run on any thread
+        with self._lock:
+            resource = self.resources.pop(handle, None)
+            if resource is not None:
+                self._collected.append(resource)
+
+    def collect(self) -> int:
+        """Deletes the resources whose owners were garbage collected without releasing them, main thread only. Returns the number deleted."""
+        if not self._collected:
+            return 0
+
+        with self._lock:
+            collected, self._collected = self._collected, []
+
+        for resource in collected:
+            if resource.release_callback is not None:
+                resource.release_callback()
+        warning(f"{len(collected)} GPU resource(s) were garbage collected without being destroyed: {', '.join(repr(resource) for resource in collected)}")
+        return len(collected)
+
+    def get_scope_resources(self, scope: str) -> list[Resource]:
+        return [resource for resource in list(self.resources.values()) if resource.scope == scope]
+
+    def check_leaks(self, scope: str) -> list[Resource]:
+        """Warns about the resources still alive in a scope, called when the scene the scope belongs to is removed."""
+        leaked = self.get_scope_resources(scope)
+        if leaked:
+            size = sum(resource.size for resource in leaked)
+            warning(f"Scene '{scope}' left {len(leaked)} GPU resource(s) alive ({format_size(size)}): {', '.join(repr(resource) for resource in leaked)}")
+        return leaked
+
+    def get_stats(self) -> dict[ResourceType, tuple[int, int]]:
+        """The number of live resources and their estimated bytes, by type."""
+        stats = {type: (0, 0) for type in ResourceType}
+        for resource in list(self.resources.values()):
+            count, size = stats[resource.type]
+            stats[resource.type] = (count + 1, size + resource.size)
+        return stats
+
+    def get_total_size(self) -> int:
+        return sum(resource.size for resource in list(self.resources.values()))
+
+    def report(self) -> str:
+        lines = [f"{type.value:<14} {count:>6} {format_size(size):>10}" for type, (count, size) in self.get_stats().items()]
+        lines.append(f"{'total':<14} {len(self.resources):>6} {format_size(self.get_total_size()):>10}")
+        return "\n".join(lines)
+
+
+_registry = ResourceRegistry()
+
+def get_resource_registry() -> ResourceRegistry:
+    return _registry
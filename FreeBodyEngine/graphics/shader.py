@@ -18,6 +18,28 @@ class Shader:
         self.vertex_source = vertex_source
         
         self.generator = generator
+        self.injector = injector
+
+    def compile_sources(self, vertex_source: str = None, fragment_source: str = None) -> tuple[str, str, str, str]:
+        """
+        Compiles fbusl sources for the backend without touching the GPU, so it can run off the main thread.
+        Sources that are not passed keep their current value.
+
+        :returns: The vertex source, fragment source and their compiled versions, ready for `reload`.
+        """
+        vertex_source = self.vertex_source if vertex_source is None else vertex_source
+        fragment_source = self.fragment_source if fragment_source is None else fragment_source
+        return (
+            vertex_source,
+            fragment_source,
+            compile(vertex_source, ShaderType.VERTEX, self.generator, self.injector),
+            compile(fragment_source, ShaderType.FRAGMENT, self.generator, self.injector)
+        )
+
+    @abstractmethod
+    def reload(self, compiled: tuple[str, str, str, str]):
+        """Swaps in sources returned by `compile_sources`."""
+        pass
 
 
     @abstractmethod
@@ -20,6 +20,10 @@ class Sprite:
         self.quad = generate_quad()
         self.visisble = visisble
 
+        # the asset paths the sprite was loaded from, used for hot reloading
+        self.image_path: str = None
+        self.material_path: str = None
+
 class Sprite2D(Node2D):
     def __init__(self, sprite: Sprite, position: Vector = Vector(), rotaition: float = 0.0, scale: Vector = Vector(1, 1)):
         super().__init__(position, rotaition, scale)
@@ -1,8 +1,46 @@
 from FreeBodyEngine import get_flag, DEVMODE
+from FreeBodyEngine.graphics.texture_file import TextureFile, TextureFilter, is_texture_file
+from PIL import Image
 import numpy as np
+import io
 
 MAX_TEXTURE_STACK_SIZE = 64
 
+def open_image(image_data) -> Image.Image:
+    """Opens encoded image bytes or a file object without decoding the pixels yet."""
+    return Image.open(image_data if hasattr(image_data, 'read') else io.BytesIO(image_data))
+
+def decode_image(img: Image.Image, out: np.ndarray = None) -> np.ndarray:
+    """
+    Decodes an opened image into RGBA pixels, top row first. Textures are uploaded in this order and the
+    rotation is undone when sampling (see `get_sample_rect`), so the pixels are never copied to flip them.
+    Written into `out` when given (a (height, width, 4) uint8 array or view).
+    The image is closed once its pixels are read, freeing the decoder's copy early.
+    """
+    if img.mode != 'RGBA':
+        source, img = img, img.convert('RGBA')
+        source.close()
+    pixels = np.asarray(img)
+    img.close()
+
+    if out is None:
+        return pixels
+    out[:] = pixels
+    return out
+
+def get_sample_rect(rect) -> tuple[float, float, float, float]:
+    """
+    The uv rect passed to shaders for a texture's [x, y, w, h] rect. Shaders sample textures as if they were
+    uploaded rotated by 180 degrees, mirroring the rect on both axes gives the same texels for images uploaded top row first.
+    """
+    x, y, w, h = rect[:4]
+    return 1.0 - x, 1.0 - y, -w, -h
+
+def get_texture_size(width: int, height: int, layers: int = 1, bytes_per_pixel: int = 4, mipmaps: bool = False) -> int:
+    """The estimated bytes of video memory used by a texture, a full mipmap chain adds a third."""
+    size = width * height * layers * bytes_per_pixel
+    return size * 4 // 3 if mipmaps else size
+
 class Texture:
     """The texture object holds no real data, it just acts as a reference to the real texture in the manager."""
     def __init__(self, manager: 'TextureManager', id, uv_rect):
@@ -16,6 +54,10 @@ class Texture:
     def use(self):
         return self.manager._use_texture(self.id)
 
+    def destroy(self):
+        """Releases the texture, atlas textures are only deleted once every texture using the atlas is destroyed."""
+        self.manager._delete_texture(self.id)
+
 class TextureStack:
     def __init__(self, manager: 'TextureManager', id: int, uv_rects: list[tuple[int, int]]):
         self.manager = manager
@@ -25,16 +67,39 @@ class TextureStack:
     def use(self):
         return self.manager._use_texture_stack(self.id)
 
+    def destroy(self):
+        self.manager._delete_texture(self.id)
+
 class TextureManager:
     def __init__(self):
         self.dev_mode = get_flag(DEVMODE, False) # dev mode enables hot reloading, release mode uses atlases
         self.standalone_textures: dict[str, int] = {}
         self.texture_stacks: dict[str, int] = {}
         self.atlas_textures: dict[str, list[str, str]]= {} # {id, [graphicsID, fileID]}
+        self.atlas_ids: dict[str, str] = {} # {fileID, id}
+        self.resources: dict[str, int] = {} # {id, resource registry handle}
         self.current_texture = None
 
-    def _create_standalone_texture(self, image_data: str):
+    def _decode_image(self, image_data) -> tuple[np.ndarray, int, int] | TextureFile:
+        """
+        Decodes encoded image bytes into RGBA pixels ready for upload, doesn't touch the GPU so it is safe to call from any thread.
+        Texture files written by release builds are already in upload form and are only viewed.
+        """
+        if is_texture_file(image_data):
+            return TextureFile(image_data)
+        img = open_image(image_data)
+        return decode_image(img), img.width, img.height
+
+    def _create_standalone_texture(self, image_data: str, mipmaps: bool = True):
         """Gets a standalone texture."""
+        return self._upload_standalone_texture(self._decode_image(image_data), mipmaps)
+
+    def _upload_standalone_texture(self, decoded: tuple[np.ndarray, int, int], mipmaps: bool = True) -> 'Texture':
+        """Creates a standalone texture from pixels returned by `_decode_image`, main thread only. Mipmaps are only generated if `mipmaps` is set."""
+        pass
+
+    def _replace_texture(self, texture: 'Texture', decoded: tuple[np.ndarray, int, int]):
+        """Uploads new pixels into an existing standalone texture, everything holding the texture sees the new image. Keeps the texture's mipmap setting."""
         pass
 
     def _create_standalone_texture_stack(self, image_data: list[str]) -> TextureStack:
@@ -43,6 +108,10 @@ class TextureManager:
     def _create_texture_stack(self, rects: tuple[int, tuple[float, float, float, float]]) -> TextureStack:
         pass
 
+    def _set_sampling(self, id, filter: TextureFilter, mipmaps: bool):
+        """Sets the filtering of a standalone texture and generates or drops its mipmaps, atlases get theirs from the build."""
+        pass
+
     def _get_raw_data(self, id, rect):
         pass
 
@@ -53,9 +122,10 @@ class TextureManager:
         """Binds the texture and returns the texture slot."""
         pass
 
-    def _create_atlas_texture(self):
-        """Gets a texture from an atlas."""
+    def _create_atlas_texture(self, atlas_img, file_path, atlas_data, name, decoded=None):
+        """Gets a texture from an atlas, the atlas is only decoded (unless `decoded` pixels are passed) and uploaded the first time."""
 
-    def _delete_texture(self):
+    def _delete_texture(self, id):
+        """Releases a reference to a standalone texture, texture stack or atlas, deleting it when it was the last one."""
         pass
     
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+The engine's binary texture format, written by release builds so textures upload without decoding.
+
+Layout (little endian):
+    header      magic "FBTX", version, format, filter, width, height, mip level count
+    mip table   offset, length, width and height of each level, from largest to smallest
+    data        16 byte aligned levels, RGBA8 pixels or BC1/BC3 blocks, top row first like decoded images
+
+BC1 and BC3 blocks are encoded on the CPU at build time. Drivers without S3TC support get them decoded back to
+RGBA8 at load time.
+"""
+
+from enum import IntEnum
+import struct
+
+import numpy as np
+from PIL import Image
+
+TEXTURE_MAGIC = b"FBTX"
+TEXTURE_VERSION = 2
+TEXTURE_FILE_EXTENSION = "fbtex"
+
+HEADER = struct.Struct("<4sHBBIIHH")
+MIP_ENTRY = struct.Struct("<QQII")
+DATA_ALIGNMENT = 16
+
+
+class TextureFormat(IntEnum):
+    RGBA8 = 0
+    BC1 = 1 # 4 bits per pixel, opaque
+    BC3 = 2 # 8 bits per pixel, with alpha
+
+class TextureFilter(IntEnum):
+    LINEAR = 0
+    NEAREST = 1
+
+COMPRESSION_FORMATS = {"none": TextureFormat.RGBA8, "bc1": TextureFormat.BC1, "bc3": TextureFormat.BC3}
+FILTER_NAMES = {"linear": TextureFilter.LINEAR, "nearest": TextureFilter.NEAREST}
+BLOCK_SIZES = {TextureFormat.BC1: 8, TextureFormat.BC3: 16}
+
+
+def _align(offset: int) -> int:
+    return (offset + DATA_ALIGNMENT - 1) & ~(DATA_ALIGNMENT - 1)
+
+
+def generate_mipmaps(img: Image.Image) -> list[Image.Image]:
+    """The full mip chain of an image down to 1x1, box filtered with premultiplied alpha."""
+    levels = [img]
+    while img.width > 1 or img.height > 1:
+        img = img.resize((max(img.width // 2, 1), max(img.height // 2, 1)), Image.Resampling.BOX)
+        levels.append(img)
+    return levels
+
+
+def _get_blocks(pixels: np.ndarray) -> np.ndarray:
+    """Splits RGBA pixels into (block count, 16, 4) 4x4 blocks, edges are padded by repeating the last row and column."""
+    height, width = pixels.shape[:2]
+    padded_height, padded_width = -(-height // 4) * 4, -(-width // 4) * 4
+    if (padded_height, padded_width) != (height, width):
+        pixels = np.pad(pixels, ((0, padded_height - height), (0, padded_width - width), (0, 0)), mode="edge")
+    blocks = pixels.reshape(padded_height // 4, 4, padded_width // 4, 4, 4).swapaxes(1, 2)
+    return blocks.reshape(-1, 16, 4)
+
+
+def _to_565(colors: np.ndarray) -> np.ndarray:
+    colors = colors.astype(np.uint32)
+    return (((colors[..., 0] * 31 + 127) // 255) << 11) | (((colors[..., 1] * 63 + 127) // 255) << 5) | ((colors[..., 2] * 31 + 127) // 255)
+
+
+def _from_565(packed: np.ndarray) -> np.ndarray:
+    packed = packed.astype(np.uint32)
+    r, g, b = (packed >> 11) & 31, (packed >> 5) & 63, packed & 31
+    return np.stack([(r * 255 + 15) // 31, (g * 255 + 31) // 63, (b * 255 + 15) // 31], axis=-1).astype(np.int32)
+
+
+def _pack_indices(indices: np.ndarray, bits: int) -> np.ndarray:
+    shifts = np.arange(16, dtype=np.uint64) * bits
+    return np.bitwise_or.reduce(indices.astype(np.uint64) << shifts, axis=1)
+
+
+def _encode_color_blocks(blocks: np.ndarray) -> np.ndarray:
+    """Encodes the RGB of each block as a 4 color BC1 block, the endpoints are the corners of the block's bounding box."""
+    rgb = blocks[..., :3].astype(np.int32)
+    low, high = rgb.min(axis=1), rgb.max(axis=1)
+    inset = (high - low) // 16 # pulls the endpoints in slightly, lowers the error of the interpolated colors
+    color0, color1 = _to_565(high - inset), _to_565(low + inset)
+
+    # the 4 color mode needs color0 > color1, equal endpoints just use index 0
+    swap = color0 < color1
+    color0, color1 = np.where(swap, color1, color0), np.where(swap, color0, color1)
+
+    end0, end1 = _from_565(color0), _from_565(color1)
+    palette = np.stack([end0, end1, (2 * end0 + end1) // 3, (end0 + 2 * end1) // 3], axis=1)
+    distances = ((rgb[:, :, None, :] - palette[:, None, :, :]) ** 2).sum(axis=-1)
+    indices = np.where((color0 == color1)[:, None], 0, distances.argmin(axis=-1))
+
+    out = np.zeros(len(blocks), np.dtype([("color0", "<u2"), ("color1", "<u2"), ("indices", "<u4")]))
+    out["color0"], out["color1"], out["indices"] = color0, color1, _pack_indices(indices, 2)
+    return out.view(np.uint8).reshape(-1, 8)
+
+
+def _encode_alpha_blocks(blocks: np.ndarray) -> np.ndarray:
+    """Encodes the alpha of each block as a BC3 alpha block using the 8 value mode."""
+    alpha = blocks[..., 3].astype(np.int32)
+    alpha0, alpha1 = alpha.max(axis=1), alpha.min(axis=1)
+    steps = np.arange(1, 7)
+    palette = np.concatenate([alpha0[:, None], alpha1[:, None], ((7 - steps) * alpha0[:, None] + steps * alpha1[:, None]) // 7], axis=1)
+    indices = np.abs(alpha[:, :, None] - palette[:, None, :]).argmin(axis=-1)
+
+    out = np.zeros((len(blocks), 8), np.uint8)
+    out[:, 0], out[:, 1] = alpha0, alpha1
+    out[:, 2:] = _pack_indices(indices, 3)[:, None].view(np.uint8).reshape(-1, 8)[:, :6]
+    return out
+
+
+def encode_level(pixels: np.ndarray, format: TextureFormat) -> bytes:
+    if format == TextureFormat.RGBA8:
+        return np.ascontiguousarray(pixels, np.uint8).tobytes()
+
+    blocks = _get_blocks(pixels)
+    if format == TextureFormat.BC1:
+        return _encode_color_blocks(blocks).tobytes()
+    return np.concatenate([_encode_alpha_blocks(blocks), _encode_color_blocks(blocks)], axis=1).tobytes()
+
+
+def decode_level(data, width: int, height: int, format: TextureFormat) -> np.ndarray:
+    """Decodes a BC1/BC3 level to (height, width, 4) RGBA8 pixels, for drivers that can't sample compressed textures."""
+    block_size = BLOCK_SIZES[format]
+    blocks = np.frombuffer(data, np.uint8).reshape(-1, block_size)
+    color = blocks[:, -8:]
+
+    color0, color1 = color[:, 0:2].copy().view("<u2")[:, 0], color[:, 2:4].copy().view("<u2")[:, 0]
+    end0, end1 = _from_565(color0), _from_565(color1)
+    palette = np.stack([end0, end1, (2 * end0 + end1) // 3, (end0 + 2 * end1) // 3], axis=1)
+    if format == TextureFormat.BC1:
+        # BC1 blocks with color0 <= color1 use 3 colors and transparent black
+        three = color0 <= color1
+        palette[three, 2] = (end0[three] + end1[three]) // 2
+        palette[three, 3] = 0
+    indices = (color[:, 4:8].copy().view("<u4")[:, 0, None] >> (np.arange(16, dtype=np.uint32) * 2)) & 3
+    pixels = np.empty((len(blocks), 16, 4), np.uint8)
+    pixels[..., :3] = np.take_along_axis(palette, indices[..., None].astype(np.intp), axis=1)
+    pixels[..., 3] = 255
+    if format == TextureFormat.BC1:
+        pixels[..., 3] = np.where(three[:, None] & (indices == 3), 0, 255)
+
+    if format == TextureFormat.BC3:
+        alpha0, alpha1 = blocks[:, 0].astype(np.int32), blocks[:, 1].astype(np.int32)
+        steps = np.arange(1, 7)
+        eight = ((7 - steps) * alpha0[:, None] + steps * alpha1[:, None]) // 7
+        six = np.concatenate([((5 - steps[:4]) * alpha0[:, None] + steps[:4] * alpha1[:, None]) // 5, np.zeros((len(blocks), 1), np.int32), np.full((len(blocks), 1), 255, np.int32)], axis=1)
+        palette = np.concatenate([alpha0[:, None], alpha1[:, None], np.where((alpha0 > alpha1)[:, None], eight, six)], axis=1)
+        packed = np.zeros((len(blocks), 8), np.uint8)
+        packed[:, :6] = blocks[:, 2:8]
+        indices = (packed.view("<u8")[:, 0, None] >> (np.arange(16, dtype=np.uint64) * 3)) & 7
+        pixels[..., 3] = np.take_along_axis(palette, indices.astype(np.intp), axis=1)
+
+    blocks_y, blocks_x = -(-height // 4), -(-width // 4)
+    pixels = pixels.reshape(blocks_y, blocks_x, 4, 4, 4).swapaxes(1, 2).reshape(blocks_y * 4, blocks_x * 4, 4)
+    return np.ascontiguousarray(pixels[:height, :width])
+
+
+def encode_texture(img: Image.Image, format: TextureFormat = TextureFormat.RGBA8, filter: TextureFilter = TextureFilter.LINEAR, mipmaps: bool = True) -> bytes:
+    """Writes an image to the binary texture format with its mip chain precomputed."""
+    img = img.convert("RGBA")
+    levels = generate_mipmaps(img) if mipmaps else [img]
+    blobs = [encode_level(np.asarray(level, np.uint8), format) for level in levels]
+
+    offset = _align(HEADER.size + MIP_ENTRY.size * len(levels))
+    offsets = []
+    for blob in blobs:
+        offsets.append(offset)
+        offset = _align(offset + len(blob))
+
+    out = bytearray(offset)
+    HEADER.pack_into(out, 0, TEXTURE_MAGIC, TEXTURE_VERSION, format, filter, img.width, img.height, len(levels), 0)
+    for i, (level, blob) in enumerate(zip(levels, blobs)):
+        MIP_ENTRY.pack_into(out, HEADER.size + i * MIP_ENTRY.size, offsets[i], len(blob), level.width, level.height)
+        out[offsets[i]:offsets[i] + len(blob)] = blob
+    return bytes(out)
+
+
+def is_texture_file(data) -> bool:
+    return bytes(data[:4]) == TEXTURE_MAGIC
+
+
+class TextureFile:
+    """
+    Reads the binary texture format. Levels are views of the data passed in, nothing is copied before upload.
+
+    :param data: The texture file bytes, or a memoryview of them.
+    """
+    def __init__(self, data):
+        self.data = data
+        magic, version, format, filter, self.width, self.height, level_count, _ = HEADER.unpack_from(data, 0)
+        if magic != TEXTURE_MAGIC:
+            raise ValueError("Not a FreeBody texture file.")
+        if version != TEXTURE_VERSION:
+            raise ValueError(f"Unsupported texture file version {version}, expected {TEXTURE_VERSION}.")
+        self.format = TextureFormat(format)
+        self.filter = TextureFilter(filter)
+
+        view = memoryview(data)
+        self.levels: list[tuple[int, int, memoryview]] = [] # (width, height, data) from largest to smallest
+        for i in range(level_count):
+            offset, length, width, height = MIP_ENTRY.unpack_from(data, HEADER.size + i * MIP_ENTRY.size)
+            self.levels.append((width, height, view[offset:offset + length]))
+
+    @property
+    def mipmaps(self) -> bool:
+        return len(self.levels) > 1
+
+    @property
+    def compressed(self) -> bool:
+        return self.format != TextureFormat.RGBA8
+
+    def get_size(self) -> int:
+        """The bytes of video memory used by every level."""
+        return sum(len(level) for _, _, level in self.levels)
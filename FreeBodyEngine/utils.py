@@ -88,35 +88,51 @@ def fbnjit(*args, **kwargs):
         warning('Could not import numba.')
         return decorator
 
+from FreeBodyEngine.core.service import ServiceRef
+
+_files = ServiceRef('files')
+
 def load_sprite(path: str):
-    return get_service('files').load_sprite(path)
+    return _files.get().load_sprite(path)
 
 def load_data(path: str):
-    return get_service('files').load_data(path)
+    return _files.get().load_data(path)
 
 def load_toml(path: str):
-    return get_service('files').load_toml(path)
+    return _files.get().load_toml(path)
 
 
 def load_image(path: str):
-    return get_service('files').load_image(path)
+    return _files.get().load_image(path)
 
 def load_material(path: str):
-    return get_service('files').load_material(path)
+    return _files.get().load_material(path)
 
 
 def load_sound(path: str):
-    return get_main().files.load_sound(path)
+    return _files.get().load_sound(path)
 
 
 def load_shader(path: str):
-    return get_service('files').load_shader(path)
+    return _files.get().load_shader(path)
 
 def load_sprite(path: str):
-    return get_service('files').load_sprite(path)
+    return _files.get().load_sprite(path)
 
 def load_model(path: str, model_name: str = None, scale=None):
-    return get_service('files').load_model(path, model_name, scale)
+    return _files.get().load_model(path, model_name, scale)
 
 def load_texture_stack(paths: list[str]):
-    return get_service('files').load_texture_stack(paths)
\ No newline at end of file
+    return _files.get().load_texture_stack(paths)
+
+def load_async(path: str):
+    return _files.get().load_async(path)
+
+def load_image_async(path: str):
+    return _files.get().load_image_async(path)
+
+def load_model_async(path: str, model_name: str = None, scale=None):
+    return _files.get().load_model_async(path, model_name, scale)
+
+def preload(manifest: str | list[str]):
+    return _files.get().preload(manifest)
@@ -0,0 +1,95 @@
+"""
+Benchmark for asset pack building: pack size and build time on a generated asset tree,
+comparing uncompressed single threaded packing with compressed packing on a thread pool.
+
+Run with: python benchmarks/asset_pack.py [file count]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+
+from FreeBodyEngine.core.pack import (
+    AssetPack, write_asset_pack, COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_ZSTD, DEFAULT_COMPRESSION, HAS_ZSTD
+)
+
+FILE_COUNT = 2000
+DUPLICATE_RATIO = 0.1
+
+
+def generate_tree(root: str, count: int) -> dict[str, str]:
+    """Writes a mix of text, binary and already compressed files, some of them duplicates."""
+    rng = random.Random(0)
+    files = {}
+    written = []
+    for i in range(count):
+        if written and rng.random() < DUPLICATE_RATIO:
+            source = rng.choice(written)
+            name = f"copies/{i}" + os.path.splitext(source)[1]
+            path = os.path.join(root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(source, path)
+            files[path] = name
+            continue
+
+        kind = i % 4
+        if kind == 0:
+            name, data = f"data/{i}.json", json.dumps({f"key_{k}": [rng.random() for _ in range(16)] for k in range(64)}).encode()
+        elif kind == 1:
+            name, data = f"shaders/{i}.fbfrag", ("uniform vec3 color;\nvoid main() { gl_FragColor = vec4(color, 1.0); }\n" * 200).encode()
+        elif kind == 2:
+            name, data = f"meshes/{i}.bin", bytes(rng.getrandbits(4) for _ in range(64 * 1024))
+        else:
+            name, data = f"images/{i}.png", rng.randbytes(32 * 1024)
+
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        files[path] = name
+        written.append(path)
+    return files
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else FILE_COUNT
+    root = tempfile.mkdtemp()
+    try:
+        files = generate_tree(root, count)
+        raw_size = sum(os.path.getsize(path) for path in files)
+        print(f"{len(files)} files, {raw_size / 1e6:.1f} MB")
+
+        everything = lambda method: {ext: method for ext in ("json", "fbfrag", "bin", "png")}
+        cases = [
+            ("uncompressed, 1 thread", everything(COMPRESSION_NONE), 1),
+            ("zlib, 1 thread", everything(COMPRESSION_ZLIB), 1),
+            ("zlib, pool", everything(COMPRESSION_ZLIB), None),
+        ]
+        if HAS_ZSTD:
+            cases.append(("zstd, pool", everything(COMPRESSION_ZSTD), None))
+        cases.append(("default per type, pool", DEFAULT_COMPRESSION, None))
+
+        for name, compression, workers in cases:
+            out = os.path.join(root, "bench.pak")
+            start = time.perf_counter()
+            write_asset_pack(out, files, compression, workers)
+            elapsed = time.perf_counter() - start
+
+            pack = AssetPack(out)
+            start = time.perf_counter()
+            for asset in pack:
+                pack.get(asset)
+            read = time.perf_counter() - start
+            pack.close()
+
+            print(f"{name:28} {os.path.getsize(out) / 1e6:8.1f} MB {elapsed:8.3f} s build {read:8.3f} s read all")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark for glTF accessor decoding: the old per element struct loop vs the vectorized NumPy decode.
+
+Builds an in memory glTF with an interleaved position/normal buffer, normalized uint16 uvs and uint32 indices.
+
+Run with: python benchmarks/gltf_accessors.py [vertex count]
+"""
+
+import struct
+import sys
+import time
+
+import numpy as np
+
+from FreeBodyEngine.graphics.model.gltf_parser import GLTFParser
+
+FORMAT_MAP = {5120: 'b', 5121: 'B', 5122: 'h', 5123: 'H', 5125: 'I', 5126: 'f'}
+TYPE_COUNT = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4}
+
+
+def struct_accessor_data(gltf, bin_data, accessor_index):
+    """The decode the parser used before, kept here as the baseline."""
+    accessor = gltf["accessors"][accessor_index]
+    buffer_view = gltf["bufferViews"][accessor["bufferView"]]
+    offset = buffer_view.get("byteOffset", 0) + accessor.get("byteOffset", 0)
+
+    fmt = FORMAT_MAP[accessor["componentType"]]
+    num_components = TYPE_COUNT[accessor["type"]]
+    element_size = struct.calcsize('<' + fmt) * num_components
+    stride = buffer_view.get("byteStride", element_size)
+
+    data = []
+    for i in range(accessor["count"]):
+        values = struct.unpack_from('<' + fmt * num_components, bin_data, offset + i * stride)
+        data.append(values if num_components > 1 else values[0])
+    return data
+
+
+def build_gltf(vertex_count: int):
+    rng = np.random.default_rng(0)
+    interleaved = rng.random((vertex_count, 6), dtype=np.float32) # position + normal
+    uvs = rng.integers(0, 65535, (vertex_count, 2), dtype=np.uint16)
+    indices = rng.integers(0, vertex_count, vertex_count * 3, dtype=np.uint32)
+
+    chunks = [interleaved.tobytes(), uvs.tobytes(), indices.tobytes()]
+    offsets = np.cumsum([0] + [len(chunk) for chunk in chunks])
+    gltf = {
+        "bufferViews": [
+            {"byteOffset": int(offsets[0]), "byteLength": len(chunks[0]), "byteStride": 24},
+            {"byteOffset": int(offsets[1]), "byteLength": len(chunks[1])},
+            {"byteOffset": int(offsets[2]), "byteLength": len(chunks[2])},
+        ],
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": vertex_count, "type": "VEC3"},
+            {"bufferView": 0, "byteOffset": 12, "componentType": 5126, "count": vertex_count, "type": "VEC3"},
+            {"bufferView": 1, "componentType": 5123, "normalized": True, "count": vertex_count, "type": "VEC2"},
+            {"bufferView": 2, "componentType": 5125, "count": vertex_count * 3, "type": "SCALAR"},
+        ],
+    }
+    return gltf, b''.join(chunks)
+
+
+def bench(name, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {elapsed * 1000:10.2f} ms")
+    return elapsed
+
+
+def main():
+    vertex_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    gltf, bin_data = build_gltf(vertex_count)
+    parser = GLTFParser(gltf, bin_data)
+    accessors = range(len(gltf["accessors"]))
+
+    print(f"{vertex_count} vertices, {len(bin_data) / 1024 / 1024:.1f} MB of buffer data")
+
+    def decode_struct():
+        # the old loader also copied every accessor into a float32/int32 array
+        for i in accessors:
+            np.array(struct_accessor_data(gltf, bin_data, i), np.float32 if i < 3 else np.int32)
+
+    def decode_numpy():
+        for i in accessors:
+            np.asarray(parser.get_accessor_data(i), np.float32 if i < 3 else np.uint32)
+
+    old = bench("struct", decode_struct)
+    new = bench("numpy", decode_numpy)
+    print(f"speedup      {old / new:10.1f}x")
+
+    for i in accessors:
+        expected = np.array(struct_accessor_data(gltf, bin_data, i))
+        if gltf["accessors"][i].get("normalized"):
+            expected = expected / 65535.0
+        assert np.allclose(parser.get_accessor_data(i), expected), f"accessor {i} does not match"
+
+
+if __name__ == '__main__':
+    main()
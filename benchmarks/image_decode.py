@@ -0,0 +1,119 @@
+"""
+Benchmark for texture decoding: the old PIL transpose/convert/np.array chain vs the single pass decode into a
+preallocated buffer, for standalone images and for texture stacks with padded layers.
+
+Peak memory is the resident set high water mark above the memory in use before the call, so PIL's own buffers are counted.
+The high water mark is reset through /proc, which makes the peak memory column Linux only.
+
+Run with: python benchmarks/image_decode.py [image size]
+"""
+
+import gc
+import io
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from FreeBodyEngine.graphics.texture import open_image, decode_image
+
+STACK_LAYERS = 8
+
+
+def old_decode(image_data):
+    """The decode the texture manager used before, kept here as the baseline."""
+    img = Image.open(io.BytesIO(image_data)).transpose(Image.Transpose.FLIP_TOP_BOTTOM).transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+    width, height = img.size
+    return np.array(img.convert('RGBA'), dtype=np.uint8), width, height
+
+
+def new_decode(image_data):
+    img = open_image(image_data)
+    return decode_image(img), img.width, img.height
+
+
+def old_stack(image_datas):
+    """The old texture stack path, every layer pasted into a padded copy."""
+    loaded_images = [Image.open(io.BytesIO(data)).transpose(Image.Transpose.FLIP_TOP_BOTTOM).transpose(Image.Transpose.FLIP_LEFT_RIGHT).convert('RGBA') for data in image_datas]
+    max_width = max(img.width for img in loaded_images)
+    max_height = max(img.height for img in loaded_images)
+    processed_data = []
+    for img in loaded_images:
+        padded_img = Image.new('RGBA', (max_width, max_height), (0, 0, 0, 0))
+        padded_img.paste(img, (0, 0))
+        processed_data.append(np.array(padded_img, dtype=np.uint8))
+    return processed_data
+
+
+def new_stack(image_datas):
+    """The new path, every layer decoded into one reused buffer (uploads are skipped here)."""
+    images = [open_image(data) for data in image_datas]
+    scratch = np.empty(max(img.width for img in images) * max(img.height for img in images) * 4, np.uint8)
+    for img in images:
+        width, height = img.size
+        decode_image(img, scratch[:width * height * 4].reshape(height, width, 4))
+    return scratch
+
+
+def encode(size: int, mode: str, seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    # a noisy gradient, compresses like a real texture rather than like pure noise
+    gradient = np.linspace(0, 255, size, dtype=np.float32)
+    pixels = (gradient[None, :, None] + gradient[:, None, None] * 0.5 + rng.normal(0, 8, (size, size, len(mode)))) % 256
+    buffer = io.BytesIO()
+    Image.fromarray(pixels.astype(np.uint8), mode).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def read_status(field: str) -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) # kB
+
+
+def peak_memory(func, *args) -> float:
+    """The peak resident memory used by func on top of what was in use before it ran, in MB. NaN if /proc isn't available."""
+    if not os.path.exists('/proc/self/clear_refs'):
+        return float('nan')
+    gc.collect()
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5') # resets the high water mark to the current resident size
+    baseline = read_status('VmRSS')
+    func(*args)
+    return (read_status('VmHWM') - baseline) / 1024
+
+
+def bench(name, func, *args, repeat=5):
+    memory = peak_memory(func, *args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{name:<16} {elapsed * 1000:10.2f} ms {memory:10.1f} MB peak")
+    return elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    images = {mode: encode(size, mode, 0) for mode in ('RGBA', 'RGB')}
+    # layers of different sizes, so the old path has to pad most of them
+    layers = [encode(size // (1 + i % 3), 'RGBA', i) for i in range(STACK_LAYERS)]
+
+    for mode, image_data in images.items():
+        print(f"{size}x{size} {mode} png, {size * size * 4 / 1024 / 1024:.1f} MB decoded")
+        old = bench("old decode", old_decode, image_data)
+        new = bench("new decode", new_decode, image_data)
+        print(f"speedup          {old / new:10.1f}x")
+        assert np.array_equal(old_decode(image_data)[0], new_decode(image_data)[0]), "decoded pixels do not match"
+
+    print(f"texture stack, {STACK_LAYERS} layers up to {size}x{size}")
+    old = bench("old stack", old_stack, layers, repeat=2)
+    new = bench("new stack", new_stack, layers, repeat=2)
+    print(f"speedup          {old / new:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
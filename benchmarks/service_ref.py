@@ -0,0 +1,48 @@
+"""
+Microbenchmark for service lookups: get_service vs a cached ServiceRef.
+
+Run with: python benchmarks/service_ref.py
+"""
+
+import timeit
+
+import FreeBodyEngine as fb
+from FreeBodyEngine.core.main import Main
+from FreeBodyEngine.core.service import Service, ServiceRef
+
+N = 1_000_000
+
+
+class BenchService(Service):
+    def __init__(self):
+        super().__init__('bench')
+
+
+class Holder:
+    bench = ServiceRef('bench')
+
+
+def main():
+    Main()
+    fb.register_service(BenchService())
+
+    ref = ServiceRef('bench')
+    missing_ref = ServiceRef('missing')
+    holder = Holder()
+
+    cases = {
+        "get_service (registered)": "get_service('bench')",
+        "ServiceRef.get (registered)": "ref.get()",
+        "ServiceRef descriptor (registered)": "holder.bench",
+        "get_service (missing)": "get_service('missing')",
+        "ServiceRef.get (missing)": "missing_ref.get()",
+    }
+    namespace = {"get_service": fb.get_service, "ref": ref, "missing_ref": missing_ref, "holder": holder}
+
+    for name, stmt in cases.items():
+        elapsed = timeit.timeit(stmt, number=N, globals=namespace)
+        print(f"{name:36} {elapsed / N * 1e9:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import unittest
+
+import numpy as np
+
+from FreeBodyEngine.graphics.mesh_optimizer import weld_vertices, optimize_vertex_cache, get_acmr, generate_lods
+from FreeBodyEngine.graphics.model.model_file import DecodedPrimitive
+
+
+def make_cube():
+    """A cube with every face using its own 4 corners, 24 vertices of which 8 are unique."""
+    corners = np.array([[x, y, z] for x in (0, 1) for y in (0, 1) for z in (0, 1)], np.float32)
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    vertices = np.array([corners[i] for face in faces for i in face], np.float32)
+    indices = np.array([base + i for base in range(0, 24, 4) for i in (0, 1, 2, 0, 2, 3)], np.uint32)
+    return vertices, indices
+
+
+def make_grid(size: int, seed: int = 0):
+    """A size x size grid of quads on a gently curved surface, with its triangles shuffled."""
+    x, y = np.meshgrid(np.arange(size + 1, dtype=np.float32), np.arange(size + 1, dtype=np.float32))
+    z = np.sin(x * 0.3) * np.cos(y * 0.2)
+    positions = np.stack([x.ravel(), y.ravel(), z.ravel()], axis=1).astype(np.float32)
+
+    triangles = []
+    for row in range(size):
+        for column in range(size):
+            v = row * (size + 1) + column
+            triangles += [(v, v + 1, v + size + 1), (v + 1, v + size + 2, v + size + 1)]
+    triangles = np.array(triangles, np.uint32)
+    np.random.default_rng(seed).shuffle(triangles)
+    return positions, triangles.ravel()
+
+
+class MeshOptimizerTest(unittest.TestCase):
+    def test_weld_cube(self):
+        vertices, indices = make_cube()
+        kept, welded = weld_vertices(vertices, indices)
+
+        self.assertEqual(len(kept), 8)
+        self.assertEqual(len(welded), len(indices))
+        self.assertTrue(np.array_equal(vertices[kept][welded], vertices[indices]))
+
+    def test_vertex_cache_lowers_acmr(self):
+        positions, indices = make_grid(30)
+        optimized = optimize_vertex_cache(indices, len(positions))
+
+        self.assertLess(get_acmr(optimized), get_acmr(indices))
+        self.assertEqual(sorted(map(tuple, np.sort(optimized.reshape(-1, 3), axis=1))),
+                         sorted(map(tuple, np.sort(indices.reshape(-1, 3), axis=1))))
+
+    def test_generate_lods(self):
+        positions, indices = make_grid(20)
+        normals = np.tile(np.array([0, 0, 1], np.float32), (len(positions), 1))
+        uvs = positions[:, :2] / 20
+        primitive = DecodedPrimitive("grid", positions, normals, uvs, indices, "material")
+
+        lods = generate_lods(primitive)
+        self.assertGreater(len(lods), 0)
+
+        previous = len(indices) // 3
+        for level, lod in enumerate(lods, 1):
+            self.assertEqual(lod.lod, level)
+            self.assertLess(len(lod.indices) // 3, previous)
+            self.assertLess(int(lod.indices.max()), len(lod.positions))
+            self.assertEqual(len(lod.positions), len(lod.normals))
+            previous = len(lod.indices) // 3
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from FreeBodyEngine.core.pack import AssetPack, write_asset_pack, COMPRESSION_NONE, COMPRESSION_ZLIB
+
+
+class AssetPackTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.contents = {
+            "textures/player.png": os.urandom(300),
+            "data/level.json": b'{"tiles": [' + b"0, " * 500 + b"0]}",
+            "data/copy.json": b'{"tiles": [' + b"0, " * 500 + b"0]}", # a duplicate of level.json
+            "sounds/empty.wav": b"",
+        }
+        self.files = {}
+        for i, (name, data) in enumerate(self.contents.items()):
+            source = os.path.join(self.directory, f"{i}.src")
+            with open(source, "wb") as f:
+                f.write(data)
+            self.files[source] = name
+        self.path = os.path.join(self.directory, "assets.pak")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, compression=None):
+        write_asset_pack(self.path, self.files, compression, workers=2)
+        pack = AssetPack(self.path)
+        self.addCleanup(pack.close)
+        return pack
+
+    def test_round_trip(self):
+        pack = self.write({"json": COMPRESSION_ZLIB, "png": COMPRESSION_NONE, "wav": COMPRESSION_NONE})
+
+        self.assertEqual(len(pack), len(self.contents))
+        self.assertEqual(sorted(pack), sorted(self.contents))
+        for name, data in self.contents.items():
+            self.assertIn(name, pack)
+            self.assertEqual(bytes(pack[name]), data)
+            self.assertTrue(pack.verify(name))
+
+        self.assertEqual(pack.find("data/level.json").offset, pack.find("data/copy.json").offset)
+        self.assertEqual(pack.find("data/level.json").compression, COMPRESSION_ZLIB)
+        self.assertNotIn("missing.png", pack)
+        self.assertIsNone(pack.get("missing.png"))
+
+    def test_checksum_mismatch(self):
+        pack = self.write({"png": COMPRESSION_NONE})
+        offset = pack.find("textures/player.png").offset
+        pack.close()
+
+        with open(self.path, "r+b") as f:
+            f.seek(offset)
+            byte = f.read(1)
+            f.seek(offset)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+        pack = AssetPack(self.path)
+        self.addCleanup(pack.close)
+        self.assertFalse(pack.verify("textures/player.png"))
+        self.assertTrue(pack.verify("data/level.json"))
+
+    def test_empty_file(self):
+        open(self.path, "wb").close()
+        with self.assertRaises(ValueError):
+            AssetPack(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()